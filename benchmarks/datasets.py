@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from dataclasses import fields, replace
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List
+import random
+
+from dongdong_bot.agent.memory import MemoryStore
+from dongdong_bot.agent.reminder_store import ReminderStore
+from dongdong_bot.agent.schedule_store import ScheduleStore
+from dongdong_bot.config import Config
+from dongdong_bot.tools.regression_cases import load_chinese_phrases, load_regression_cases
+
+
+ROOT = Path(__file__).resolve().parents[1]
+SUBJECTS = ("咖啡豆", "外套", "會議", "生日", "旅行", "書", "藥", "帳單", "健身", "晚餐")
+DETAILS = ("喜歡淺焙", "顏色是淺藍", "在週五下午", "是 8 月 10 日", "想去京都", "借給小明", "每天早上吃", "月底要繳", "每週三次", "想吃拉麵")
+SCHEDULE_TITLES = ("開會", "看牙醫", "剪頭髮", "繳費", "健身", "聚餐", "交報告", "接小孩")
+SCHEDULE_START = datetime(2026, 1, 1, 9, 0)
+SCHEDULE_STEP = timedelta(minutes=30)
+REMINDER_LEAD = timedelta(minutes=10)
+# tests/data 不存在時的備用語料，涵蓋各路由分支。
+FALLBACK_MESSAGES = (
+    "早安，今天天氣如何",
+    "請記住我喜歡手沖咖啡",
+    "我喜歡什麼咖啡",
+    "我的外套是什麼顏色",
+    "我之前說過什麼喜好",
+    "我有哪些行程",
+    "明天 10:00 開會",
+    "幫我搜尋京都楓葉季",
+    "今天晚餐吃什麼好",
+    "謝謝你",
+)
+
+
+def offline_config(base_dir: str | Path, **overrides) -> Config:
+    # 把所有資料檔路徑改到 base_dir 底下，避免基準測試碰到正式資料。
+    base = Path(base_dir)
+    base.mkdir(parents=True, exist_ok=True)
+    config = Config(
+        openai_api_key="offline",
+        embedding_api_key="offline",
+        telegram_bot_token="offline",
+        memory_dir=str(base),
+    )
+    paths = {
+        item.name: str(base / Path(getattr(config, item.name)).name)
+        for item in fields(config)
+        if item.name.endswith("_path") and item.name != "capabilities_path" and getattr(config, item.name)
+    }
+    return replace(config, **{**paths, **overrides})
+
+
+def message_corpus() -> List[str]:
+    texts = [case.input_text for case in load_regression_cases(ROOT)]
+    texts.extend(str(item.get("phrase", "")).strip() for item in load_chinese_phrases(ROOT))
+    texts = [text for text in texts if text]
+    return texts or list(FALLBACK_MESSAGES)
+
+
+def memory_lines(count: int, seed: int = 7) -> Iterator[tuple[str, str]]:
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    days = max(1, min(count // 20, 3650))
+    for idx in range(count):
+        day = start + timedelta(days=idx % days)
+        yield day.isoformat(), f"{rng.choice(SUBJECTS)}{idx}：{rng.choice(DETAILS)}"
+
+
+def open_memory(config: Config) -> MemoryStore:
+    return MemoryStore(
+        config.memory_dir,
+        embedding_index_path=config.embedding_index_path,
+        vector_index_path=config.vector_index_path,
+        keyword_index_path=config.keyword_index_path,
+    )
+
+
+def build_memory(config: Config, count: int, embed_many) -> MemoryStore:
+    # 直接寫入每日 Markdown，再以 backfill 批次嵌入，與正式環境補索引的路徑相同。
+    store = open_memory(config)
+    by_date: dict[str, List[str]] = {}
+    for day, content in memory_lines(count):
+        by_date.setdefault(day, []).append(f"- {content}\n")
+    for day, lines in by_date.items():
+        with (store.memory_dir / f"{day}.md").open("a", encoding="utf-8") as handle:
+            handle.writelines(lines)
+    store.backfill_embeddings(embed_many, max_entries=max(count, 1))
+    return store
+
+
+def build_schedules(config: Config, count: int, users: int, seed: int = 11) -> None:
+    rng = random.Random(seed)
+    schedules = ScheduleStore(config.schedules_path)
+    reminders = ReminderStore(config.reminders_path)
+    for idx in range(count):
+        user_id = f"bench-{idx % max(users, 1)}"
+        start_time = SCHEDULE_START + SCHEDULE_STEP * idx
+        item = schedules.create(
+            user_id=user_id,
+            chat_id=user_id,
+            title=rng.choice(SCHEDULE_TITLES),
+            description="",
+            start_time=start_time,
+            end_time=None,
+            timezone="Asia/Taipei",
+        )
+        reminders.create(item.schedule_id, start_time - REMINDER_LEAD)
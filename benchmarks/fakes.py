@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import re
+import time
+from typing import AsyncIterator, Iterator, List, Sequence
+
+from dongdong_bot.lib.embedding_client import EmbeddingCache
+from dongdong_bot.lib.llm_usage import LLMUsage
+from dongdong_bot.lib.search_schema import SearchResponse
+from dongdong_bot.main import BotClients
+from dongdong_bot.metrics import NULL_METRICS, MetricsRegistry
+
+
+EMBEDDING_DIM = 256
+STREAM_CHUNK_CHARS = 8
+_USER_INPUT = re.compile(r"使用者(?:輸入|問題):\s*(.*)")
+_MEMORY_LINE = re.compile(r"^- (.+)$", re.MULTILINE)
+
+
+def _sleep(latency_ms: float) -> None:
+    if latency_ms > 0:
+        time.sleep(latency_ms / 1000)
+
+
+def _user_text(prompt: str) -> str:
+    matches = _USER_INPUT.findall(prompt)
+    return matches[-1].strip() if matches else ""
+
+
+def _route(text: str) -> str:
+    if any(keyword in text for keyword in ("記住", "記下", "備忘")):
+        return "memory_save"
+    if any(keyword in text for keyword in ("搜尋", "查一下", "整理")):
+        return "search_report"
+    if "行程" in text or "提醒" in text:
+        return "schedule_list"
+    if any(keyword in text for keyword in ("什麼", "之前", "記得", "哪些")):
+        return "memory_query"
+    return "direct_reply"
+
+
+def fake_reply(prompt: str) -> str:
+    # 依提示詞中的固定字句辨識呼叫點，回傳格式正確且可重現的內容。
+    text = _user_text(prompt)
+    if "你是意圖路由器" in prompt:
+        capability = _route(text)
+        slots = {"topic": text, "url": "", "wants_report": False} if capability == "search_report" else {}
+        return json.dumps(
+            {
+                "capability": capability,
+                "missing_inputs": [],
+                "needs_clarification": False,
+                "confidence": 0.9,
+                "reason": "offline",
+                "slots": slots,
+            },
+            ensure_ascii=False,
+        )
+    if "你是目標導向" in prompt:
+        return json.dumps(
+            {
+                "goal": "回覆使用者",
+                "action": "產生回覆",
+                "observation": "離線基準測試",
+                "reply": f"收到：{text[:20]}",
+                "progress": True,
+            },
+            ensure_ascii=False,
+        )
+    if "你是記憶回想整理助手" in prompt:
+        return json.dumps(_MEMORY_LINE.findall(prompt)[:3], ensure_ascii=False)
+    if "你是記憶檢索的查詢重寫器" in prompt:
+        return text
+    if "你是行程資訊擷取器" in prompt:
+        return json.dumps({"datetime": "", "title": text[:20]}, ensure_ascii=False)
+    if "你是搜尋意圖分析器" in prompt:
+        return json.dumps({"is_search": True, "topic": text, "wants_report": False}, ensure_ascii=False)
+    return f"好的，這是離線回覆：{text[:20]}"
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    # 字元 bigram 雜湊成固定維度再正規化，相似句子會有相近的向量。
+    vector = [0.0] * dim
+    grams = [text[idx : idx + 2] for idx in range(max(len(text) - 1, 1))]
+    for gram in grams:
+        digest = hashlib.blake2b(gram.encode("utf-8"), digest_size=4).digest()
+        vector[int.from_bytes(digest, "little") % dim] += 1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def _usage(prompt: str, reply: str) -> LLMUsage:
+    return LLMUsage(input_tokens=len(prompt) // 2, output_tokens=len(reply) // 2)
+
+
+class FakeLLMClient:
+    def __init__(self, latency_ms: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self._usage: LLMUsage | None = None
+
+    def generate(self, model: str, prompt: str) -> str:
+        _sleep(self.latency_ms)
+        self.calls += 1
+        reply = fake_reply(prompt)
+        self._usage = _usage(prompt, reply)
+        return reply
+
+    def generate_stream(self, model: str, prompt: str) -> Iterator[str]:
+        reply = self.generate(model, prompt)
+        for start in range(0, len(reply), STREAM_CHUNK_CHARS):
+            yield reply[start : start + STREAM_CHUNK_CHARS]
+
+    def last_usage(self) -> LLMUsage | None:
+        return self._usage
+
+
+class AsyncFakeLLMClient:
+    def __init__(self, latency_ms: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self._usage: LLMUsage | None = None
+
+    async def generate(self, model: str, prompt: str) -> str:
+        if self.latency_ms > 0:
+            await asyncio.sleep(self.latency_ms / 1000)
+        self.calls += 1
+        reply = fake_reply(prompt)
+        self._usage = _usage(prompt, reply)
+        return reply
+
+    async def generate_stream(self, model: str, prompt: str) -> AsyncIterator[str]:
+        reply = await self.generate(model, prompt)
+        for start in range(0, len(reply), STREAM_CHUNK_CHARS):
+            yield reply[start : start + STREAM_CHUNK_CHARS]
+
+    def last_usage(self) -> LLMUsage | None:
+        return self._usage
+
+
+class FakeEmbeddingClient:
+    model = "offline-embedding"
+
+    def __init__(self, latency_ms: float = 0.0, metrics: MetricsRegistry | None = None) -> None:
+        self.latency_ms = latency_ms
+        self.metrics = metrics or NULL_METRICS
+        self.cache = EmbeddingCache(None)
+        self.calls = 0
+
+    def embed(self, text: str) -> List[float]:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: Sequence[str]) -> List[List[float]]:
+        # 與正式用戶端一樣每批只付一次延遲。
+        with self.metrics.timer("embed"):
+            _sleep(self.latency_ms)
+            self.calls += 1
+            return [fake_embedding(text) for text in texts]
+
+
+class AsyncFakeEmbeddingClient:
+    model = FakeEmbeddingClient.model
+
+    def __init__(self, latency_ms: float = 0.0, metrics: MetricsRegistry | None = None) -> None:
+        self.latency_ms = latency_ms
+        self.metrics = metrics or NULL_METRICS
+
+    async def embed(self, text: str) -> List[float]:
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: Sequence[str]) -> List[List[float]]:
+        with self.metrics.timer("embed"):
+            if self.latency_ms > 0:
+                await asyncio.sleep(self.latency_ms / 1000)
+            return [fake_embedding(text) for text in texts]
+
+
+def _search_response(query: str) -> SearchResponse:
+    return SearchResponse(
+        summary=f"離線摘要：{query}",
+        bullets=[f"{query} 重點 {idx}" for idx in range(1, 4)],
+        sources=["https://example.com/offline"],
+    )
+
+
+class FakeSearchClient:
+    def __init__(self, latency_ms: float = 0.0, metrics: MetricsRegistry | None = None) -> None:
+        self.latency_ms = latency_ms
+        self.metrics = metrics or NULL_METRICS
+
+    def search_keyword(self, query: str) -> SearchResponse:
+        with self.metrics.timer("search.keyword"):
+            _sleep(self.latency_ms)
+            return _search_response(query)
+
+    def summarize_link(self, url: str) -> SearchResponse:
+        with self.metrics.timer("search.link"):
+            _sleep(self.latency_ms)
+            return _search_response(url)
+
+
+class AsyncFakeSearchClient:
+    def __init__(self, latency_ms: float = 0.0, metrics: MetricsRegistry | None = None) -> None:
+        self.latency_ms = latency_ms
+        self.metrics = metrics or NULL_METRICS
+
+    async def search_keyword(self, query: str) -> SearchResponse:
+        with self.metrics.timer("search.keyword"):
+            if self.latency_ms > 0:
+                await asyncio.sleep(self.latency_ms / 1000)
+            return _search_response(query)
+
+    async def summarize_link(self, url: str) -> SearchResponse:
+        with self.metrics.timer("search.link"):
+            if self.latency_ms > 0:
+                await asyncio.sleep(self.latency_ms / 1000)
+            return _search_response(url)
+
+
+def fake_clients(
+    llm_latency_ms: float = 0.0,
+    embed_latency_ms: float = 0.0,
+    search_latency_ms: float = 0.0,
+    metrics: MetricsRegistry | None = None,
+) -> BotClients:
+    return BotClients(
+        llm=FakeLLMClient(llm_latency_ms),
+        async_llm=AsyncFakeLLMClient(llm_latency_ms),
+        embedding=FakeEmbeddingClient(embed_latency_ms, metrics),
+        async_embedding=AsyncFakeEmbeddingClient(embed_latency_ms, metrics),
+        search=FakeSearchClient(search_latency_ms, metrics),
+        async_search=AsyncFakeSearchClient(search_latency_ms, metrics),
+    )
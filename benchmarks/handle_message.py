@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+for path in (ROOT, ROOT / "src"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from benchmarks.datasets import build_memory, build_schedules, message_corpus, offline_config
+from benchmarks.fakes import fake_clients, fake_embedding
+from dongdong_bot.channels.telegram import IncomingMessage
+from dongdong_bot.main import build_bot
+from dongdong_bot.metrics import Histogram, MetricsRegistry
+from dongdong_bot.monitoring import Monitoring
+
+
+DEFAULT_BASELINE = ROOT / "benchmarks" / "baseline.json"
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_REPEAT = 5
+# 門檻至少為 tolerance，且不低於量測雜訊（相對中位數絕對偏差）的倍數。
+NOISE_FACTOR = 3.0
+# 樣本數過少的階段 p95 不穩定，不列入比較。
+MIN_STAGE_SAMPLES = 20
+
+
+@dataclass(frozen=True)
+class BenchSettings:
+    memory_entries: int = 1000
+    schedule_entries: int = 1000
+    users: int = 20
+    messages: int = 200
+    concurrency: int = 4
+    llm_latency_ms: float = 0.0
+    embed_latency_ms: float = 0.0
+    search_latency_ms: float = 0.0
+    async_handler: bool = False
+
+
+def run(settings: BenchSettings, work_dir: str | Path) -> dict:
+    metrics = MetricsRegistry(enabled=True, sample_size=max(settings.messages, 1024))
+    config = offline_config(
+        work_dir,
+        perf_log=True,
+        stream_replies=False,
+        session_journal_path=None,
+        trace_path=None,
+        llm_usage_path=None,
+        metrics_snapshot_path=None,
+    )
+    setup_start = time.perf_counter()
+    build_memory(config, settings.memory_entries, lambda texts: [fake_embedding(text) for text in texts])
+    build_schedules(config, settings.schedule_entries, settings.users)
+    setup_s = time.perf_counter() - setup_start
+
+    clients = fake_clients(
+        settings.llm_latency_ms,
+        settings.embed_latency_ms,
+        settings.search_latency_ms,
+        metrics=metrics,
+    )
+    monitoring = Monitoring(
+        heartbeat_interval_seconds=config.heartbeat_interval_seconds,
+        error_throttle_seconds=config.error_throttle_seconds,
+        output=lambda _line: None,
+    )
+    bot = build_bot(config, clients=clients, monitoring=monitoring, metrics=metrics)
+    corpus = message_corpus()
+    messages = [
+        IncomingMessage(
+            text=corpus[idx % len(corpus)],
+            user_id=f"bench-{idx % max(settings.users, 1)}",
+            chat_id=f"bench-{idx % max(settings.users, 1)}",
+            user_name="bench",
+        )
+        for idx in range(settings.messages)
+    ]
+    latencies = Histogram(sample_size=max(settings.messages, 1))
+    try:
+        start = time.perf_counter()
+        if settings.async_handler:
+            asyncio.run(_drive_async(bot.handle_message_async, messages, settings.concurrency, latencies))
+        else:
+            _drive_sync(bot.handle_message, messages, settings.concurrency, latencies)
+        elapsed_s = time.perf_counter() - start
+    finally:
+        bot.close()
+
+    stages = metrics.snapshot()["histograms"]
+    stages["message"] = latencies.summary()
+    return {
+        "settings": asdict(settings),
+        "corpus_size": len(corpus),
+        "setup_s": round(setup_s, 3),
+        "elapsed_s": round(elapsed_s, 3),
+        "messages_per_second": round(settings.messages / elapsed_s, 2) if elapsed_s else 0.0,
+        "stages": {name: _rounded(summary) for name, summary in sorted(stages.items())},
+    }
+
+
+def _drive_sync(handle, messages: List[IncomingMessage], concurrency: int, latencies: Histogram) -> None:
+    def _one(message: IncomingMessage) -> float:
+        start = time.perf_counter()
+        handle(message)
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        for elapsed_ms in executor.map(_one, messages):
+            latencies.observe(elapsed_ms)
+
+
+async def _drive_async(handle, messages: List[IncomingMessage], concurrency: int, latencies: Histogram) -> None:
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def _one(message: IncomingMessage) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await handle(message)
+            latencies.observe((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(_one(message) for message in messages))
+
+
+def _rounded(summary: Dict[str, float]) -> Dict[str, float]:
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in summary.items()}
+
+
+def run_repeated(settings: BenchSettings, work_dir: str | Path, repeat: int = DEFAULT_REPEAT) -> dict:
+    # 每輪使用獨立資料目錄，報告取各輪中位數並附上相對雜訊。
+    reports = [run(settings, Path(work_dir) / f"run-{idx}") for idx in range(max(repeat, 1))]
+    rate, rate_noise = _median_and_noise([report["messages_per_second"] for report in reports])
+    stages: Dict[str, Dict[str, float]] = {}
+    for name in sorted({name for report in reports for name in report["stages"]}):
+        samples = [report["stages"][name] for report in reports if name in report["stages"]]
+        p95, p95_noise = _median_and_noise([summary["p95"] for summary in samples])
+        stages[name] = _rounded(
+            {
+                "count": int(statistics.median(summary["count"] for summary in samples)),
+                "p50": statistics.median(summary["p50"] for summary in samples),
+                "p95": p95,
+                "p99": statistics.median(summary["p99"] for summary in samples),
+                "p95_noise": p95_noise,
+            }
+        )
+    return {
+        "settings": asdict(settings),
+        "runs": len(reports),
+        "corpus_size": reports[0]["corpus_size"],
+        "setup_s": round(statistics.median(report["setup_s"] for report in reports), 3),
+        "elapsed_s": round(statistics.median(report["elapsed_s"] for report in reports), 3),
+        "messages_per_second": round(rate, 2),
+        "messages_per_second_noise": round(rate_noise, 3),
+        "stages": stages,
+    }
+
+
+def _median_and_noise(values: List[float]) -> tuple[float, float]:
+    median = statistics.median(values)
+    if not median:
+        return median, 0.0
+    deviation = statistics.median(abs(value - median) for value in values)
+    return median, deviation / median
+
+
+def compare(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    # 回傳退步項目：吞吐量下降或任一階段 p95 上升超過門檻；設定不同的基準無從比較。
+    if report.get("settings") != baseline.get("settings"):
+        raise ValueError(f"基準設定與本次執行不同：{baseline.get('settings')} != {report.get('settings')}")
+    regressions: List[str] = []
+    base_rate = baseline.get("messages_per_second", 0.0)
+    rate = report.get("messages_per_second", 0.0)
+    limit = _limit(tolerance, baseline.get("messages_per_second_noise"), report.get("messages_per_second_noise"))
+    if base_rate and rate < base_rate * (1 - limit):
+        regressions.append(f"messages_per_second {base_rate} -> {rate} (limit -{limit:.0%})")
+    base_stages = baseline.get("stages", {})
+    for name, summary in report.get("stages", {}).items():
+        base = base_stages.get(name)
+        if not base or min(base.get("count", 0), summary.get("count", 0)) < MIN_STAGE_SAMPLES:
+            continue
+        before, after = base["p95"], summary["p95"]
+        limit = _limit(tolerance, base.get("p95_noise"), summary.get("p95_noise"))
+        if after > before * (1 + limit):
+            regressions.append(f"{name}.p95 {before}ms -> {after}ms (limit +{limit:.0%})")
+    return regressions
+
+
+def _limit(tolerance: float, *noises: float | None) -> float:
+    return max(tolerance, NOISE_FACTOR * max((noise or 0.0) for noise in noises))
+
+
+def _print_report(report: dict) -> None:
+    print(
+        f"messages={report['settings']['messages']} runs={report.get('runs', 1)} elapsed={report['elapsed_s']}s "
+        f"rate={report['messages_per_second']}/s (±{report.get('messages_per_second_noise', 0.0):.1%}) "
+        f"setup={report['setup_s']}s"
+    )
+    print(f"{'stage':<28}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'noise':>9}")
+    for name, summary in report["stages"].items():
+        print(
+            f"{name:<28}{summary['count']:>8}{summary['p50']:>10.2f}{summary['p95']:>10.2f}"
+            f"{summary['p99']:>10.2f}{summary.get('p95_noise', 0.0):>9.1%}"
+        )
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="以本機替身驅動 handle_message 的離線基準測試")
+    defaults = BenchSettings()
+    parser.add_argument("--memory-entries", type=int, default=defaults.memory_entries)
+    parser.add_argument("--schedule-entries", type=int, default=defaults.schedule_entries)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--messages", type=int, default=defaults.messages)
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument("--llm-latency-ms", type=float, default=defaults.llm_latency_ms)
+    parser.add_argument("--embed-latency-ms", type=float, default=defaults.embed_latency_ms)
+    parser.add_argument("--search-latency-ms", type=float, default=defaults.search_latency_ms)
+    parser.add_argument("--async-handler", action="store_true")
+    parser.add_argument("--output", help="報告 JSON 輸出路徑")
+    parser.add_argument("--baseline", help=f"與基準比較，例如 {DEFAULT_BASELINE.relative_to(ROOT)}")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="重複執行次數，報告取中位數")
+    parser.add_argument("--work-dir", help="資料目錄（預設使用暫存目錄）")
+    args = parser.parse_args(argv)
+
+    settings = BenchSettings(
+        memory_entries=args.memory_entries,
+        schedule_entries=args.schedule_entries,
+        users=args.users,
+        messages=args.messages,
+        concurrency=args.concurrency,
+        llm_latency_ms=args.llm_latency_ms,
+        embed_latency_ms=args.embed_latency_ms,
+        search_latency_ms=args.search_latency_ms,
+        async_handler=args.async_handler,
+    )
+    if args.work_dir:
+        report = run_repeated(settings, args.work_dir, args.repeat)
+    else:
+        with tempfile.TemporaryDirectory(prefix="dongdong-bench-") as work_dir:
+            report = run_repeated(settings, work_dir, args.repeat)
+    _print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        try:
+            regressions = compare(report, baseline, args.tolerance)
+        except ValueError as exc:
+            print(f"ERROR {exc}")
+            return 2
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import argparse
+import gc
+import json
+import multiprocessing
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+for path in (ROOT, ROOT / "src"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from benchmarks.datasets import (
+    DETAILS,
+    REMINDER_LEAD,
+    SCHEDULE_START,
+    SCHEDULE_STEP,
+    SCHEDULE_TITLES,
+    SUBJECTS,
+    build_memory,
+    build_schedules,
+    memory_lines,
+    message_corpus,
+    offline_config,
+    open_memory,
+)
+from benchmarks.fakes import fake_embedding
+from dongdong_bot.agent.reminder_store import ReminderStore
+from dongdong_bot.agent.schedule_parser import ScheduleParser
+from dongdong_bot.agent.schedule_store import ScheduleStore
+from dongdong_bot.config import Config
+from dongdong_bot.cron.scheduler import ReminderScheduler
+from dongdong_bot.metrics import Histogram
+
+
+# (記憶筆數, 行程筆數)：realistic 約為單一使用者一年的量，extreme 用來找出隨資料量劣化的路徑。
+PRESETS = {
+    "realistic": (2000, 500),
+    "extreme": (100000, 20000),
+}
+DEFAULT_OPS = 200
+DEFAULT_TIME_BUDGET_S = 10.0
+USERS = 20
+QUERY_WINDOW_DAYS = 30
+PARSER_PHRASES = (
+    "提醒我明天 10:30 開會",
+    "後天早上9點提醒我上班",
+    "明天下午3點提醒我報告",
+    "列出所有已經完成的行程",
+    "全部行程",
+    "刪除全部已完成行程",
+    "確認",
+    "取消",
+)
+
+OpFn = Callable[[int], object]
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    # 使用的資料集："memory"、"schedule"，或 "" 表示不需要檔案。
+    dataset: str
+    prepare: Callable[[Config, int, int], OpFn]
+
+
+def _memory_save(config: Config, size: int, ops: int) -> OpFn:
+    payloads = [f"{SUBJECTS[idx % len(SUBJECTS)]}新增{idx}：{DETAILS[idx % len(DETAILS)]}" for idx in range(ops)]
+    embeddings = [fake_embedding(text) for text in payloads]
+    day = date(2026, 6, 1).isoformat()
+    store = open_memory(config)
+    return lambda idx: store.save_with_embedding(payloads[idx], embeddings[idx], date=day)
+
+
+def _memory_semantic_search(config: Config, size: int, ops: int) -> OpFn:
+    corpus = message_corpus() + [f"{subject}{detail}" for subject in SUBJECTS for detail in DETAILS]
+    queries = [fake_embedding(corpus[idx % len(corpus)]) for idx in range(ops)]
+    store = open_memory(config)
+    return lambda idx: store.semantic_search(queries[idx])
+
+
+def _memory_query_range(config: Config, size: int, ops: int) -> OpFn:
+    days = sorted({day for day, _content in memory_lines(size)})
+    store = open_memory(config)
+
+    def _op(idx: int) -> object:
+        start = date.fromisoformat(days[idx % len(days)])
+        end = start + timedelta(days=QUERY_WINDOW_DAYS - 1)
+        return store.query_range(SUBJECTS[idx % len(SUBJECTS)], start.isoformat(), end.isoformat())
+
+    return _op
+
+
+def _memory_delete_by_keyword(config: Config, size: int, ops: int) -> OpFn:
+    # 每次刪除一筆完整內容，涵蓋重寫單日檔案與過濾向量索引兩段成本。
+    contents = [content for _day, content in memory_lines(size)]
+    store = open_memory(config)
+    return lambda idx: store.delete_by_keyword(contents[idx % len(contents)])
+
+
+def _schedule_store(config: Config) -> ScheduleStore:
+    store = ScheduleStore(config.schedules_path)
+    store.list("bench-0")
+    return store
+
+
+def _reminder_store(config: Config) -> ReminderStore:
+    store = ReminderStore(config.reminders_path)
+    store.next_trigger_time()
+    return store
+
+
+def _schedule_create(config: Config, size: int, ops: int) -> OpFn:
+    store = _schedule_store(config)
+
+    def _op(idx: int) -> object:
+        user_id = f"bench-{idx % USERS}"
+        return store.create(
+            user_id=user_id,
+            chat_id=user_id,
+            title=SCHEDULE_TITLES[idx % len(SCHEDULE_TITLES)],
+            description="",
+            start_time=SCHEDULE_START + SCHEDULE_STEP * (size + idx),
+            end_time=None,
+            timezone="Asia/Taipei",
+        )
+
+    return _op
+
+
+def _schedule_list(config: Config, size: int, ops: int) -> OpFn:
+    store = _schedule_store(config)
+    return lambda idx: store.list(f"bench-{idx % USERS}")
+
+
+def _schedule_update(config: Config, size: int, ops: int) -> OpFn:
+    store = _schedule_store(config)
+    schedule_ids = [item.schedule_id for item in store.list_by_status("scheduled")]
+    return lambda idx: store.update(schedule_ids[idx % len(schedule_ids)], title=f"改期{idx}")
+
+
+def _reminder_create(config: Config, size: int, ops: int) -> OpFn:
+    schedule_ids = [item.schedule_id for item in _schedule_store(config).list_by_status("scheduled")]
+    store = _reminder_store(config)
+    return lambda idx: store.create(
+        schedule_ids[idx % len(schedule_ids)],
+        SCHEDULE_START + SCHEDULE_STEP * idx - REMINDER_LEAD * 2,
+    )
+
+
+def _reminder_list(config: Config, size: int, ops: int) -> OpFn:
+    store = _reminder_store(config)
+    return lambda idx: store.list_pending()
+
+
+def _reminder_update(config: Config, size: int, ops: int) -> OpFn:
+    store = _reminder_store(config)
+    reminder_ids = [reminder.reminder_id for reminder in store.list_pending()]
+    return lambda idx: store.mark_sent(reminder_ids[idx % len(reminder_ids)])
+
+
+def _collect_due(config: Config, size: int, ops: int) -> OpFn:
+    # 時鐘每次前進固定步長，ops 次呼叫剛好把所有提醒彈完，與輪詢時的負載相近。
+    scheduler = ReminderScheduler(_schedule_store(config), _reminder_store(config))
+    step = SCHEDULE_STEP * max(size // max(ops, 1), 1)
+    return lambda idx: scheduler.collect_due(SCHEDULE_START + step * (idx + 1))
+
+
+def _parser_parse(config: Config, size: int, ops: int) -> OpFn:
+    phrases = list(PARSER_PHRASES) + message_corpus()
+    parser = ScheduleParser()
+    now = SCHEDULE_START
+    return lambda idx: parser.parse(phrases[idx % len(phrases)], now=now)
+
+
+CASES: Dict[str, Case] = {
+    case.name: case
+    for case in (
+        Case("memory.save_with_embedding", "memory", _memory_save),
+        Case("memory.semantic_search", "memory", _memory_semantic_search),
+        Case("memory.query_range", "memory", _memory_query_range),
+        Case("memory.delete_by_keyword", "memory", _memory_delete_by_keyword),
+        Case("schedule.create", "schedule", _schedule_create),
+        Case("schedule.list", "schedule", _schedule_list),
+        Case("schedule.update", "schedule", _schedule_update),
+        Case("reminder.create", "schedule", _reminder_create),
+        Case("reminder.list", "schedule", _reminder_list),
+        Case("reminder.update", "schedule", _reminder_update),
+        Case("reminder.collect_due", "schedule", _collect_due),
+        Case("parser.parse", "", _parser_parse),
+    )
+}
+
+
+def _io_counters() -> Optional[tuple[int, int]]:
+    # /proc/self/io 的 rchar/wchar 是系統呼叫層級的位元組數（含頁快取命中），
+    # mmap 讀取不會計入；非 Linux 環境回傳 None。
+    try:
+        text = Path("/proc/self/io").read_text(encoding="ascii")
+    except OSError:
+        return None
+    values = dict(line.split(": ", 1) for line in text.splitlines() if ": " in line)
+    return int(values["rchar"]), int(values["wchar"])
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 回報 KB，macOS 回報 bytes。
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(name: str, size: int, ops: int, case_dir: str, time_budget_s: float = DEFAULT_TIME_BUDGET_S) -> dict:
+    case = CASES[name]
+    config = offline_config(case_dir)
+    setup_start = time.perf_counter()
+    op = case.prepare(config, size, ops)
+    setup_s = time.perf_counter() - setup_start
+    gc.collect()
+    latencies = Histogram(sample_size=max(ops, 1))
+    io_before = _io_counters()
+    start = time.perf_counter()
+    for idx in range(ops):
+        op_start = time.perf_counter()
+        op(idx)
+        now = time.perf_counter()
+        latencies.observe((now - op_start) * 1000)
+        # 超過時間預算就提前結束，以實際完成次數計算吞吐量。
+        if time_budget_s and now - start >= time_budget_s:
+            break
+    elapsed_s = time.perf_counter() - start
+    io_after = _io_counters()
+    done = latencies.count
+    summary = latencies.summary()
+    result = {
+        "case": name,
+        "size": size if case.dataset else 0,
+        "ops": done,
+        "setup_s": round(setup_s, 3),
+        "ops_per_second": round(done / elapsed_s, 2) if elapsed_s else 0.0,
+        "p50_ms": round(summary["p50"], 3),
+        "p95_ms": round(summary["p95"], 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "read_bytes_per_op": None,
+        "written_bytes_per_op": None,
+    }
+    if io_before and io_after and done:
+        result["read_bytes_per_op"] = round((io_after[0] - io_before[0]) / done)
+        result["written_bytes_per_op"] = round((io_after[1] - io_before[1]) / done)
+    return result
+
+
+def build_dataset(kind: str, size: int, target: Path) -> None:
+    config = offline_config(target)
+    if kind == "memory":
+        build_memory(config, size, lambda texts: [fake_embedding(text) for text in texts]).vector_index.close()
+    elif kind == "schedule":
+        build_schedules(config, size, USERS)
+
+
+def run(
+    sizes: List[tuple[int, int]],
+    work_dir: str | Path,
+    cases: List[str] | None = None,
+    ops: int = DEFAULT_OPS,
+    time_budget_s: float = DEFAULT_TIME_BUDGET_S,
+    isolate: bool = True,
+) -> List[dict]:
+    # 每種資料量先建一份範本，每個案例複製一份獨立目錄；isolate 時每個案例在新的
+    # 子行程中量測，peak RSS 才不會被前一個案例或建資料的過程墊高。
+    work = Path(work_dir)
+    names = cases or list(CASES)
+    templates: Dict[tuple[str, int], Path] = {}
+    jobs: List[tuple[str, int, str]] = []
+    for memory_size, schedule_size in sizes:
+        for name in names:
+            kind = CASES[name].dataset
+            size = {"memory": memory_size, "schedule": schedule_size}.get(kind, 0)
+            if not kind and any(job[0] == name for job in jobs):
+                continue
+            template = templates.get((kind, size))
+            if template is None:
+                template = work / "templates" / f"{kind or 'empty'}-{size}"
+                build_dataset(kind, size, template)
+                templates[(kind, size)] = template
+            case_dir = work / "cases" / f"{name}-{size}"
+            shutil.rmtree(case_dir, ignore_errors=True)
+            shutil.copytree(template, case_dir)
+            jobs.append((name, size, str(case_dir)))
+
+    results: List[dict] = []
+    for name, size, case_dir in jobs:
+        if isolate:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results.append(executor.submit(measure, name, size, ops, case_dir, time_budget_s).result())
+        else:
+            results.append(measure(name, size, ops, case_dir, time_budget_s))
+        shutil.rmtree(case_dir, ignore_errors=True)
+    return results
+
+
+def _format_bytes(value: Optional[int]) -> str:
+    return "-" if value is None else str(value)
+
+
+def _print_results(results: List[dict]) -> None:
+    print(
+        f"{'case':<28}{'size':>8}{'ops':>6}{'ops/s':>12}{'p50ms':>10}{'p95ms':>10}"
+        f"{'rssMB':>9}{'readB/op':>12}{'writeB/op':>12}"
+    )
+    for row in results:
+        print(
+            f"{row['case']:<28}{row['size']:>8}{row['ops']:>6}{row['ops_per_second']:>12.1f}"
+            f"{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}{row['peak_rss_mb']:>9.1f}"
+            f"{_format_bytes(row['read_bytes_per_op']):>12}{_format_bytes(row['written_bytes_per_op']):>12}"
+        )
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="記憶、行程、提醒與行程解析的儲存層微基準測試")
+    parser.add_argument("--preset", nargs="+", choices=sorted(PRESETS), default=["realistic"])
+    parser.add_argument("--memory-entries", type=int, help="自訂記憶筆數（取代 preset）")
+    parser.add_argument("--schedule-entries", type=int, help="自訂行程筆數（取代 preset）")
+    parser.add_argument("--case", nargs="+", choices=sorted(CASES), help="只執行指定案例")
+    parser.add_argument("--ops", type=int, default=DEFAULT_OPS)
+    parser.add_argument("--time-budget", type=float, default=DEFAULT_TIME_BUDGET_S, help="每個案例的秒數上限")
+    parser.add_argument("--in-process", action="store_true", help="不另開子行程（peak RSS 會累積）")
+    parser.add_argument("--output", help="結果 JSON 輸出路徑")
+    parser.add_argument("--work-dir", help="資料目錄（預設使用暫存目錄）")
+    args = parser.parse_args(argv)
+
+    if args.memory_entries is not None or args.schedule_entries is not None:
+        memory_default, schedule_default = PRESETS["realistic"]
+        sizes = [(args.memory_entries or memory_default, args.schedule_entries or schedule_default)]
+    else:
+        sizes = [PRESETS[name] for name in args.preset]
+    options = dict(cases=args.case, ops=args.ops, time_budget_s=args.time_budget, isolate=not args.in_process)
+    if args.work_dir:
+        results = run(sizes, args.work_dir, **options)
+    else:
+        with tempfile.TemporaryDirectory(prefix="dongdong-store-bench-") as work_dir:
+            results = run(sizes, work_dir, **options)
+    _print_results(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+#!/usr/bin/env sh
+set -e
+
+ROOT_DIR="$(cd "$(dirname "$0")/.." && pwd)"
+
+cd "$ROOT_DIR"
+PYTHONPATH="$ROOT_DIR/src" python -m benchmarks.handle_message \
+  --baseline "$ROOT_DIR/benchmarks/baseline.json" \
+  --output "$ROOT_DIR/bench_output.txt" \
+  "$@"
@@ -2,8 +2,10 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
+from threading import Lock
+from typing import Callable, FrozenSet, Iterable, List, Tuple
 import json
+import time
 
 
 @dataclass(frozen=True)
@@ -12,19 +14,32 @@ class AllowlistEntry:
     channel_type: str
 
 
+DEFAULT_RECHECK_SECONDS = 2.0
+
+
 class AllowlistStore:
-    def __init__(self, path: str) -> None:
+    # 授權檢查走記憶體中的 (user_id, channel_type) 集合；檔案的大小與修改時間
+    # 最多每 recheck_seconds 秒檢查一次，有變動才重新載入，add/remove 會直接更新快取。
+    def __init__(
+        self,
+        path: str,
+        recheck_seconds: float = DEFAULT_RECHECK_SECONDS,
+        clock: Callable[[], float] | None = None,
+    ) -> None:
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.recheck_seconds = recheck_seconds
+        self._clock = clock or time.monotonic
+        self._lock = Lock()
+        self._allowed: FrozenSet[Tuple[str, str]] = frozenset()
+        self._signature: tuple[int, int] | None = None
+        self._checked_at: float | None = None
 
     def is_allowed(self, user_id: str, channel_type: str) -> bool:
-        entries = self.list_entries()
-        if not entries:
+        allowed = self._snapshot()
+        if not allowed:
             return True
-        return any(
-            entry.user_id == user_id and entry.channel_type == channel_type
-            for entry in entries
-        )
+        return (user_id, channel_type) in allowed
 
     def list_entries(self) -> List[AllowlistEntry]:
         data = self._load()
@@ -83,3 +98,27 @@ class AllowlistStore:
         tmp_path = self.path.with_suffix(".tmp")
         tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
         tmp_path.replace(self.path)
+        with self._lock:
+            self._allowed = frozenset((item["user_id"], item["channel_type"]) for item in data)
+            self._signature = self._stat_signature()
+            self._checked_at = self._clock()
+
+    def _snapshot(self) -> FrozenSet[Tuple[str, str]]:
+        now = self._clock()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.recheck_seconds:
+                return self._allowed
+            self._checked_at = now
+            signature = self._stat_signature()
+            if signature == self._signature:
+                return self._allowed
+            self._allowed = frozenset((item["user_id"], item["channel_type"]) for item in self._load())
+            self._signature = signature
+            return self._allowed
+
+    def _stat_signature(self) -> tuple[int, int] | None:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+import hashlib
 import json
 from pathlib import Path
 from typing import Any, Iterable
@@ -19,9 +20,33 @@ class CapabilityCatalog:
     def __init__(self, path: str | Path) -> None:
         self.path = Path(path)
         self._capabilities: dict[str, Capability] = {}
+        self._fingerprint = ""
+        self._prompt_block = ""
+        self._signature: tuple[int, int] | None = None
         self._load()
 
+    @property
+    def fingerprint(self) -> str:
+        self.refresh()
+        return self._fingerprint
+
+    def refresh(self) -> bool:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return False
+        if (stat.st_size, stat.st_mtime_ns) == self._signature:
+            return False
+        try:
+            self._load()
+        except ValueError:
+            # 編輯中的不完整檔案先沿用舊清單，待下次變動再重新載入。
+            self._signature = (stat.st_size, stat.st_mtime_ns)
+            return False
+        return True
+
     def _load(self) -> None:
+        stat = self.path.stat()
         raw = self.path.read_text(encoding="utf-8")
         data = json.loads(raw)
         if isinstance(data, dict) and "capabilities" in data:
@@ -30,11 +55,16 @@ class CapabilityCatalog:
             items = data
         if not isinstance(items, list):
             raise ValueError("capabilities 應為 list")
+        capabilities: dict[str, Capability] = {}
         for item in items:
             capability = self._parse_capability(item)
-            if capability.name in self._capabilities:
+            if capability.name in capabilities:
                 raise ValueError(f"capability 名稱重複: {capability.name}")
-            self._capabilities[capability.name] = capability
+            capabilities[capability.name] = capability
+        self._capabilities = capabilities
+        self._prompt_block = self._render_prompt_block()
+        self._fingerprint = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        self._signature = (stat.st_size, stat.st_mtime_ns)
 
     def _parse_capability(self, item: Any) -> Capability:
         if not isinstance(item, dict):
@@ -70,6 +100,9 @@ class CapabilityCatalog:
         return list(self._capabilities.keys())
 
     def to_prompt_block(self) -> str:
+        return self._prompt_block
+
+    def _render_prompt_block(self) -> str:
         lines: list[str] = []
         for capability in self.list_capabilities():
             lines.append(f"- 名稱: {capability.name}")
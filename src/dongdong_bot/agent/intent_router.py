@@ -1,11 +1,42 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
 import json
 import re
-from typing import Callable, Optional
+from threading import Lock
+from typing import Awaitable, Callable, Optional
 
 from dongdong_bot.agent.capability_catalog import CapabilityCatalog
+from dongdong_bot.agent.schedule_parser import ScheduleParser
+from dongdong_bot.lib.llm_usage import LLMUsage
+from dongdong_bot.lib.route_cache import RouteCache
+
+
+IntentClassifierFn = Callable[[str], tuple[str | None, float]]
+AsyncIntentClassifierFn = Callable[[str], Awaitable[tuple[str | None, float]]]
+AsyncGenerateFn = Callable[[str, str], Awaitable[str]]
+UsageFn = Callable[[], LLMUsage | None]
+FAST_PATH_THRESHOLD = 0.85
+ROUTE_TIERS = ("parser", "cache", "embedding", "llm")
+ROUTE_CACHE_NAMESPACE = "route"
+UNCACHEABLE_REASONS = {"empty_input", "parse_failed", "invalid_capability"}
+# 合併路由模式下，模型在同一個 JSON 中回傳的各能力欄位。
+SLOT_FIELDS = {
+    "schedule_add": ("datetime", "title"),
+    "search_report": ("topic", "url", "wants_report"),
+}
+# 時間欄位依當下時間解析，不可跨請求重用。
+UNCACHEABLE_SLOT_CAPABILITIES = {"schedule_add"}
+PARSER_ACTION_CAPABILITIES = {
+    "add": "schedule_add",
+    "list": "schedule_list",
+    "update": "schedule_list",
+    "delete": "schedule_list",
+    "complete": "schedule_list",
+    "clarify": "schedule_list",
+    "bulk_delete_completed": "schedule_list",
+}
 
 
 @dataclass(frozen=True)
@@ -15,6 +46,8 @@ class IntentDecision:
     needs_clarification: bool
     confidence: float
     reason: str | None = None
+    tier: str = "llm"
+    slots: dict = field(default_factory=dict)
 
 
 class IntentRouter:
@@ -23,22 +56,199 @@ class IntentRouter:
         generate: Callable[[str, str], str],
         model: str,
         catalog: CapabilityCatalog,
+        schedule_parser: ScheduleParser | None = None,
+        intent_classifier: IntentClassifierFn | None = None,
+        fast_path_threshold: float = FAST_PATH_THRESHOLD,
+        cache: RouteCache | None = None,
+        usage_fn: UsageFn | None = None,
+        combined_slots: bool = False,
+        now_fn: Callable[[], datetime] | None = None,
+        agenerate: AsyncGenerateFn | None = None,
+        aintent_classifier: AsyncIntentClassifierFn | None = None,
+        ausage_fn: UsageFn | None = None,
     ) -> None:
         self._generate = generate
+        self._agenerate = agenerate
+        self._aintent_classifier = aintent_classifier
         self._model = model
         self._catalog = catalog
+        self._schedule_parser = schedule_parser
+        self._intent_classifier = intent_classifier
+        self._fast_path_threshold = fast_path_threshold
+        self._cache = cache
+        self._usage_fn = usage_fn
+        # 非同步 client 的用量記在各自的 context，不能讀同步 client 的執行緒區域值。
+        self._ausage_fn = ausage_fn
+        self._combined_slots = combined_slots
+        self._now_fn = now_fn or datetime.now
+        self._tier_counts = {tier: 0 for tier in ROUTE_TIERS}
+        self._prompt_tokens = {"calls": 0, "input": 0, "cached": 0}
+        self._stats_lock = Lock()
+        self._prompt_prefix = ""
+        self._prompt_prefix_key: str | None = None
 
     def route(self, user_text: str) -> IntentDecision:
         if not user_text.strip():
-            return IntentDecision(
-                capability="direct_reply",
-                missing_inputs=["intent"],
-                needs_clarification=True,
-                confidence=0.0,
-                reason="empty_input",
-            )
+            return self._empty_decision()
+        decision = self._route_by_parser(user_text) or self._route_by_cache(user_text)
+        if decision is None:
+            decision = self._route_by_embedding(user_text) or self._route_by_llm(user_text)
+            self._store_in_cache(user_text, decision)
+        self._record_tier(decision.tier)
+        return decision
+
+    async def aroute(self, user_text: str) -> IntentDecision:
+        # 與 route 相同的分層順序；parser 與快取是本地運算，embedding 與 LLM 改為 await。
+        if not user_text.strip():
+            return self._empty_decision()
+        decision = self._route_by_parser(user_text) or self._route_by_cache(user_text)
+        if decision is None:
+            decision = await self._aroute_by_embedding(user_text) or await self._aroute_by_llm(user_text)
+            self._store_in_cache(user_text, decision)
+        self._record_tier(decision.tier)
+        return decision
+
+    @staticmethod
+    def _empty_decision() -> IntentDecision:
+        return IntentDecision(
+            capability="direct_reply",
+            missing_inputs=["intent"],
+            needs_clarification=True,
+            confidence=0.0,
+            reason="empty_input",
+        )
+
+    def tier_stats(self) -> dict[str, float]:
+        with self._stats_lock:
+            counts = dict(self._tier_counts)
+        total = sum(counts.values())
+        stats: dict[str, float] = {"total": total}
+        for tier, count in counts.items():
+            stats[tier] = count
+            stats[f"{tier}_rate"] = count / total if total else 0.0
+        stats["llm_avoided"] = total - counts["llm"]
+        return stats
+
+    def prompt_cache_stats(self) -> dict[str, float]:
+        with self._stats_lock:
+            calls = self._prompt_tokens["calls"]
+            input_tokens = self._prompt_tokens["input"]
+            cached = self._prompt_tokens["cached"]
+        return {
+            "calls": calls,
+            "input_tokens": input_tokens,
+            "cached_tokens": cached,
+            "uncached_tokens": input_tokens - cached,
+            "cached_rate": cached / input_tokens if input_tokens else 0.0,
+        }
+
+    def _record_usage(self, usage_fn: UsageFn | None) -> None:
+        usage = usage_fn() if usage_fn is not None else None
+        if usage is None:
+            return
+        with self._stats_lock:
+            self._prompt_tokens["calls"] += 1
+            self._prompt_tokens["input"] += usage.input_tokens
+            self._prompt_tokens["cached"] += usage.cached_input_tokens
+
+    def _record_tier(self, tier: str) -> None:
+        with self._stats_lock:
+            self._tier_counts[tier] = self._tier_counts.get(tier, 0) + 1
+
+    def _route_by_parser(self, user_text: str) -> IntentDecision | None:
+        if self._schedule_parser is None:
+            return None
+        command = self._schedule_parser.parse(user_text)
+        if command is None:
+            return None
+        capability = PARSER_ACTION_CAPABILITIES.get(command.action)
+        if capability is None or capability not in self._catalog.capability_names():
+            return None
+        if command.action == "add" and not command.start_time:
+            return None
+        # 刪除/完成/修改的關鍵字（取消、改成…）在一般對話也常見，需帶行程 ID 或明確提到行程。
+        if command.action not in {"add", "list"}:
+            if not command.schedule_id and "行程" not in user_text:
+                return None
+        return IntentDecision(
+            capability=capability,
+            missing_inputs=[],
+            needs_clarification=False,
+            confidence=1.0,
+            reason=f"parser:{command.action}",
+            tier="parser",
+        )
+
+    def _route_by_cache(self, user_text: str) -> IntentDecision | None:
+        if self._cache is None:
+            return None
+        payload = self._cache.get(ROUTE_CACHE_NAMESPACE, user_text)
+        if payload is None:
+            return None
+        try:
+            decision = IntentDecision(**{**payload, "tier": "cache"})
+        except TypeError:
+            return None
+        if decision.capability not in self._catalog.capability_names():
+            return None
+        return decision
+
+    def _store_in_cache(self, user_text: str, decision: IntentDecision) -> None:
+        if self._cache is None or decision.reason in UNCACHEABLE_REASONS:
+            return
+        payload = asdict(decision)
+        payload.pop("tier", None)
+        if decision.capability in UNCACHEABLE_SLOT_CAPABILITIES:
+            payload.pop("slots", None)
+        self._cache.put(ROUTE_CACHE_NAMESPACE, user_text, payload)
+
+    def _route_by_embedding(self, user_text: str) -> IntentDecision | None:
+        if self._intent_classifier is None:
+            return None
+        try:
+            capability, score = self._intent_classifier(user_text)
+        except Exception:
+            return None
+        return self._embedding_decision(capability, score)
+
+    async def _aroute_by_embedding(self, user_text: str) -> IntentDecision | None:
+        if self._aintent_classifier is None:
+            return self._route_by_embedding(user_text)
+        try:
+            capability, score = await self._aintent_classifier(user_text)
+        except Exception:
+            return None
+        return self._embedding_decision(capability, score)
+
+    def _embedding_decision(self, capability: str | None, score: float) -> IntentDecision | None:
+        if not capability or score < self._fast_path_threshold:
+            return None
+        if capability not in self._catalog.capability_names():
+            return None
+        return IntentDecision(
+            capability=capability,
+            missing_inputs=[],
+            needs_clarification=False,
+            confidence=score,
+            reason=f"embedding:{score:.2f}",
+            tier="embedding",
+        )
+
+    def _route_by_llm(self, user_text: str) -> IntentDecision:
         prompt = self._build_prompt(user_text)
         raw = self._generate(self._model, prompt)
+        self._record_usage(self._usage_fn)
+        return self._decision_from_raw(raw)
+
+    async def _aroute_by_llm(self, user_text: str) -> IntentDecision:
+        if self._agenerate is None:
+            return self._route_by_llm(user_text)
+        prompt = self._build_prompt(user_text)
+        raw = await self._agenerate(self._model, prompt)
+        self._record_usage(self._ausage_fn)
+        return self._decision_from_raw(raw)
+
+    def _decision_from_raw(self, raw: str) -> IntentDecision:
         parsed = self._parse_json(raw)
         if parsed is None:
             return IntentDecision(
@@ -72,6 +282,20 @@ class IntentRouter:
         return "可以再說清楚你想要我做什麼嗎？"
 
     def _build_prompt(self, user_text: str) -> str:
+        # 固定前綴只在能力清單變動時重組，使用者輸入放在最後，讓供應商的 prompt cache 可命中前綴。
+        if self._combined_slots:
+            now = self._now_fn().strftime("%Y-%m-%d %H:%M")
+            return f"{self.prompt_prefix()}目前時間: {now}\n使用者輸入: {user_text}\n"
+        return f"{self.prompt_prefix()}使用者輸入: {user_text}\n"
+
+    def prompt_prefix(self) -> str:
+        fingerprint = self._catalog.fingerprint
+        if fingerprint != self._prompt_prefix_key:
+            self._prompt_prefix = self._render_prompt_prefix()
+            self._prompt_prefix_key = fingerprint
+        return self._prompt_prefix
+
+    def _render_prompt_prefix(self) -> str:
         catalog_block = self._catalog.to_prompt_block()
         capability_names = ", ".join(self._catalog.capability_names())
         return (
@@ -83,12 +307,29 @@ class IntentRouter:
             "missing_inputs 為缺少的必要資訊列表，若無缺少請填空陣列。\n"
             "missing_inputs 僅能從該能力的 required_inputs 中選擇。\n"
             "needs_clarification 為布林值，當意圖不明確或有缺少資訊時設為 true。\n"
-            "confidence 為 0~1 之間的小數。\n\n"
+            "confidence 為 0~1 之間的小數。\n"
+            f"{self._slot_instructions()}\n"
             "可用功能清單:\n"
             f"{catalog_block}\n\n"
-            f"使用者輸入: {user_text}\n"
         )
 
+    def _slot_instructions(self) -> str:
+        if not self._combined_slots:
+            return ""
+        return (
+            "另輸出 slots 物件：capability 為 schedule_add 時填 datetime"
+            "（YYYY-MM-DD HH:MM，24 小時制，無法判斷請填空字串）與 title（行程內容的精簡描述）；"
+            "為 search_report 時填 topic（精簡可搜尋主題）、url（輸入中的網址，沒有請填空字串）"
+            "與 wants_report（是否要求整理成案例/報告）；其他功能填空物件。\n"
+        )
+
+    @staticmethod
+    def _parse_slots(capability: str, raw_slots: object) -> dict:
+        if not isinstance(raw_slots, dict):
+            return {}
+        allowed = SLOT_FIELDS.get(capability, ())
+        return {key: raw_slots[key] for key in allowed if key in raw_slots}
+
     def _build_decision(self, parsed: dict) -> IntentDecision:
         capability = str(parsed.get("capability", "")).strip() or "direct_reply"
         missing_inputs = parsed.get("missing_inputs", [])
@@ -112,6 +353,7 @@ class IntentRouter:
             needs_clarification=needs_clarification,
             confidence=confidence,
             reason=reason,
+            slots=self._parse_slots(capability, parsed.get("slots")),
         )
 
     @staticmethod
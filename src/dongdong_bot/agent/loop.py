@@ -1,12 +1,18 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+import asyncio
 import json
 import time
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from dongdong_bot.lib.llm_usage import call_site
+from dongdong_bot.metrics import NULL_METRICS, MetricsRegistry
+from dongdong_bot.tracing import span
+
 
 IntentClassifierFn = Callable[[str], tuple[str | None, float]]
+DeltaFn = Callable[[str], None]
 INTENT_SCORE_THRESHOLD = 0.78
 INTENT_SCORE_OVERRIDES = {
     "memory_query": 0.65,
@@ -52,9 +58,11 @@ class GoapEngine:
         max_iters_cap: int = 6,
         no_progress_limit: int = 3,
         json_retry_limit: int = 1,
-        perf_log: bool = False,
+        async_llm_client=None,
+        metrics: MetricsRegistry | None = None,
     ) -> None:
         self.llm_client = llm_client
+        self.async_llm_client = async_llm_client
         self.model = model
         self.fast_model = fast_model
         self.intent_classifier = intent_classifier
@@ -63,25 +71,26 @@ class GoapEngine:
         self.max_iters_cap = max_iters_cap
         self.no_progress_limit = no_progress_limit
         self.json_retry_limit = json_retry_limit
-        self.perf_log = perf_log
+        self.metrics = metrics or NULL_METRICS
 
     def respond(
         self,
         user_text: str,
         forced_decision: str | None = None,
         forced_reason: str | None = None,
+        on_delta: DeltaFn | None = None,
     ) -> BotResponse:
         start_time = time.perf_counter()
         decision: str
         reason: Optional[str]
         if forced_decision:
             decision, reason = forced_decision, forced_reason
-            shortcut = self._shortcut_response(user_text, decision, reason, start_time)
+            shortcut = self._shortcut_response(user_text, decision, reason, start_time, on_delta)
             if shortcut is not None:
                 return shortcut
         elif self.shortcuts_enabled:
             decision, reason = self._route_intent(user_text)
-            shortcut = self._shortcut_response(user_text, decision, reason, start_time)
+            shortcut = self._shortcut_response(user_text, decision, reason, start_time, on_delta)
             if shortcut is not None:
                 return shortcut
         else:
@@ -139,23 +148,42 @@ class GoapEngine:
             memory_date=memory_date,
             memory_date_range=memory_date_range,
         )
-        if self.perf_log:
-            elapsed_ms = (time.perf_counter() - start_time) * 1000
-            print(f"[perf] goap.respond total_ms={elapsed_ms:.1f}")
+        self.metrics.observe("goap.respond", (time.perf_counter() - start_time) * 1000)
         return response
 
+    async def arespond(
+        self,
+        user_text: str,
+        forced_decision: str | None = None,
+        forced_reason: str | None = None,
+        on_delta: DeltaFn | None = None,
+    ) -> BotResponse:
+        # 直接回覆只需一次 LLM 呼叫，於事件迴圈上 await；多步 GOAP 仍交給執行緒跑同步版本。
+        if self.async_llm_client is None or forced_decision != "direct_reply":
+            return await asyncio.to_thread(
+                self.respond, user_text, forced_decision, forced_reason, on_delta
+            )
+        start_time = time.perf_counter()
+        reply = await self._adirect_reply(user_text, on_delta)
+        self.metrics.observe("goap.direct_reply", (time.perf_counter() - start_time) * 1000)
+        return BotResponse(
+            reply=reply,
+            stop_reason=None,
+            decision="direct_reply",
+            tool_reason=forced_reason,
+        )
+
     def _shortcut_response(
         self,
         user_text: str,
         decision: str,
         reason: Optional[str],
         start_time: float,
+        on_delta: DeltaFn | None = None,
     ) -> Optional[BotResponse]:
         if self._should_direct_reply(user_text, decision):
-            reply = self._direct_reply(user_text)
-            if self.perf_log:
-                elapsed_ms = (time.perf_counter() - start_time) * 1000
-                print(f"[perf] goap.direct_reply total_ms={elapsed_ms:.1f}")
+            reply = self._direct_reply(user_text, on_delta)
+            self.metrics.observe("goap.direct_reply", (time.perf_counter() - start_time) * 1000)
             return BotResponse(
                 reply=reply,
                 stop_reason=None,
@@ -188,9 +216,7 @@ class GoapEngine:
                 "這個問題需要即時工具或外部資料，但目前工具尚未啟用。"
                 "若你希望我改用一般知識回答，請告訴我。"
             )
-            if self.perf_log:
-                elapsed_ms = (time.perf_counter() - start_time) * 1000
-                print(f"[perf] goap.tool_stub total_ms={elapsed_ms:.1f}")
+            self.metrics.observe("goap.tool_stub", (time.perf_counter() - start_time) * 1000)
             return BotResponse(
                 reply=reply,
                 stop_reason=None,
@@ -228,10 +254,9 @@ class GoapEngine:
     def _next_step(self, user_text: str, history: List[StepResult]) -> StepResult:
         prompt = self._build_prompt(user_text, history)
         step_start = time.perf_counter()
-        parsed = self._request_json(prompt)
-        if self.perf_log:
-            step_ms = (time.perf_counter() - step_start) * 1000
-            print(f"[perf] goap.step total_ms={step_ms:.1f} history_len={len(history)}")
+        with span("goap.step", step=len(history) + 1):
+            parsed = self._request_json(prompt)
+        self.metrics.observe("goap.step", (time.perf_counter() - step_start) * 1000)
 
         return StepResult(
             goal=parsed.get("goal", "理解使用者需求"),
@@ -246,18 +271,52 @@ class GoapEngine:
             memory_date_range=parsed.get("memory_date_range") or None,
         )
 
-    def _direct_reply(self, user_text: str) -> str:
-        prompt = (
+    def _direct_reply(self, user_text: str, on_delta: DeltaFn | None = None) -> str:
+        prompt = self._direct_reply_prompt(user_text)
+        start = time.perf_counter()
+        with call_site("direct_reply"):
+            if on_delta is not None and hasattr(self.llm_client, "generate_stream"):
+                reply = self._stream_reply(prompt, on_delta, start).strip()
+            else:
+                reply = self.llm_client.generate(model=self.fast_model, prompt=prompt).strip()
+        self.metrics.observe("llm.direct_reply", (time.perf_counter() - start) * 1000)
+        return reply or "我已理解你的需求。"
+
+    async def _adirect_reply(self, user_text: str, on_delta: DeltaFn | None = None) -> str:
+        prompt = self._direct_reply_prompt(user_text)
+        start = time.perf_counter()
+        with call_site("direct_reply"):
+            if on_delta is not None and hasattr(self.async_llm_client, "generate_stream"):
+                chunks: List[str] = []
+                async for chunk in self.async_llm_client.generate_stream(model=self.fast_model, prompt=prompt):
+                    self._on_chunk(chunk, chunks, on_delta, start)
+                reply = "".join(chunks).strip()
+            else:
+                reply = (await self.async_llm_client.generate(model=self.fast_model, prompt=prompt)).strip()
+        self.metrics.observe("llm.direct_reply", (time.perf_counter() - start) * 1000)
+        return reply or "我已理解你的需求。"
+
+    @staticmethod
+    def _direct_reply_prompt(user_text: str) -> str:
+        return (
             "你是 Telegram 個人助理，請直接回覆使用者的問題。\n"
             "回覆需簡潔、清楚，且避免要求多輪確認。\n\n"
             f"使用者輸入: {user_text}\n"
         )
-        start = time.perf_counter()
-        reply = self.llm_client.generate(model=self.fast_model, prompt=prompt).strip()
-        if self.perf_log:
-            elapsed_ms = (time.perf_counter() - start) * 1000
-            print(f"[perf] goap.direct_reply.total_ms={elapsed_ms:.1f}")
-        return reply or "我已理解你的需求。"
+
+    def _stream_reply(self, prompt: str, on_delta: DeltaFn, start: float) -> str:
+        chunks: List[str] = []
+        for chunk in self.llm_client.generate_stream(model=self.fast_model, prompt=prompt):
+            self._on_chunk(chunk, chunks, on_delta, start)
+        return "".join(chunks)
+
+    def _on_chunk(self, chunk: str, chunks: List[str], on_delta: DeltaFn, start: float) -> None:
+        if not chunk:
+            return
+        if not chunks:
+            self.metrics.observe("llm.direct_reply.first_token", (time.perf_counter() - start) * 1000)
+        chunks.append(chunk)
+        on_delta(chunk)
 
     @staticmethod
     def _extract_memory_content(user_text: str) -> Optional[str]:
@@ -304,10 +363,9 @@ class GoapEngine:
         last_raw = ""
         for attempt in range(self.json_retry_limit + 1):
             call_start = time.perf_counter()
-            raw = self.llm_client.generate(model=self.model, prompt=prompt)
-            if self.perf_log:
-                call_ms = (time.perf_counter() - call_start) * 1000
-                print(f"[perf] openai.generate attempt={attempt + 1} ms={call_ms:.1f}")
+            with call_site("goap_step"):
+                raw = self.llm_client.generate(model=self.model, prompt=prompt)
+            self.metrics.observe("llm.goap_step", (time.perf_counter() - call_start) * 1000)
             last_raw = raw
             parsed = self._parse_json(raw)
             if parsed is not None:
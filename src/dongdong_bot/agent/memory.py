@@ -2,13 +2,28 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from typing import Callable, Iterable, List, Sequence
 from datetime import datetime, timedelta
 import json
+import re
+import threading
 from uuid import uuid4
 
+from dongdong_bot.lib.keyword_index import KeywordIndex
 from dongdong_bot.lib.report_writer import ReportWriter
-from dongdong_bot.lib.vector_math import cosine_similarity, top_k_scored
+from dongdong_bot.lib.vector_index import VectorIndex
+
+
+BACKFILL_STATE_FILENAME = "backfill.json"
+BACKFILL_BATCH_SIZE = 64
+KEYWORD_INDEX_FILENAME = "memory_index.jsonl"
+_DAY_FILE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+EmbedManyFn = Callable[[Sequence[str]], List[List[float]]]
+# 每個 day file 的回填狀態：(已索引到的位元組游標, 游標之後已由 save_with_embedding 索引的行首位移)
+BackfillState = dict[str, tuple[int, set[int]]]
+# (狀態鍵, day file, 讀取時的狀態, 已讀到的完整行結尾, 待嵌入的 (行首位移, 內容))
+_PendingBackfill = tuple[str, Path, "tuple[int, set[int]] | None", int, List[tuple[int, str]]]
 
 
 @dataclass
@@ -24,6 +39,8 @@ class MemoryStore:
         embedding_index_path: str | None = None,
         memory_subdir: str = "memory",
         reports_subdir: str = "reports",
+        vector_index_path: str | None = None,
+        keyword_index_path: str | None = None,
     ) -> None:
         self.root_dir = Path(base_dir)
         self.memory_dir = self.root_dir / memory_subdir
@@ -37,7 +54,19 @@ class MemoryStore:
         )
         self.embedding_index_path.parent.mkdir(parents=True, exist_ok=True)
         self._ensure_writable(self.embedding_index_path.parent)
+        self.vector_index = VectorIndex(
+            vector_index_path or self.root_dir / "vector_index"
+        )
+        self._backfill_state_path = self.vector_index.path / BACKFILL_STATE_FILENAME
+        # 保護 backfill.json 的讀改寫；刪除記憶時遞增 generation，讓進行中的回填放棄結果。
+        self._backfill_lock = threading.RLock()
+        self._backfill_run_lock = threading.Lock()
+        self._backfill_generation = 0
         self._legacy_dir = self.root_dir
+        self.keyword_index = KeywordIndex(
+            keyword_index_path or self.root_dir / KEYWORD_INDEX_FILENAME
+        )
+        self._sync_keyword_index()
 
     @staticmethod
     def _ensure_writable(path: Path) -> None:
@@ -54,16 +83,18 @@ class MemoryStore:
 
     def log_report(self, title: str, report_path: Path, date: str | None = None) -> Path:
         date = date or datetime.now().strftime("%Y-%m-%d")
-        path = self._file_path(date)
-        with path.open("a", encoding="utf-8") as handle:
-            handle.write(ReportWriter.format_log_entry(title, report_path, self.root_dir) + "\n")
-        return path
+        return self._append_line(date, ReportWriter.format_log_entry(title, report_path, self.root_dir) + "\n")
 
     def save(self, content: str, date: str | None = None) -> Path:
         date = date or datetime.now().strftime("%Y-%m-%d")
+        return self._append_line(date, f"- {content.strip()}\n")
+
+    def _append_line(self, date: str, text: str) -> Path:
         path = self._file_path(date)
+        size_before = path.stat().st_size if path.exists() else 0
         with path.open("a", encoding="utf-8") as handle:
-            handle.write(f"- {content.strip()}\n")
+            handle.write(text)
+        self.keyword_index.record_append(self._backfill_key(path), date, 0, path, size_before, text)
         return path
 
     def save_with_embedding(
@@ -73,81 +104,240 @@ class MemoryStore:
         date: str | None = None,
     ) -> Path:
         date = date or datetime.now().strftime("%Y-%m-%d")
-        path = self.save(content, date=date)
-        record = {
-            "id": uuid4().hex,
-            "date": date,
-            "content": content.strip(),
-            "vector": list(embedding),
-            "created_at": datetime.now().isoformat(),
-        }
-        with self.embedding_index_path.open("a", encoding="utf-8") as handle:
-            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._sync_vector_index()
+        cleaned = content.strip()
+        path = self._file_path(date)
+        key = self._backfill_key(path)
+        with self._backfill_lock:
+            self.vector_index.append(
+                uuid4().hex,
+                date,
+                cleaned,
+                embedding,
+                noise=self._is_noise_content(cleaned),
+            )
+            size_before = path.stat().st_size if path.exists() else 0
+            self.save(content, date=date)
+            # 游標剛好在這行之前就直接推進；否則記下行首位移，回填時略過這行。
+            state = self._load_backfill_state()
+            cursor, indexed = state.get(key, (0, set()))
+            if cursor == size_before:
+                state[key] = (path.stat().st_size, indexed)
+            elif key in state:
+                state[key] = (cursor, indexed | {size_before})
+            else:
+                return path
+            self._write_backfill_state(state)
         return path
 
+    def backfill_embeddings(self, embed_many: EmbedManyFn, max_entries: int = 500) -> int:
+        # 將只寫入 Markdown（例如嵌入失敗時的 save()）的記憶補進向量索引；
+        # 只讀每個檔案游標之後新增的行，嵌入在鎖外進行，寫回前確認期間沒有刪除。
+        with self._backfill_run_lock:
+            with self._backfill_lock:
+                generation = self._backfill_generation
+                state = self._load_backfill_state()
+                pending = self._collect_backfill(state, max_entries)
+            if not pending:
+                return 0
+            vectors = [self._embed_lines(embed_many, lines) for _key, _path, _expected, _end, lines in pending]
+            with self._backfill_lock:
+                if generation != self._backfill_generation:
+                    return 0
+                return self._apply_backfill(pending, vectors)
+
+    def _collect_backfill(self, state: BackfillState, max_entries: int) -> List[_PendingBackfill]:
+        changed: List[tuple[Path, int]] = []
+        for path in self._day_files():
+            entry = state.get(self._backfill_key(path))
+            size = path.stat().st_size
+            if entry is None or entry[0] != size:
+                changed.append((path, size))
+        if not changed:
+            return []
+        # 沒有游標（首次回填、刪除後或檔案被截短）的檔案才需要比對既有索引去重。
+        fresh_dates = {
+            path.stem
+            for path, size in changed
+            if self._is_fresh(state.get(self._backfill_key(path)), size)
+        }
+        self._sync_vector_index()
+        seen = (
+            {(record.date, record.content) for record in self.vector_index.records() if record.date in fresh_dates}
+            if fresh_dates
+            else set()
+        )
+        pending: List[_PendingBackfill] = []
+        total = 0
+        for path, size in changed:
+            key = self._backfill_key(path)
+            expected = state.get(key)
+            fresh = self._is_fresh(expected, size)
+            cursor, indexed = (0, set()) if fresh else expected
+            with path.open("rb") as handle:
+                handle.seek(cursor)
+                data = handle.read(size - cursor)
+            end = cursor + data.rfind(b"\n") + 1
+            lines: List[tuple[int, str]] = []
+            offset = cursor
+            for raw in data[: end - cursor].splitlines(keepends=True):
+                line_offset, offset = offset, offset + len(raw)
+                if line_offset in indexed:
+                    continue
+                content = raw.decode("utf-8", errors="replace").lstrip("- ").strip()
+                if not content:
+                    continue
+                if fresh:
+                    if (path.stem, content) in seen:
+                        continue
+                    seen.add((path.stem, content))
+                lines.append((line_offset, content))
+            if total and total + len(lines) > max_entries:
+                break
+            total += len(lines)
+            pending.append((key, path, expected, end, lines))
+        return pending
+
+    @staticmethod
+    def _is_fresh(entry: tuple[int, set[int]] | None, size: int) -> bool:
+        return entry is None or entry[0] > size
+
+    @staticmethod
+    def _embed_lines(embed_many: EmbedManyFn, lines: List[tuple[int, str]]) -> List[List[float]]:
+        contents = [content for _offset, content in lines]
+        vectors: List[List[float]] = []
+        for start in range(0, len(contents), BACKFILL_BATCH_SIZE):
+            batch = contents[start : start + BACKFILL_BATCH_SIZE]
+            result = embed_many(batch)
+            vectors.extend(result[idx] if idx < len(result) else [] for idx in range(len(batch)))
+        return vectors
+
+    def _apply_backfill(self, pending: List[_PendingBackfill], vectors: List[List[List[float]]]) -> int:
+        state = self._load_backfill_state()
+        added = 0
+        for (key, path, expected, end, lines), embedded in zip(pending, vectors):
+            # 嵌入期間有其他寫入推進過游標就整檔略過，下次再比對。
+            if state.get(key) != expected:
+                continue
+            fresh = self._is_fresh(expected, end)
+            indexed = set() if fresh else set(expected[1])
+            next_cursor = end
+            for (offset, content), vector in zip(lines, embedded):
+                # 嵌入失敗（空向量）的行不寫入索引，游標停在第一個失敗行，下次再補。
+                if not vector:
+                    next_cursor = min(next_cursor, offset)
+                    continue
+                self.vector_index.append(
+                    uuid4().hex,
+                    path.stem,
+                    content,
+                    vector,
+                    noise=self._is_noise_content(content),
+                )
+                indexed.add(offset)
+                added += 1
+            if fresh and (path.stat().st_size if path.exists() else -1) != end:
+                # 無游標的檔案在嵌入期間又有寫入，無法得知新行是否已索引，保持無游標。
+                state.pop(key, None)
+                continue
+            state[key] = (next_cursor, {offset for offset in indexed if offset >= next_cursor})
+        self._write_backfill_state(state)
+        return added
+
+    def import_embeddings(self, path: str | None = None) -> int:
+        source = Path(path) if path else self.embedding_index_path
+        return self.vector_index.import_jsonl(source, noise_fn=self._is_noise_content)
+
+    def export_embeddings(self, path: str | None = None) -> int:
+        target = Path(path) if path else self.embedding_index_path
+        exported = self.vector_index.export_jsonl(target)
+        if target == self.embedding_index_path:
+            self.vector_index.mark_imported(target)
+        return exported
+
     def delete_all(self) -> int:
-        removed = 0
-        for path in self.memory_dir.glob("*.md"):
-            removed += self._count_entries(path)
-            path.unlink(missing_ok=True)
-        if self.embedding_index_path.exists():
-            removed += self._count_embedding_entries(self.embedding_index_path)
+        with self._backfill_lock:
+            self._backfill_generation += 1
+            removed = 0
+            for path in self.memory_dir.glob("*.md"):
+                removed += self._count_entries(path)
+                path.unlink(missing_ok=True)
+            self._sync_vector_index()
+            removed += self.vector_index.clear()
             self.embedding_index_path.unlink(missing_ok=True)
-        return removed
+            self._backfill_state_path.unlink(missing_ok=True)
+            self._sync_keyword_index()
+            return removed
 
     def delete_by_date_range(self, start: str, end: str) -> int:
-        removed = 0
-        dates = set(self._date_range(start, end))
-        for date in dates:
-            path = self._file_path(date)
-            if path.exists():
-                removed += self._count_entries(path)
-                path.unlink(missing_ok=True)
-        removed += self._filter_embedding_index(
-            lambda record: str(record.get("date")) not in dates
-        )
-        return removed
+        with self._backfill_lock:
+            self._backfill_generation += 1
+            removed = 0
+            dates = set(self._date_range(start, end))
+            for date in dates:
+                path = self._file_path(date)
+                if path.exists():
+                    removed += self._count_entries(path)
+                    path.unlink(missing_ok=True)
+            self._forget_backfill(dates)
+            self._sync_keyword_index()
+            removed += self._filter_embedding_index(
+                lambda record: str(record.get("date")) not in dates,
+                lambda record: record.date not in dates,
+            )
+            return removed
 
     def delete_by_keyword(self, keyword: str, start: str | None = None, end: str | None = None) -> int:
         keyword = keyword.strip()
         if not keyword:
             return 0
+        with self._backfill_lock:
+            self._backfill_generation += 1
+            return self._delete_by_keyword(keyword, start, end)
+
+    def _delete_by_keyword(self, keyword: str, start: str | None, end: str | None) -> int:
         removed = 0
         target_dates = None
         if start and end:
             target_dates = set(self._date_range(start, end))
+        state = self._load_backfill_state()
+        state_changed = False
         for path in self.memory_dir.glob("*.md"):
             date = path.stem
             if target_dates is not None and date not in target_dates:
                 continue
+            size_before = path.stat().st_size
             lines = path.read_text(encoding="utf-8").splitlines()
             kept = [line for line in lines if keyword not in line]
+            if len(kept) == len(lines):
+                continue
             removed += len(lines) - len(kept)
             if kept:
                 path.write_text("\n".join(kept) + "\n", encoding="utf-8")
             else:
                 path.unlink(missing_ok=True)
+            # 原本已完整回填的檔案刪行後仍完整，直接改游標；否則整檔重新比對。
+            key = self._backfill_key(path)
+            if kept and state.get(key) == (size_before, set()):
+                state[key] = (path.stat().st_size, set())
+            else:
+                state.pop(key, None)
+            state_changed = True
+        if state_changed:
+            self._write_backfill_state(state)
+        self._sync_keyword_index()
         removed += self._filter_embedding_index(
-            lambda record: not self._should_remove_record(record, keyword, target_dates)
+            lambda record: not self._should_remove_record(record, keyword, target_dates),
+            lambda record: not self._should_remove_record(
+                {"content": record.content, "date": record.date}, keyword, target_dates
+            ),
         )
         return removed
 
     def query(self, query: str, date: str | None = None) -> List[str]:
         date = date or datetime.now().strftime("%Y-%m-%d")
-        path = self._file_path(date)
-        legacy_path = self._legacy_dir / f"{date}.md"
-        if not path.exists() and not legacy_path.exists():
-            return []
-        results = []
-        if path.exists():
-            for line in path.read_text(encoding="utf-8").splitlines():
-                if query in line:
-                    results.append(line.lstrip("- "))
-        if legacy_path.exists():
-            for line in legacy_path.read_text(encoding="utf-8").splitlines():
-                if query in line:
-                    results.append(line.lstrip("- "))
-        return results
+        self._refresh_keyword_index([date])
+        return self.keyword_index.search(query, [date])
 
     def semantic_search(
         self,
@@ -155,26 +345,14 @@ class MemoryStore:
         top_k: int = 5,
         min_score: float = 0.2,
     ) -> List[tuple[str, float]]:
-        if not self.embedding_index_path.exists():
-            return []
-        scored: List[tuple[str, float]] = []
-        for line in self.embedding_index_path.read_text(encoding="utf-8").splitlines():
-            if not line.strip():
-                continue
-            try:
-                record = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-            vector = record.get("vector")
-            content = record.get("content", "")
-            if not vector or not content:
-                continue
-            if self._is_noise_content(content):
-                continue
-            score = cosine_similarity(query_embedding, vector)
-            if score >= min_score:
-                scored.append((content, score))
-        return self._dedupe(top_k_scored(scored, top_k))
+        self._sync_vector_index()
+        hits = self.vector_index.search(query_embedding, top_k=top_k, min_score=min_score)
+        scored = [
+            (record.content, score)
+            for record, score in hits
+            if record.content and not self._is_noise_content(record.content)
+        ]
+        return self._dedupe(scored)
 
     @staticmethod
     def filter_by_score(
@@ -189,10 +367,9 @@ class MemoryStore:
         return [(content, score) for content, score in results if score >= cutoff]
 
     def query_range(self, query: str, start: str, end: str) -> List[str]:
-        results: List[str] = []
-        for date in self._date_range(start, end):
-            results.extend(self.query(query, date=date))
-        return results
+        dates = list(self._date_range(start, end))
+        self._refresh_keyword_index(dates)
+        return self.keyword_index.search(query, dates)
 
     def summarize_results(
         self,
@@ -223,20 +400,16 @@ class MemoryStore:
         max_entries: int = 200,
     ) -> List[str]:
         today = datetime.now()
+        dates = [(today - timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(days)]
+        self._refresh_keyword_index(dates)
         entries: List[str] = []
-        for offset in range(days):
-            date_str = (today - timedelta(days=offset)).strftime("%Y-%m-%d")
-            path = self._file_path(date_str)
-            legacy_path = self._legacy_dir / f"{date_str}.md"
-            for candidate in (path, legacy_path):
-                if not candidate.exists():
+        for date_str in dates:
+            for line in self.keyword_index.lines(date_str):
+                if not line.strip():
                     continue
-                for line in candidate.read_text(encoding="utf-8").splitlines():
-                    if not line.strip():
-                        continue
-                    entries.append(line.lstrip("- ").strip())
-                    if len(entries) >= max_entries:
-                        return entries
+                entries.append(line.lstrip("- ").strip())
+                if len(entries) >= max_entries:
+                    return entries
         return entries
 
     def _date_range(self, start: str, end: str) -> Iterable[str]:
@@ -277,14 +450,83 @@ class MemoryStore:
         except FileNotFoundError:
             return 0
 
-    @staticmethod
-    def _count_embedding_entries(path: Path) -> int:
+    def _day_files(self) -> List[Path]:
+        files = []
+        for directory in (self.memory_dir, self._legacy_dir):
+            for path in sorted(directory.glob("*.md")):
+                if _DAY_FILE_PATTERN.match(path.stem):
+                    files.append(path)
+        return files
+
+    def _sync_keyword_index(self) -> None:
+        # day file 可能在程式外被修改；啟動與刪除後依檔案大小比對，只重讀有變動的檔案。
+        self.keyword_index.sync(
+            (self._backfill_key(path), path.stem, 0 if path.parent == self.memory_dir else 1, path)
+            for path in self._day_files()
+        )
+
+    def _refresh_keyword_index(self, dates: Iterable[str]) -> None:
+        # 其他行程（例如 memory_admin）可能刪改過記憶：先比對索引檔簽章，
+        # 再只 stat 這次要回答的日期的 day file，不讀未變動的檔案。
+        self.keyword_index.reload_if_changed()
+        self.keyword_index.sync(
+            (
+                (self._backfill_key(directory / f"{date}.md"), date, rank, directory / f"{date}.md")
+                for date in dates
+                for rank, directory in enumerate((self.memory_dir, self._legacy_dir))
+            ),
+            complete=False,
+        )
+
+    def _backfill_key(self, path: Path) -> str:
+        return path.relative_to(self.root_dir).as_posix()
+
+    def _forget_backfill(self, dates: set[str]) -> None:
+        state = self._load_backfill_state()
+        kept = {key: value for key, value in state.items() if Path(key).stem not in dates}
+        if len(kept) != len(state):
+            self._write_backfill_state(kept)
+
+    def _load_backfill_state(self) -> BackfillState:
+        if not self._backfill_state_path.exists():
+            return {}
         try:
-            return sum(1 for line in path.read_text(encoding="utf-8").splitlines() if line.strip())
-        except FileNotFoundError:
-            return 0
+            data = json.loads(self._backfill_state_path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        state: BackfillState = {}
+        for key, value in data.items():
+            if isinstance(value, int):
+                state[str(key)] = (value, set())
+            elif isinstance(value, dict) and isinstance(value.get("size"), int):
+                offsets = value.get("indexed") or []
+                state[str(key)] = (value["size"], {int(offset) for offset in offsets if isinstance(offset, int)})
+        return state
+
+    def _write_backfill_state(self, state: BackfillState) -> None:
+        payload = {
+            key: cursor if not indexed else {"size": cursor, "indexed": sorted(indexed)}
+            for key, (cursor, indexed) in state.items()
+        }
+        tmp_path = self._backfill_state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(self._backfill_state_path)
+
+    def _sync_vector_index(self) -> None:
+        # JSONL 只作為匯入/匯出格式；檔案有變動時才把新紀錄併入二進位索引。
+        if self.vector_index.needs_import(self.embedding_index_path):
+            self.import_embeddings()
+
+    def _filter_embedding_index(self, keep_fn, keep_record_fn) -> int:
+        self._sync_vector_index()
+        removed = self.vector_index.rewrite(keep_record_fn)
+        if self._filter_embedding_jsonl(keep_fn):
+            self.vector_index.mark_imported(self.embedding_index_path)
+        return removed
 
-    def _filter_embedding_index(self, keep_fn) -> int:
+    def _filter_embedding_jsonl(self, keep_fn) -> int:
         if not self.embedding_index_path.exists():
             return 0
         kept = []
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
-import json
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+import heapq
 from uuid import uuid4
 
+from dongdong_bot.lib.record_journal import RecordJournal
+
 
 @dataclass
 class Reminder:
@@ -37,12 +40,54 @@ class Reminder:
 
 
 class ReminderStore:
+    # 與 ScheduleStore 相同採快照 + 日誌；待發提醒另以 (trigger_time, reminder_id)
+    # 最小堆積排序，狀態改變後的舊項目在彈出時才略過（lazy deletion）。
     def __init__(self, path: str) -> None:
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._journal = RecordJournal(self.path, "reminder_id")
+        self._lock = Lock()
+        self._loaded = False
+        self._items: Dict[str, Reminder] = {}
+        self._pending: Dict[str, None] = {}
+        self._heap: List[tuple[datetime, str]] = []
 
     def list_pending(self) -> List[Reminder]:
-        return [reminder for reminder in self._load() if reminder.status == "pending"]
+        with self._lock:
+            self._ensure_loaded()
+            return [replace(self._items[reminder_id]) for reminder_id in self._pending]
+
+    def pop_due(self, now: datetime) -> List[Reminder]:
+        due: List[Reminder] = []
+        seen: set[str] = set()
+        with self._lock:
+            self._ensure_loaded()
+            while self._heap and self._heap[0][0] <= now:
+                trigger_time, reminder_id = heapq.heappop(self._heap)
+                if self._is_live(trigger_time, reminder_id) and reminder_id not in seen:
+                    seen.add(reminder_id)
+                    due.append(replace(self._items[reminder_id]))
+        return due
+
+    def requeue(self, reminder_ids: Iterable[str]) -> int:
+        # 把 pop_due 彈出但未寫回結果的提醒放回堆積；已不是 pending 的略過。
+        requeued = 0
+        with self._lock:
+            self._ensure_loaded()
+            for reminder_id in dict.fromkeys(reminder_ids):
+                reminder = self._items.get(reminder_id)
+                if reminder is None or reminder.status != "pending":
+                    continue
+                heapq.heappush(self._heap, (reminder.trigger_time, reminder_id))
+                requeued += 1
+        return requeued
+
+    def next_trigger_time(self) -> Optional[datetime]:
+        with self._lock:
+            self._ensure_loaded()
+            while self._heap and not self._is_live(*self._heap[0]):
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
 
     def create(self, schedule_id: str, trigger_time: datetime) -> Reminder:
         reminder = Reminder(
@@ -52,10 +97,10 @@ class ReminderStore:
             status="pending",
             last_error="",
         )
-        reminders = self._load()
-        reminders.append(reminder)
-        self._write(reminders)
-        return reminder
+        with self._lock:
+            self._ensure_loaded()
+            self._commit([reminder])
+        return replace(reminder)
 
     def mark_sent(self, reminder_id: str) -> None:
         self._update_status(reminder_id, "sent")
@@ -64,55 +109,89 @@ class ReminderStore:
         self._update_status(reminder_id, "failed", error)
 
     def invalidate_pending_by_schedule(self, schedule_id: str, reason: str = "schedule_updated") -> int:
-        reminders = self._load()
-        updated = 0
-        for idx, reminder in enumerate(reminders):
-            if reminder.schedule_id != schedule_id or reminder.status != "pending":
-                continue
-            data = reminder.to_dict()
-            data["status"] = "failed"
-            data["last_error"] = reason
-            reminders[idx] = Reminder.from_dict(data)
-            updated += 1
-        if updated:
-            self._write(reminders)
-        return updated
+        with self._lock:
+            self._ensure_loaded()
+            changed = [
+                replace(self._items[reminder_id], status="failed", last_error=reason)
+                for reminder_id in self._pending
+                if self._items[reminder_id].schedule_id == schedule_id
+            ]
+            self._commit(changed)
+            return len(changed)
+
+    def update_statuses(self, updates: Iterable[tuple[str, str, str]]) -> int:
+        # 批次更新 (reminder_id, status, error)，整批只寫一次日誌。
+        with self._lock:
+            self._ensure_loaded()
+            changed: List[Reminder] = []
+            for reminder_id, status, error in updates:
+                reminder = self._items.get(reminder_id)
+                if reminder is None:
+                    continue
+                changed.append(replace(reminder, status=status, last_error=error))
+            self._commit(changed)
+            return len(changed)
 
     def _update_status(self, reminder_id: str, status: str, error: str = "") -> None:
-        reminders = self._load()
-        for idx, reminder in enumerate(reminders):
-            if reminder.reminder_id != reminder_id:
-                continue
-            data = reminder.to_dict()
-            data["status"] = status
-            data["last_error"] = error
-            reminders[idx] = Reminder.from_dict(data)
-            break
-        self._write(reminders)
+        self.update_statuses([(reminder_id, status, error)])
 
     def _load(self) -> List[Reminder]:
-        if not self.path.exists():
-            return []
-        try:
-            data = json.loads(self.path.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            return []
-        if not isinstance(data, list):
-            return []
+        with self._lock:
+            self._ensure_loaded()
+            return [replace(reminder) for reminder in self._items.values()]
+
+    def _write(self, reminders: List[Reminder]) -> None:
+        with self._lock:
+            self._reset([replace(reminder) for reminder in reminders])
+            self._journal.rewrite([reminder.to_dict() for reminder in self._items.values()])
+            self._loaded = True
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded and not self._journal.changed():
+            return
         reminders: List[Reminder] = []
-        for item in data:
-            if not isinstance(item, dict):
-                continue
-            if not item.get("trigger_time"):
+        for record in self._journal.load():
+            if not record.get("trigger_time"):
                 continue
             try:
-                reminders.append(Reminder.from_dict(item))
+                reminders.append(Reminder.from_dict(record))
             except (TypeError, ValueError):
                 continue
-        return reminders
+        self._reset(reminders)
+        self._loaded = True
 
-    def _write(self, reminders: List[Reminder]) -> None:
-        payload = [reminder.to_dict() for reminder in reminders]
-        tmp_path = self.path.with_suffix(".tmp")
-        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-        tmp_path.replace(self.path)
+    def _reset(self, reminders: List[Reminder]) -> None:
+        self._items = {}
+        self._pending = {}
+        self._heap = []
+        for reminder in reminders:
+            self._index(reminder)
+
+    def _index(self, reminder: Reminder) -> None:
+        self._items[reminder.reminder_id] = reminder
+        if reminder.status != "pending":
+            self._pending.pop(reminder.reminder_id, None)
+            return
+        self._pending.setdefault(reminder.reminder_id, None)
+        heapq.heappush(self._heap, (reminder.trigger_time, reminder.reminder_id))
+
+    def _is_live(self, trigger_time: datetime, reminder_id: str) -> bool:
+        reminder = self._items.get(reminder_id)
+        return (
+            reminder is not None
+            and reminder.status == "pending"
+            and reminder.trigger_time == trigger_time
+        )
+
+    def _commit(self, reminders: List[Reminder]) -> None:
+        # 先寫入磁碟，成功後才更新記憶體索引；寫入失敗時仍是 pending，release 才能放回堆積。
+        if not reminders:
+            return
+        live = len(self._items) + sum(1 for reminder in reminders if reminder.reminder_id not in self._items)
+        if self._journal.needs_compaction(live):
+            records = {**self._items, **{reminder.reminder_id: reminder for reminder in reminders}}
+            self._journal.rewrite([reminder.to_dict() for reminder in records.values()])
+        else:
+            self._journal.append(puts=[reminder.to_dict() for reminder in reminders])
+        for reminder in reminders:
+            self._index(reminder)
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
-import json
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
 from uuid import uuid4
 
+from dongdong_bot.lib.record_journal import RecordJournal
+
 
 @dataclass
 class ScheduleItem:
@@ -54,18 +56,42 @@ class ScheduleItem:
 
 
 class ScheduleStore:
+    # 啟動時載入快照與日誌到記憶體，並維護 schedule_id / user_id / status 索引；
+    # 變動只追加日誌，不再每次重寫整個 schedules.json。
     def __init__(self, path: str) -> None:
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._journal = RecordJournal(self.path, "schedule_id")
+        self._lock = Lock()
+        self._loaded = False
+        self._items: Dict[str, ScheduleItem] = {}
+        self._by_user: Dict[str, Dict[str, None]] = {}
+        self._by_status: Dict[str, Dict[str, None]] = {}
 
     def list(self, user_id: str) -> List[ScheduleItem]:
-        return [item for item in self._load() if item.user_id == user_id]
+        with self._lock:
+            self._ensure_loaded()
+            return [replace(self._items[schedule_id]) for schedule_id in self._by_user.get(user_id, {})]
+
+    def list_by_status(self, status: str) -> List[ScheduleItem]:
+        with self._lock:
+            self._ensure_loaded()
+            return [replace(self._items[schedule_id]) for schedule_id in self._by_status.get(status, {})]
 
     def get(self, schedule_id: str) -> Optional[ScheduleItem]:
-        for item in self._load():
-            if item.schedule_id == schedule_id:
-                return item
-        return None
+        with self._lock:
+            self._ensure_loaded()
+            item = self._items.get(schedule_id)
+            return replace(item) if item else None
+
+    def get_many(self, schedule_ids: Iterable[str]) -> Dict[str, ScheduleItem]:
+        with self._lock:
+            self._ensure_loaded()
+            return {
+                schedule_id: replace(self._items[schedule_id])
+                for schedule_id in schedule_ids
+                if schedule_id in self._items
+            }
 
     def create(
         self,
@@ -89,31 +115,19 @@ class ScheduleStore:
             status="scheduled",
             completed_at=None,
         )
-        items = self._load()
-        items.append(schedule)
-        self._write(items)
-        return schedule
+        with self._lock:
+            self._ensure_loaded()
+            self._commit(puts=[schedule])
+        return replace(schedule)
 
     def update(self, schedule_id: str, **fields) -> Optional[ScheduleItem]:
-        items = self._load()
-        updated = None
-        for idx, item in enumerate(items):
-            if item.schedule_id != schedule_id:
-                continue
-            data = item.to_dict()
-            for key, value in fields.items():
-                if value is None:
-                    continue
-                if key in {"start_time", "end_time", "completed_at"} and isinstance(value, datetime):
-                    data[key] = value.isoformat()
-                elif key in data:
-                    data[key] = value
-            updated = ScheduleItem.from_dict(data)
-            items[idx] = updated
-            break
-        if updated:
-            self._write(items)
-        return updated
+        with self._lock:
+            self._ensure_loaded()
+            updated = self._build_update(schedule_id, fields)
+            if updated is None:
+                return None
+            self._commit(puts=[updated])
+            return replace(updated)
 
     def cancel(self, schedule_id: str) -> Optional[ScheduleItem]:
         return self.update(schedule_id, status="cancelled")
@@ -122,42 +136,110 @@ class ScheduleStore:
         completed_at = completed_at or datetime.now()
         return self.update(schedule_id, status="completed", completed_at=completed_at)
 
+    def complete_many(self, schedule_ids: Iterable[str], completed_at: datetime | None = None) -> int:
+        completed_at = completed_at or datetime.now()
+        with self._lock:
+            self._ensure_loaded()
+            updated = [
+                item
+                for item in (
+                    self._build_update(schedule_id, {"status": "completed", "completed_at": completed_at})
+                    for schedule_id in dict.fromkeys(schedule_ids)
+                )
+                if item is not None
+            ]
+            if updated:
+                self._commit(puts=updated)
+            return len(updated)
+
     def delete_completed(self, user_id: str) -> int:
-        items = self._load()
-        kept: List[ScheduleItem] = []
-        deleted = 0
-        for item in items:
-            if item.user_id == user_id and item.status == "completed":
-                deleted += 1
-                continue
-            kept.append(item)
-        if deleted:
-            self._write(kept)
-        return deleted
+        with self._lock:
+            self._ensure_loaded()
+            completed = self._by_status.get("completed", {})
+            doomed = [schedule_id for schedule_id in self._by_user.get(user_id, {}) if schedule_id in completed]
+            if doomed:
+                self._commit(deletes=doomed)
+            return len(doomed)
 
     def _load(self) -> List[ScheduleItem]:
-        if not self.path.exists():
-            return []
-        try:
-            data = json.loads(self.path.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            return []
-        if not isinstance(data, list):
-            return []
-        items: List[ScheduleItem] = []
-        for item in data:
-            if not isinstance(item, dict):
+        with self._lock:
+            self._ensure_loaded()
+            return [replace(item) for item in self._items.values()]
+
+    def _write(self, items: List[ScheduleItem]) -> None:
+        with self._lock:
+            self._reset([replace(item) for item in items])
+            self._journal.rewrite([item.to_dict() for item in self._items.values()])
+            self._loaded = True
+
+    def _build_update(self, schedule_id: str, fields: dict) -> Optional[ScheduleItem]:
+        item = self._items.get(schedule_id)
+        if item is None:
+            return None
+        data = item.to_dict()
+        for key, value in fields.items():
+            if value is None:
                 continue
-            if not item.get("start_time"):
+            if key in {"start_time", "end_time", "completed_at"} and isinstance(value, datetime):
+                data[key] = value.isoformat()
+            elif key in data:
+                data[key] = value
+        return ScheduleItem.from_dict(data)
+
+    def _ensure_loaded(self) -> None:
+        # 檔案被其他程序改寫時（大小或修改時間變動）重新載入。
+        if self._loaded and not self._journal.changed():
+            return
+        items: List[ScheduleItem] = []
+        for record in self._journal.load():
+            if not record.get("start_time"):
                 continue
             try:
-                items.append(ScheduleItem.from_dict(item))
+                items.append(ScheduleItem.from_dict(record))
             except (TypeError, ValueError):
                 continue
-        return items
+        self._reset(items)
+        self._loaded = True
 
-    def _write(self, items: List[ScheduleItem]) -> None:
-        payload = [item.to_dict() for item in items]
-        tmp_path = self.path.with_suffix(".tmp")
-        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-        tmp_path.replace(self.path)
+    def _reset(self, items: List[ScheduleItem]) -> None:
+        self._items = {}
+        self._by_user = {}
+        self._by_status = {}
+        for item in items:
+            self._index(item)
+
+    def _index(self, item: ScheduleItem) -> None:
+        previous = self._items.get(item.schedule_id)
+        if previous is not None:
+            if previous.status != item.status:
+                self._by_status.get(previous.status, {}).pop(item.schedule_id, None)
+            if previous.user_id != item.user_id:
+                self._by_user.get(previous.user_id, {}).pop(item.schedule_id, None)
+        self._items[item.schedule_id] = item
+        self._by_user.setdefault(item.user_id, {}).setdefault(item.schedule_id, None)
+        self._by_status.setdefault(item.status, {}).setdefault(item.schedule_id, None)
+
+    def _unindex(self, schedule_id: str) -> None:
+        item = self._items.get(schedule_id)
+        if item is None:
+            return
+        self._by_user.get(item.user_id, {}).pop(schedule_id, None)
+        self._by_status.get(item.status, {}).pop(schedule_id, None)
+
+    def _commit(self, puts: Iterable[ScheduleItem] = (), deletes: Iterable[str] = ()) -> None:
+        # 先寫入磁碟，成功後才更新記憶體索引；寫入失敗時索引維持原狀。
+        puts = list(puts)
+        deletes = [schedule_id for schedule_id in deletes if schedule_id in self._items]
+        live = len(self._items) + sum(1 for item in puts if item.schedule_id not in self._items) - len(deletes)
+        if self._journal.needs_compaction(live):
+            records = {**self._items, **{item.schedule_id: item for item in puts}}
+            for schedule_id in deletes:
+                records.pop(schedule_id, None)
+            self._journal.rewrite([item.to_dict() for item in records.values()])
+        else:
+            self._journal.append(puts=[item.to_dict() for item in puts], deletes=deletes)
+        for schedule_id in deletes:
+            self._unindex(schedule_id)
+            self._items.pop(schedule_id, None)
+        for item in puts:
+            self._index(item)
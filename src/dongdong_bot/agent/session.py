@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Dict, List
+from threading import Lock
+from typing import Callable, Deque, Dict, List
+
+from dongdong_bot.agent.session_journal import SessionJournal
+
+
+DEFAULT_MAX_SESSIONS = 10000
 
 
 @dataclass
@@ -10,41 +17,115 @@ class Session:
     user_id: str
     started_at: datetime
     last_active_at: datetime
-    messages: List[str] = field(default_factory=list)
+    messages: Deque[str] = field(default_factory=deque)
     pending_action: str | None = None
     pending_payload: Dict[str, str | int] = field(default_factory=dict)
 
 
 class SessionStore:
-    def __init__(self, ttl_minutes: int = 30, max_messages: int = 20) -> None:
+    # _sessions 依最後活動時間排序（touch 時移到尾端），過期的 session 一定集中在前端，
+    # 每次 touch 只需從前端清掉過期項目；數量超過 max_sessions 時再淘汰最久未活動的。
+    def __init__(
+        self,
+        ttl_minutes: int = 30,
+        max_messages: int = 20,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        now_fn: Callable[[], datetime] | None = None,
+        journal: SessionJournal | None = None,
+    ) -> None:
         self.ttl = timedelta(minutes=ttl_minutes)
         self.max_messages = max_messages
-        self._sessions: Dict[str, Session] = {}
+        self.max_sessions = max(1, max_sessions)
+        self._now_fn = now_fn or datetime.now
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._lock = Lock()
+        self.expired_evictions = 0
+        self.lru_evictions = 0
+        self._journal = journal
+        if journal is not None:
+            self._restore(journal.load())
+            journal.rewrite(self._snapshot())
+            journal.start(self.flush)
 
     def touch(self, user_id: str, text: str) -> Session:
-        now = datetime.now()
-        session = self._sessions.get(user_id)
-        if session is None or now - session.last_active_at > self.ttl:
-            session = Session(user_id=user_id, started_at=now, last_active_at=now)
-            self._sessions[user_id] = session
-        session.last_active_at = now
-        if text.strip():
-            session.messages.append(text.strip())
-            if len(session.messages) > self.max_messages:
-                session.messages = session.messages[-self.max_messages :]
+        now = self._now_fn()
+        with self._lock:
+            self._sweep(now)
+            session = self._sessions.get(user_id)
+            if session is None or now - session.last_active_at > self.ttl:
+                session = Session(
+                    user_id=user_id,
+                    started_at=now,
+                    last_active_at=now,
+                    messages=deque(maxlen=self.max_messages),
+                )
+                self._sessions[user_id] = session
+                self._record({"op": "start", "u": user_id, "t": now.isoformat()})
+            self._sessions.move_to_end(user_id)
+            session.last_active_at = now
+            entry = {"op": "touch", "u": user_id, "t": now.isoformat()}
+            if text.strip():
+                session.messages.append(text.strip())
+                entry["m"] = text.strip()
+            self._record(entry)
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                self._record({"op": "drop", "u": evicted})
+                self.lru_evictions += 1
         return session
 
     def get(self, user_id: str) -> Session | None:
-        session = self._sessions.get(user_id)
-        if session is None:
-            return None
-        if datetime.now() - session.last_active_at > self.ttl:
-            self._sessions.pop(user_id, None)
-            return None
-        return session
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                return None
+            if self._now_fn() - session.last_active_at > self.ttl:
+                self._sessions.pop(user_id, None)
+                self._record({"op": "drop", "u": user_id})
+                self.expired_evictions += 1
+                return None
+            return session
 
     def clear(self, user_id: str) -> None:
-        self._sessions.pop(user_id, None)
+        with self._lock:
+            if self._sessions.pop(user_id, None) is not None:
+                self._record({"op": "drop", "u": user_id})
+
+    def sweep(self) -> int:
+        with self._lock:
+            return self._sweep(self._now_fn())
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "live": len(self._sessions),
+                "expired_evictions": self.expired_evictions,
+                "lru_evictions": self.lru_evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def flush(self) -> None:
+        # 由 journal 的背景執行緒定期呼叫；日誌過長時以目前狀態重寫快照。
+        # 只有取快照與清空緩衝時持有 _lock，寫檔與 fsync 不會擋住 touch()。
+        if self._journal is None:
+            return
+        with self._lock:
+            compact = self._journal.needs_compaction(len(self._sessions))
+        if compact:
+            self._journal.compact(self._take_snapshot)
+            return
+        self._journal.flush()
+
+    def _take_snapshot(self) -> List[dict]:
+        with self._lock:
+            self._journal.discard_buffer()
+            return self._snapshot()
+
+    def close(self) -> None:
+        if self._journal is not None:
+            self._journal.close(self.flush)
 
     def set_pending_action(
         self,
@@ -55,8 +136,7 @@ class SessionStore:
         session = self.get(user_id)
         if session is None:
             session = self.touch(user_id, "")
-        session.pending_action = action
-        session.pending_payload = dict(payload or {})
+        self._set_pending(session, action, dict(payload or {}))
 
     def get_pending_action(self, user_id: str) -> tuple[str | None, Dict[str, str | int]]:
         session = self.get(user_id)
@@ -68,5 +148,81 @@ class SessionStore:
         session = self.get(user_id)
         if session is None:
             return
-        session.pending_action = None
-        session.pending_payload = {}
+        self._set_pending(session, None, {})
+
+    def _set_pending(self, session: Session, action: str | None, payload: Dict[str, str | int]) -> None:
+        with self._lock:
+            session.pending_action = action
+            session.pending_payload = payload
+            self._record({"op": "pending", "u": session.user_id, "a": action, "p": payload})
+
+    def _record(self, entry: dict) -> None:
+        if self._journal is not None:
+            self._journal.append(entry)
+
+    def _sweep(self, now: datetime) -> int:
+        removed = 0
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if now - session.last_active_at <= self.ttl:
+                break
+            del self._sessions[user_id]
+            self._record({"op": "drop", "u": user_id})
+            removed += 1
+        self.expired_evictions += removed
+        return removed
+
+    def _snapshot(self) -> List[dict]:
+        return [
+            {
+                "op": "session",
+                "u": session.user_id,
+                "s": session.started_at.isoformat(),
+                "t": session.last_active_at.isoformat(),
+                "m": list(session.messages),
+                "a": session.pending_action,
+                "p": session.pending_payload,
+            }
+            for session in self._sessions.values()
+        ]
+
+    def _restore(self, entries: List[dict]) -> None:
+        sessions: Dict[str, Session] = {}
+        for entry in entries:
+            try:
+                self._replay(sessions, entry)
+            except (KeyError, TypeError, ValueError):
+                continue
+        now = self._now_fn()
+        live = [item for item in sessions.values() if now - item.last_active_at <= self.ttl]
+        live.sort(key=lambda item: item.last_active_at)
+        for session in live[-self.max_sessions :]:
+            self._sessions[session.user_id] = session
+
+    def _replay(self, sessions: Dict[str, Session], entry: dict) -> None:
+        op = entry.get("op")
+        user_id = str(entry["u"])
+        if op == "drop":
+            sessions.pop(user_id, None)
+            return
+        if op in {"session", "start"}:
+            started_at = datetime.fromisoformat(entry.get("s") or entry["t"])
+            sessions[user_id] = Session(
+                user_id=user_id,
+                started_at=started_at,
+                last_active_at=datetime.fromisoformat(entry["t"]),
+                messages=deque(entry.get("m") or [], maxlen=self.max_messages),
+                pending_action=entry.get("a"),
+                pending_payload=dict(entry.get("p") or {}),
+            )
+            return
+        session = sessions.get(user_id)
+        if session is None:
+            return
+        if op == "touch":
+            session.last_active_at = datetime.fromisoformat(entry["t"])
+            if entry.get("m"):
+                session.messages.append(str(entry["m"]))
+        elif op == "pending":
+            session.pending_action = entry.get("a")
+            session.pending_payload = dict(entry.get("p") or {})
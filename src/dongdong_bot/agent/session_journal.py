@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Callable, List
+import json
+import os
+
+
+DEFAULT_FLUSH_INTERVAL_SECONDS = 1.0
+DEFAULT_COMPACT_MIN = 500
+
+
+class SessionJournal:
+    # session 變動以 append-only JSONL 記錄；append 只放進記憶體緩衝，
+    # 由背景執行緒每隔 flush_interval 秒批次寫入並 fsync，呼叫端不等待磁碟。
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        compact_min: int = DEFAULT_COMPACT_MIN,
+    ) -> None:
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.compact_min = compact_min
+        self._buffer: List[str] = []
+        self._lock = Lock()
+        self._io_lock = Lock()
+        self._lines = 0
+        self._stop = Event()
+        self._thread: Thread | None = None
+
+    def load(self) -> List[dict]:
+        entries: List[dict] = []
+        self._lines = 0
+        if not self.path.exists():
+            return entries
+        for line in self.path.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # 寫到一半當機留下的殘行，略過即可。
+                continue
+            if isinstance(entry, dict):
+                entries.append(entry)
+                self._lines += 1
+        return entries
+
+    def append(self, entry: dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._buffer.append(line)
+
+    def flush(self) -> int:
+        # 只在交換緩衝時持有 _lock，寫檔與 fsync 期間 append 不會被擋住。
+        with self._io_lock:
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+            if not lines:
+                return 0
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write("\n".join(lines) + "\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+            self._lines += len(lines)
+        return len(lines)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def needs_compaction(self, live_sessions: int) -> bool:
+        return self._lines > max(self.compact_min, 4 * live_sessions)
+
+    def rewrite(self, entries: List[dict]) -> None:
+        # entries 需是呼叫當下的完整狀態，緩衝中較早的變動已包含在內，一併丟棄。
+        with self._io_lock:
+            self.discard_buffer()
+            self._write_snapshot(entries)
+
+    def compact(self, snapshot_fn: Callable[[], List[dict]]) -> None:
+        # snapshot_fn 在呼叫端的鎖內取得完整狀態並呼叫 discard_buffer()，
+        # 只有這一步會擋住 append；寫檔與 fsync 在呼叫端的鎖外進行。
+        # 持有 _io_lock 期間 flush 不會把較新的變動寫進即將被取代的舊檔。
+        with self._io_lock:
+            self._write_snapshot(snapshot_fn())
+
+    def discard_buffer(self) -> None:
+        with self._lock:
+            self._buffer = []
+
+    def _write_snapshot(self, entries: List[dict]) -> None:
+        payload = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            handle.write(payload)
+            handle.flush()
+            os.fsync(handle.fileno())
+        tmp_path.replace(self.path)
+        self._lines = len(entries)
+
+    def start(self, on_tick: Callable[[], None]) -> None:
+        if self._thread is not None:
+            return
+
+        def _run() -> None:
+            while not self._stop.wait(self.flush_interval):
+                on_tick()
+
+        self._thread = Thread(target=_run, name="dongdong-session-journal", daemon=True)
+        self._thread.start()
+
+    def close(self, on_tick: Callable[[], None] | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if on_tick is not None:
+            on_tick()
+        else:
+            self.flush()
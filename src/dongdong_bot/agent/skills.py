@@ -2,8 +2,13 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List
+from threading import Lock
+from typing import Callable, Dict, Iterable, List
 import json
+import time
+
+
+DEFAULT_RECHECK_SECONDS = 2.0
 
 
 @dataclass(frozen=True)
@@ -14,32 +19,76 @@ class SkillInfo:
 
 
 class SkillRegistry:
-    def __init__(self, skills_dir: str, state_path: str) -> None:
+    # 啟用狀態與技能描述保存在記憶體快照；狀態檔、技能目錄與各 SKILL.md 的
+    # 大小/修改時間最多每 recheck_seconds 秒檢查一次，有變動才重新載入。
+    def __init__(
+        self,
+        skills_dir: str,
+        state_path: str,
+        recheck_seconds: float = DEFAULT_RECHECK_SECONDS,
+        clock: Callable[[], float] | None = None,
+    ) -> None:
         self.skills_dir = Path(skills_dir)
         self.state_path = Path(state_path)
         self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.recheck_seconds = recheck_seconds
+        self._clock = clock or time.monotonic
+        self._lock = Lock()
+        self._states: Dict[str, bool] = {}
+        self._descriptions: Dict[str, str] = {}
+        self._state_signature: tuple | None = None
+        self._skills_signature: tuple | None = None
+        self._checked_at: float | None = None
 
     def list_skills(self) -> List[SkillInfo]:
-        states = self._load_state()
-        skills = []
-        for skill_name in self._discover_skill_names():
-            description = self._load_description(skill_name)
-            enabled = bool(states.get(skill_name, True))
-            skills.append(SkillInfo(skill_name, description, enabled))
-        return skills
+        with self._lock:
+            self._refresh()
+            return [
+                SkillInfo(skill_name, description, bool(self._states.get(skill_name, True)))
+                for skill_name, description in self._descriptions.items()
+            ]
 
     def is_enabled(self, skill_name: str) -> bool:
-        states = self._load_state()
-        return bool(states.get(skill_name, True))
+        with self._lock:
+            self._refresh()
+            return bool(self._states.get(skill_name, True))
 
     def set_enabled(self, skill_name: str, enabled: bool) -> None:
-        states = self._load_state()
-        states[skill_name] = bool(enabled)
-        self._write_state(states)
+        with self._lock:
+            self._refresh(force=True)
+            states = dict(self._states)
+            states[skill_name] = bool(enabled)
+            self._write_state(states)
 
     def seed_states(self, skills: Iterable[SkillInfo]) -> None:
         states = {skill.name: skill.enabled for skill in skills}
-        self._write_state(states)
+        with self._lock:
+            self._write_state(states)
+
+    def _refresh(self, force: bool = False) -> None:
+        now = self._clock()
+        if not force and self._checked_at is not None and now - self._checked_at < self.recheck_seconds:
+            return
+        self._checked_at = now
+        state_signature = _stat_signature(self.state_path)
+        if state_signature != self._state_signature:
+            self._states = self._load_state()
+            self._state_signature = state_signature
+        skills_signature = self._skills_dir_signature()
+        if skills_signature != self._skills_signature:
+            self._descriptions = {
+                skill_name: self._load_description(skill_name)
+                for skill_name in self._discover_skill_names()
+            }
+            self._skills_signature = skills_signature
+
+    def _skills_dir_signature(self) -> tuple:
+        if not self.skills_dir.exists():
+            return ()
+        return tuple(
+            (skill_name, _stat_signature(self.skills_dir / skill_name / "SKILL.md"))
+            for skill_name in self._discover_skill_names()
+        )
 
     def _discover_skill_names(self) -> List[str]:
         if not self.skills_dir.exists():
@@ -75,3 +124,13 @@ class SkillRegistry:
         tmp_path = self.state_path.with_suffix(".tmp")
         tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
         tmp_path.replace(self.state_path)
+        self._states = dict(data)
+        self._state_signature = _stat_signature(self.state_path)
+
+
+def _stat_signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, TypeVar
+
+
+T = TypeVar("T")
+WAIT_SAMPLE_SIZE = 256
+BACKPRESSURE_REPLIES = {
+    "user": "你的前幾則訊息還在處理中，請稍候再傳送。",
+    "global": "目前訊息較多，請稍後再試。",
+}
+
+
+class DispatchRejected(Exception):
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class UserDispatcher:
+    # 同一使用者的訊息依到達順序逐一處理，不同使用者之間並行；
+    # 同時處理數受 max_concurrency 限制，排隊超過上限時直接拒絕（backpressure）。
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        max_pending_per_user: int = 5,
+        max_pending: int = 128,
+        clock: Callable[[], float] | None = None,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_pending_per_user = max(1, max_pending_per_user)
+        self.max_pending = max(1, max_pending)
+        self._clock = clock or time.perf_counter
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._user_locks: Dict[str, asyncio.Lock] = {}
+        self._user_pending: Dict[str, int] = {}
+        self._pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._waits: deque[float] = deque(maxlen=WAIT_SAMPLE_SIZE)
+
+    async def submit(self, user_id: str, work: Callable[[], Awaitable[T]]) -> T:
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise DispatchRejected("global")
+        if self._user_pending.get(user_id, 0) >= self.max_pending_per_user:
+            self.rejected += 1
+            raise DispatchRejected("user")
+        self._pending += 1
+        self._user_pending[user_id] = self._user_pending.get(user_id, 0) + 1
+        lock = self._user_locks.setdefault(user_id, asyncio.Lock())
+        enqueued_at = self._clock()
+        try:
+            # asyncio.Lock 依等待順序喚醒，同一使用者的訊息維持先到先處理。
+            async with lock:
+                async with self._semaphore:
+                    self._waits.append((self._clock() - enqueued_at) * 1000)
+                    self.running += 1
+                    try:
+                        return await work()
+                    finally:
+                        self.running -= 1
+                        self.completed += 1
+        finally:
+            self._pending -= 1
+            remaining = self._user_pending[user_id] - 1
+            if remaining:
+                self._user_pending[user_id] = remaining
+            else:
+                del self._user_pending[user_id]
+                self._user_locks.pop(user_id, None)
+
+    def depth(self, user_id: str | None = None) -> int:
+        if user_id is not None:
+            return self._user_pending.get(user_id, 0)
+        return self._pending
+
+    def stats(self) -> dict[str, float]:
+        waits = sorted(self._waits)
+        return {
+            "queued": self._pending - self.running,
+            "running": self.running,
+            "users": len(self._user_pending),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_avg_ms": sum(waits) / len(waits) if waits else 0.0,
+            "wait_max_ms": waits[-1] if waits else 0.0,
+        }
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict
+
+
+# Telegram 官方建議：全域約每秒 30 則、同一聊天約每秒 1 則。
+GLOBAL_MESSAGES_PER_SECOND = 30.0
+PER_CHAT_MESSAGES_PER_SECOND = 1.0
+_PRUNE_THRESHOLD = 1024
+
+
+class AsyncRateLimiter:
+    # 以固定間隔依序發放許可，等待者依 acquire 的先後取得。
+    def __init__(
+        self,
+        rate_per_second: float,
+        clock: Callable[[], float] | None = None,
+        sleep: Callable[[float], Awaitable[None]] | None = None,
+    ) -> None:
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._clock = clock or time.monotonic
+        self._sleep = sleep or asyncio.sleep
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = self._clock()
+            wait = self._next_at - now
+            if wait > 0:
+                await self._sleep(wait)
+                now = self._clock()
+            self._next_at = max(now, self._next_at) + self.interval
+
+    def idle(self) -> bool:
+        return not self._lock.locked() and self._next_at <= self._clock()
+
+
+class KeyedRateLimiter:
+    # 每個 key（聊天）各自一個 AsyncRateLimiter，閒置的定期清掉。
+    def __init__(
+        self,
+        rate_per_second: float,
+        clock: Callable[[], float] | None = None,
+        sleep: Callable[[float], Awaitable[None]] | None = None,
+    ) -> None:
+        self.rate_per_second = rate_per_second
+        self._clock = clock
+        self._sleep = sleep
+        self._limiters: Dict[str, AsyncRateLimiter] = {}
+
+    async def acquire(self, key: str) -> None:
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            if len(self._limiters) >= _PRUNE_THRESHOLD:
+                self._prune()
+            limiter = AsyncRateLimiter(self.rate_per_second, self._clock, self._sleep)
+            self._limiters[key] = limiter
+        await limiter.acquire()
+
+    def __len__(self) -> int:
+        return len(self._limiters)
+
+    def _prune(self) -> None:
+        for key in [key for key, limiter in self._limiters.items() if limiter.idle()]:
+            del self._limiters[key]
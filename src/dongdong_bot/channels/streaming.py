@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Awaitable, Callable, List
+
+
+DEFAULT_EDIT_INTERVAL_SECONDS = 1.0
+
+
+class StreamingReply:
+    # 收到第一段文字就先送出訊息，之後依節流間隔編輯同一則訊息；
+    # finish 時再以完整回覆（含後處理附註）補上最後一次編輯。
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[Any]],
+        edit: Callable[[Any, str], Awaitable[Any]],
+        min_edit_interval: float = DEFAULT_EDIT_INTERVAL_SECONDS,
+        clock: Callable[[], float] | None = None,
+    ) -> None:
+        self._send = send
+        self._edit = edit
+        self.min_edit_interval = min_edit_interval
+        self._clock = clock or time.perf_counter
+        self._chunks: List[str] = []
+        self.message: Any = None
+        self.shown = ""
+        self.edits = 0
+        self.first_visible_at: float | None = None
+        self._last_edit_at = 0.0
+
+    async def push(self, chunk: str) -> None:
+        self._chunks.append(chunk)
+        text = "".join(self._chunks)
+        if not text.strip():
+            return
+        if self.message is None:
+            await self._show_first(text)
+            return
+        if self._clock() - self._last_edit_at < self.min_edit_interval:
+            return
+        await self._show_edit(text)
+
+    async def finish(self, final_text: str) -> None:
+        if self.message is None:
+            await self._show_first(final_text)
+            return
+        if final_text != self.shown:
+            await self._show_edit(final_text)
+
+    async def _show_first(self, text: str) -> None:
+        self.message = await self._send(text)
+        self.shown = text
+        self.first_visible_at = self._clock()
+        self._last_edit_at = self.first_visible_at
+
+    async def _show_edit(self, text: str) -> None:
+        await self._edit(self.message, text)
+        self.shown = text
+        self.edits += 1
+        self._last_edit_at = self._clock()
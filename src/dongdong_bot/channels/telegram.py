@@ -1,14 +1,27 @@
 from __future__ import annotations
 
 import asyncio
+import functools
+import inspect
 import time
 from dataclasses import dataclass
-from typing import Callable, Optional
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional, Sequence
 
 from telegram import Update
+from telegram.error import RetryAfter, TelegramError
 from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
 
-from dongdong_bot.cron.scheduler import ReminderScheduler
+from dongdong_bot.channels.dispatch import BACKPRESSURE_REPLIES, DispatchRejected, UserDispatcher
+from dongdong_bot.channels.rate_limit import (
+    GLOBAL_MESSAGES_PER_SECOND,
+    PER_CHAT_MESSAGES_PER_SECOND,
+    AsyncRateLimiter,
+    KeyedRateLimiter,
+)
+from dongdong_bot.channels.streaming import DEFAULT_EDIT_INTERVAL_SECONDS, StreamingReply
+from dongdong_bot.cron.scheduler import ReminderPayload, ReminderScheduler
+from dongdong_bot.metrics import NULL_METRICS, MetricsRegistry
 from dongdong_bot.monitoring import Monitoring
 
 
@@ -22,6 +35,7 @@ class IncomingMessage:
 
 
 AllowlistChecker = Callable[[IncomingMessage], bool]
+REMINDER_RETRY_SECONDS = 30
 
 
 class TelegramClient:
@@ -29,73 +43,100 @@ class TelegramClient:
         self,
         token: str,
         monitoring: Monitoring,
-        perf_log: bool = False,
         allowlist_checker: Optional[AllowlistChecker] = None,
         scheduler: ReminderScheduler | None = None,
-        reminder_interval_seconds: int = 60,
+        reminder_interval_seconds: int = 300,
+        reminder_concurrency: int = 8,
+        stream_replies: bool = False,
+        stream_edit_interval_seconds: float = DEFAULT_EDIT_INTERVAL_SECONDS,
+        dispatcher: UserDispatcher | None = None,
+        metrics: MetricsRegistry | None = None,
     ) -> None:
         self.monitoring = monitoring
-        self.perf_log = perf_log
+        self.metrics = metrics or NULL_METRICS
         self.allowlist_checker = allowlist_checker
         self.scheduler = scheduler
+        # 提醒工作依下一個到期時間排程；reminder_interval_seconds 為沒有待發提醒時
+        # 最長的休眠時間，用來接住檔案被外部修改的情況。
         self.reminder_interval_seconds = reminder_interval_seconds
-        self.app = Application.builder().token(token).post_init(self._post_init).build()
+        self._reminder_job = None
+        self._reminder_wakeup: datetime | None = None
+        self.reminder_concurrency = reminder_concurrency
+        self._global_limiter = AsyncRateLimiter(GLOBAL_MESSAGES_PER_SECOND)
+        self._chat_limiter = KeyedRateLimiter(PER_CHAT_MESSAGES_PER_SECOND)
+        self.stream_replies = stream_replies
+        self.stream_edit_interval_seconds = stream_edit_interval_seconds
+        # 有 dispatcher 時讓 PTB 並行處理更新，順序與並行上限改由 dispatcher 控管。
+        self.dispatcher = dispatcher
+        if dispatcher is not None:
+            self.metrics.register_gauge("dispatch.queued", lambda: dispatcher.stats()["queued"])
+            self.metrics.register_gauge("dispatch.running", lambda: dispatcher.stats()["running"])
+        builder = Application.builder().token(token).post_init(self._post_init)
+        if dispatcher is not None:
+            builder = builder.concurrent_updates(True)
+        self.app = builder.build()
 
     def start(self, on_message: Callable[[IncomingMessage], object]) -> None:
         async def _handle(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             if not update.message or not update.message.text:
                 return
+            received_at = time.perf_counter()
             self.monitoring.received()
             message = self._build_message(update)
             if self.allowlist_checker and not self.allowlist_checker(message):
                 await update.message.reply_text("你尚未被授權使用此服務。")
                 return
-            loop = asyncio.get_running_loop()
-            response = await loop.run_in_executor(None, on_message, message)
-            reply_text = getattr(response, "reply", str(response))
-            send_start = time.perf_counter()
-            await update.message.reply_text(reply_text)
-            if self.perf_log:
-                send_ms = (time.perf_counter() - send_start) * 1000
-                print(f"[perf] telegram.reply ms={send_ms:.1f}")
+
+            async def _work() -> None:
+                if self.stream_replies:
+                    await self._reply_streaming(update, message, on_message, received_at)
+                    return
+                response = await _dispatch(on_message, message)
+                reply_text = getattr(response, "reply", str(response))
+                with self.metrics.timer("telegram.send"):
+                    await update.message.reply_text(reply_text)
+                self.metrics.observe("telegram.first_visible", (time.perf_counter() - received_at) * 1000)
+
+            if not await self._run_in_order(update, message, _work, received_at):
+                return
             self.monitoring.replied()
+            await self._arm_reminder_job()
 
         async def _handle_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             if not update.message or not update.message.text:
                 return
+            received_at = time.perf_counter()
             self.monitoring.received()
             message = self._build_message(update)
             if self.allowlist_checker and not self.allowlist_checker(message):
                 await update.message.reply_text("你尚未被授權使用此服務。")
                 return
-            loop = asyncio.get_running_loop()
-            response = await loop.run_in_executor(None, on_message, message)
-            reply_text = getattr(response, "reply", str(response))
-            send_start = time.perf_counter()
-            await update.message.reply_text(reply_text)
-            if self.perf_log:
-                send_ms = (time.perf_counter() - send_start) * 1000
-                print(f"[perf] telegram.reply ms={send_ms:.1f}")
+
+            async def _work() -> None:
+                response = await _dispatch(on_message, message)
+                reply_text = getattr(response, "reply", str(response))
+                with self.metrics.timer("telegram.send"):
+                    await update.message.reply_text(reply_text)
+
+            if not await self._run_in_order(update, message, _work, received_at):
+                return
             self.monitoring.replied()
+            await self._arm_reminder_job()
 
         async def _heartbeat(_: ContextTypes.DEFAULT_TYPE) -> None:
             self.monitoring.heartbeat()
+            if self.dispatcher is not None:
+                stats = self.dispatcher.stats()
+                self.monitoring.info(
+                    f"dispatch queued={stats['queued']} running={stats['running']} "
+                    f"users={stats['users']} rejected={stats['rejected']} "
+                    f"wait_avg_ms={stats['wait_avg_ms']:.1f} wait_max_ms={stats['wait_max_ms']:.1f}"
+                )
 
         async def _error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
             if context.error:
                 self.monitoring.error(context.error)
 
-        async def _reminder_job(context: ContextTypes.DEFAULT_TYPE) -> None:
-            if not self.scheduler:
-                return
-            due = self.scheduler.collect_due()
-            for reminder in due:
-                try:
-                    await context.bot.send_message(chat_id=reminder.chat_id, text=reminder.message)
-                    self.scheduler.mark_sent(reminder)
-                except Exception as exc:
-                    self.scheduler.mark_failed(reminder, str(exc))
-
         self.app.add_handler(CommandHandler("search", _handle_command))
         self.app.add_handler(CommandHandler("summary", _handle_command))
         self.app.add_handler(CommandHandler("skill", _handle_command))
@@ -108,13 +149,136 @@ class TelegramClient:
             first=self.monitoring.heartbeat_interval_seconds,
         )
         if self.scheduler:
-            self.app.job_queue.run_repeating(
-                _reminder_job,
-                interval=self.reminder_interval_seconds,
-                first=self.reminder_interval_seconds,
-            )
+            self._schedule_reminder_job(self.scheduler.next_wakeup())
         self.app.run_polling(close_loop=False)
 
+    async def _run_reminder_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if not self.scheduler:
+            return
+        self._reminder_job = None
+        self._reminder_wakeup = None
+        job_start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        # 無論這一輪是否失敗都要重新排程，否則提醒會停到下一則訊息進來才恢復；
+        # 失敗時至少間隔 REMINDER_RETRY_SECONDS，避免放回的提醒讓工作立刻重跑。
+        succeeded = False
+        try:
+            due = await loop.run_in_executor(None, self.scheduler.collect_due)
+            if due:
+
+                async def _send(reminder: ReminderPayload) -> None:
+                    await context.bot.send_message(chat_id=reminder.chat_id, text=reminder.message)
+
+                try:
+                    sent, failed = await deliver_reminders(
+                        due,
+                        _send,
+                        concurrency=self.reminder_concurrency,
+                        global_limiter=self._global_limiter,
+                        chat_limiter=self._chat_limiter,
+                    )
+                    await loop.run_in_executor(None, self.scheduler.commit_results, sent, failed)
+                except Exception:
+                    # 結果沒寫回的提醒已從堆積彈出，放回去讓下一輪重試。
+                    await loop.run_in_executor(None, self.scheduler.release, due)
+                    raise
+                self.metrics.inc("reminder.sent", len(sent))
+                self.metrics.inc("reminder.failed", len(failed))
+            succeeded = True
+        finally:
+            self.metrics.observe("reminder.job", (time.perf_counter() - job_start) * 1000)
+            await self._arm_reminder_job(retry_after_seconds=0 if succeeded else REMINDER_RETRY_SECONDS)
+
+    async def _arm_reminder_job(self, retry_after_seconds: float = 0) -> None:
+        # next_wakeup 會取 store 的鎖並檢查檔案，交給執行緒池以免卡住事件迴圈。
+        if not self.scheduler:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            next_trigger = await loop.run_in_executor(None, self.scheduler.next_wakeup)
+        except Exception as exc:
+            # 取不到下一個時間時退回最長休眠，確保工作仍會被排程。
+            self.monitoring.error(exc)
+            next_trigger = None
+        self._schedule_reminder_job(next_trigger, retry_after_seconds)
+
+    def _schedule_reminder_job(self, next_trigger: datetime | None, retry_after_seconds: float = 0) -> None:
+        # 新增行程後若出現更早的提醒就提前喚醒，否則沿用已排定的工作。
+        now = datetime.now()
+        target = next_reminder_wakeup(next_trigger, now, self.reminder_interval_seconds)
+        if retry_after_seconds:
+            target = max(target, now + timedelta(seconds=retry_after_seconds))
+        if self._reminder_job is not None and self._reminder_wakeup is not None:
+            if self._reminder_wakeup <= target:
+                return
+            self._reminder_job.schedule_removal()
+        self._reminder_wakeup = target
+        self._reminder_job = self.app.job_queue.run_once(
+            self._run_reminder_job,
+            when=(target - now).total_seconds(),
+        )
+
+    async def _run_in_order(
+        self,
+        update: Update,
+        message: IncomingMessage,
+        work: Callable[[], Awaitable[None]],
+        received_at: float,
+    ) -> bool:
+        if self.dispatcher is None:
+            await work()
+            return True
+
+        async def _timed() -> None:
+            self.metrics.observe("dispatch.wait", (time.perf_counter() - received_at) * 1000)
+            await work()
+
+        try:
+            await self.dispatcher.submit(message.user_id, _timed)
+        except DispatchRejected as exc:
+            self.monitoring.info(f"dispatch_rejected reason={exc.reason}")
+            self.metrics.inc(f"dispatch.rejected.{exc.reason}")
+            await update.message.reply_text(BACKPRESSURE_REPLIES[exc.reason])
+            return False
+        return True
+
+    async def _reply_streaming(
+        self,
+        update: Update,
+        message: IncomingMessage,
+        on_message: Callable[..., object],
+        received_at: float,
+    ) -> None:
+        # on_message 以 on_delta 回報片段（同步版在執行緒中），轉回事件迴圈後邊收邊編輯訊息。
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[str | None] = asyncio.Queue()
+
+        def _on_delta(chunk: str) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, chunk)
+
+        async def _edit(sent, text: str) -> None:
+            await sent.edit_text(text)
+
+        stream = StreamingReply(update.message.reply_text, _edit, self.stream_edit_interval_seconds)
+
+        async def _pump() -> None:
+            while (chunk := await queue.get()) is not None:
+                try:
+                    await stream.push(chunk)
+                except TelegramError as exc:
+                    self.monitoring.error(exc)
+
+        pump = asyncio.create_task(_pump())
+        try:
+            response = await _dispatch(on_message, message, on_delta=_on_delta)
+        finally:
+            queue.put_nowait(None)
+            await pump
+        await stream.finish(getattr(response, "reply", str(response)))
+        if stream.first_visible_at is not None:
+            self.metrics.observe("telegram.first_visible", (stream.first_visible_at - received_at) * 1000)
+        self.metrics.inc("telegram.stream_edits", stream.edits)
+
     async def _post_init(self, _: Application) -> None:
         self.monitoring.startup()
 
@@ -127,3 +291,68 @@ class TelegramClient:
         user_name = user.full_name if user else ""
         text = update.message.text if update.message else ""
         return IncomingMessage(text=text, user_id=user_id, chat_id=chat_id, user_name=user_name)
+
+
+async def _dispatch(on_message: Callable[..., object], message: IncomingMessage, **kwargs) -> object:
+    # 非同步的處理函式直接在事件迴圈上 await；同步版本仍交給預設執行緒池。
+    if inspect.iscoroutinefunction(on_message):
+        return await on_message(message, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(on_message, message, **kwargs))
+
+
+def next_reminder_wakeup(
+    next_trigger: datetime | None,
+    now: datetime,
+    max_sleep_seconds: int,
+) -> datetime:
+    latest = now + timedelta(seconds=max_sleep_seconds)
+    if next_trigger is None or next_trigger > latest:
+        return latest
+    return max(next_trigger, now)
+
+
+async def deliver_reminders(
+    reminders: Sequence[ReminderPayload],
+    send: Callable[[ReminderPayload], Awaitable[None]],
+    concurrency: int,
+    global_limiter: AsyncRateLimiter,
+    chat_limiter: KeyedRateLimiter,
+) -> tuple[List[ReminderPayload], List[tuple[ReminderPayload, str]]]:
+    # 同一聊天的提醒依序送出，各聊天並行；同時最多 concurrency 則在途，
+    # 每個聊天最多佔用一個名額，且先等過該聊天的限速才取名額，
+    # 避免少數聊天的大量提醒佔住名額卡住其他人。
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    errors: dict[str, str] = {}
+    by_chat: dict[str, List[ReminderPayload]] = {}
+    for reminder in reminders:
+        by_chat.setdefault(reminder.chat_id, []).append(reminder)
+
+    async def _send_once(reminder: ReminderPayload) -> None:
+        await chat_limiter.acquire(reminder.chat_id)
+        async with semaphore:
+            await global_limiter.acquire()
+            await send(reminder)
+
+    async def _deliver_chat(chat_reminders: List[ReminderPayload]) -> None:
+        for reminder in chat_reminders:
+            try:
+                try:
+                    await _send_once(reminder)
+                except RetryAfter as exc:
+                    await asyncio.sleep(_retry_after_seconds(exc))
+                    await _send_once(reminder)
+            except Exception as exc:
+                errors[reminder.reminder_id] = str(exc)
+
+    await asyncio.gather(*(_deliver_chat(chat_reminders) for chat_reminders in by_chat.values()))
+    sent = [reminder for reminder in reminders if reminder.reminder_id not in errors]
+    failed = [(reminder, errors[reminder.reminder_id]) for reminder in reminders if reminder.reminder_id in errors]
+    return sent, failed
+
+
+def _retry_after_seconds(exc: RetryAfter) -> float:
+    delay = exc.retry_after
+    if isinstance(delay, timedelta):
+        return delay.total_seconds()
+    return float(delay)
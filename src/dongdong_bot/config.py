@@ -14,11 +14,20 @@ FAST_MODEL = "gpt-4o-mini"
 EMBEDDING_MODEL = "text-embedding-3-small"
 SEARCH_MODEL = "gpt-4o-mini"
 EMBEDDING_INDEX_FILENAME = "embeddings.jsonl"
+VECTOR_INDEX_DIRNAME = "vector_index"
+EMBEDDING_CACHE_FILENAME = "embedding_cache.jsonl"
+KEYWORD_INDEX_FILENAME = "memory_index.jsonl"
 INTENT_CACHE_FILENAME = "intent_index.json"
+ROUTE_CACHE_FILENAME = "route_index.json"
+ROUTE_DECISION_CACHE_FILENAME = "route_cache.jsonl"
 ALLOWLIST_FILENAME = "allowlist.json"
 SCHEDULES_FILENAME = "schedules.json"
 REMINDERS_FILENAME = "reminders.json"
 SKILLS_STATE_FILENAME = "skills_state.json"
+SESSIONS_FILENAME = "sessions.jsonl"
+METRICS_SNAPSHOT_FILENAME = "metrics.json"
+TRACES_FILENAME = "traces.jsonl"
+LLM_USAGE_FILENAME = "llm_usage.json"
 CAPABILITIES_FILENAME = "capabilities.yaml"
 MEMORY_SUBDIR = "memory"
 REPORTS_SUBDIR = "reports"
@@ -28,6 +37,10 @@ MEMORY_QUALITY_ACCURACY_THRESHOLD = 0.6
 MEMORY_QUALITY_RELEVANCE_THRESHOLD = 0.5
 MEMORY_QUALITY_DUPLICATE_RATE_MAX = 0.2
 PERF_LOG_ENV = "PERF_LOG"
+METRICS_PORT_ENV = "METRICS_PORT"
+SESSION_JOURNAL_ENV = "SESSION_JOURNAL"
+TRACE_SAMPLE_RATE_ENV = "TRACE_SAMPLE_RATE"
+TRACE_SLOW_MS_ENV = "TRACE_SLOW_MS"
 EMBEDDING_KEY_ENV = "OPENAI_EMBEDDING_KEY"
 SEARCH_KEY_ENV = "OPENAI_SEARCH_API_KEY"
 CAPABILITIES_PATH = str(Path(__file__).resolve().parent / "agent" / CAPABILITIES_FILENAME)
@@ -43,13 +56,23 @@ class Config:
     fast_model: str = FAST_MODEL
     embedding_model: str = EMBEDDING_MODEL
     embedding_index_path: str = str(Path(MEMORY_DIR) / EMBEDDING_INDEX_FILENAME)
+    vector_index_path: str = str(Path(MEMORY_DIR) / VECTOR_INDEX_DIRNAME)
+    embedding_cache_path: str = str(Path(MEMORY_DIR) / EMBEDDING_CACHE_FILENAME)
+    keyword_index_path: str = str(Path(MEMORY_DIR) / KEYWORD_INDEX_FILENAME)
     intent_cache_path: str = str(Path(MEMORY_DIR) / INTENT_CACHE_FILENAME)
+    route_cache_path: str = str(Path(MEMORY_DIR) / ROUTE_CACHE_FILENAME)
+    route_decision_cache_path: str = str(Path(MEMORY_DIR) / ROUTE_DECISION_CACHE_FILENAME)
     memory_path: str = str(Path(MEMORY_DIR) / MEMORY_SUBDIR)
     reports_path: str = str(Path(MEMORY_DIR) / REPORTS_SUBDIR)
     allowlist_path: str = str(Path(MEMORY_DIR) / ALLOWLIST_FILENAME)
     schedules_path: str = str(Path(MEMORY_DIR) / SCHEDULES_FILENAME)
     reminders_path: str = str(Path(MEMORY_DIR) / REMINDERS_FILENAME)
     skills_state_path: str = str(Path(MEMORY_DIR) / SKILLS_STATE_FILENAME)
+    # 日誌會以明文保存使用者最近的訊息，預設關閉；設定 SESSION_JOURNAL=1 才啟用。
+    session_journal_path: str | None = None
+    metrics_snapshot_path: str | None = str(Path(MEMORY_DIR) / METRICS_SNAPSHOT_FILENAME)
+    trace_path: str | None = str(Path(MEMORY_DIR) / TRACES_FILENAME)
+    llm_usage_path: str | None = str(Path(MEMORY_DIR) / LLM_USAGE_FILENAME)
     capabilities_path: str = CAPABILITIES_PATH
     search_api_key: str = ""
     search_model: str = SEARCH_MODEL
@@ -63,6 +86,26 @@ class Config:
     max_iters_cap: int = 6
     no_progress_limit: int = 3
     json_retry_limit: int = 1
+    fanout_workers: int = 8
+    route_fast_path_threshold: float = 0.85
+    route_cache_ttl_seconds: int = 24 * 60 * 60
+    route_cache_max_entries: int = 2000
+    route_combined_slots: bool = True
+    reminder_concurrency: int = 8
+    stream_replies: bool = True
+    stream_edit_interval_seconds: float = 1.0
+    async_handler: bool = True
+    handler_concurrency: int = 16
+    handler_queue_per_user: int = 5
+    handler_queue_max: int = 128
+    session_max_entries: int = 10000
+    session_flush_interval_seconds: float = 1.0
+    metrics_http_port: int = 0
+    metrics_snapshot_interval_seconds: float = 60.0
+    trace_sample_rate: float = 0.0
+    # traces.jsonl 沒有輪替且同步寫入，預設不記錄慢 trace；設定 TRACE_SLOW_MS 才啟用。
+    trace_slow_ms: float | None = None
+    llm_usage_flush_interval_seconds: float = 60.0
 
 
 def load_config() -> Config:
@@ -84,6 +127,16 @@ def load_config() -> Config:
     Path(MEMORY_DIR).mkdir(parents=True, exist_ok=True)
 
     perf_log = os.getenv(PERF_LOG_ENV, "0").strip().lower() in {"1", "true", "yes", "on"}
+    session_journal = os.getenv(SESSION_JOURNAL_ENV, "0").strip().lower() in {"1", "true", "yes", "on"}
+    metrics_port = os.getenv(METRICS_PORT_ENV, "").strip()
+    try:
+        trace_sample_rate = min(max(float(os.getenv(TRACE_SAMPLE_RATE_ENV, "0") or 0), 0.0), 1.0)
+    except ValueError:
+        trace_sample_rate = 0.0
+    try:
+        trace_slow_ms = max(float(os.getenv(TRACE_SLOW_MS_ENV, "").strip()), 0.0)
+    except ValueError:
+        trace_slow_ms = None
 
     return Config(
         openai_api_key=openai_api_key,
@@ -91,4 +144,8 @@ def load_config() -> Config:
         search_api_key=search_api_key,
         telegram_bot_token=telegram_bot_token,
         perf_log=perf_log,
+        metrics_http_port=int(metrics_port) if metrics_port.isdigit() else 0,
+        trace_sample_rate=trace_sample_rate,
+        trace_slow_ms=trace_slow_ms,
+        session_journal_path=str(Path(MEMORY_DIR) / SESSIONS_FILENAME) if session_journal else None,
     )
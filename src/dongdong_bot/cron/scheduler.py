@@ -2,9 +2,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
-from dongdong_bot.agent.reminder_store import ReminderStore, Reminder
+from dongdong_bot.agent.reminder_store import Reminder, ReminderStore
 from dongdong_bot.agent.schedule_store import ScheduleStore
 
 
@@ -22,12 +22,23 @@ class ReminderScheduler:
         self.reminder_store = reminder_store
 
     def collect_due(self, now: Optional[datetime] = None) -> List[ReminderPayload]:
+        # 只彈出已到期的提醒，並一次取回所需行程。
         now = now or datetime.now()
+        reminders = self.reminder_store.pop_due(now)
+        if not reminders:
+            return []
+        try:
+            return self._build_payloads(reminders)
+        except Exception:
+            # 彈出後出錯就放回堆積，避免這批提醒在行程存活期間遺失。
+            self.reminder_store.requeue(reminder.reminder_id for reminder in reminders)
+            raise
+
+    def _build_payloads(self, reminders: List[Reminder]) -> List[ReminderPayload]:
+        schedules = self.schedule_store.get_many({reminder.schedule_id for reminder in reminders})
         due: List[ReminderPayload] = []
-        for reminder in self.reminder_store.list_pending():
-            if reminder.trigger_time > now:
-                continue
-            schedule = self.schedule_store.get(reminder.schedule_id)
+        for reminder in reminders:
+            schedule = schedules.get(reminder.schedule_id)
             if schedule is None or schedule.status != "scheduled":
                 self.reminder_store.mark_failed(reminder.reminder_id, "schedule_missing")
                 continue
@@ -42,9 +53,28 @@ class ReminderScheduler:
             )
         return due
 
+    def next_wakeup(self) -> Optional[datetime]:
+        return self.reminder_store.next_trigger_time()
+
     def mark_sent(self, reminder: ReminderPayload) -> None:
         self.reminder_store.mark_sent(reminder.reminder_id)
         self.schedule_store.complete(reminder.schedule_id)
 
+    def release(self, reminders: Iterable[ReminderPayload]) -> int:
+        # 投遞或寫回失敗時呼叫，仍待發的提醒會在下一輪再次到期。
+        return self.reminder_store.requeue(reminder.reminder_id for reminder in reminders)
+
     def mark_failed(self, reminder: ReminderPayload, error: str) -> None:
         self.reminder_store.mark_failed(reminder.reminder_id, error)
+
+    def commit_results(
+        self,
+        sent: Iterable[ReminderPayload],
+        failed: Iterable[tuple[ReminderPayload, str]],
+    ) -> None:
+        # 一輪投遞結束後整批寫回，兩個 store 各只追加一次日誌。
+        sent = list(sent)
+        updates = [(reminder.reminder_id, "sent", "") for reminder in sent]
+        updates.extend((reminder.reminder_id, "failed", error) for reminder, error in failed)
+        self.reminder_store.update_statuses(updates)
+        self.schedule_store.complete_many(reminder.schedule_id for reminder in sent)
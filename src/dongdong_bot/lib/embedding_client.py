@@ -1,22 +1,258 @@
 from __future__ import annotations
 
-from typing import List
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import List, Sequence
+import base64
+import hashlib
+import json
+import time
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from dongdong_bot.lib.llm_usage import LLMUsage, UsageLedger
+from dongdong_bot.metrics import NULL_METRICS, MetricsRegistry
+from dongdong_bot.tracing import span
+
+
+DEFAULT_BATCH_SIZE = 128
+DEFAULT_CACHE_MAX_ENTRIES = 50_000
+
+
+class EmbeddingCache:
+    # 以 (model, 內容) 的雜湊為 key 保存向量；檔案為 append-only JSONL，
+    # 向量以 float32 base64 編碼，啟動時載入記憶體；行數超過現存筆數兩倍時（啟動或寫入後）壓縮。
+    def __init__(self, path: str | None, max_entries: int = DEFAULT_CACHE_MAX_ENTRIES) -> None:
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, List[float]] = OrderedDict()
+        self._lock = Lock()
+        self._lines = 0
+        self._load()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, model: str, text: str) -> List[float] | None:
+        key = self.key(model, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                return None
+            self._entries.move_to_end(key)
+            return list(vector)
+
+    def put_many(self, model: str, items: Sequence[tuple[str, Sequence[float]]]) -> None:
+        if not items:
+            return
+        lines = []
+        with self._lock:
+            for text, vector in items:
+                key = self.key(model, text)
+                self._entries[key] = list(vector)
+                self._entries.move_to_end(key)
+                lines.append(json.dumps({"k": key, "v": _encode_vector(vector)}))
+            self._evict()
+            if self.path is None:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write("\n".join(lines) + "\n")
+            self._lines += len(lines)
+            self._maybe_compact()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        total = 0
+        for line in self.path.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                key = str(record["k"])
+                vector = _decode_vector(str(record["v"]))
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                continue
+            total += 1
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+        self._evict()
+        self._lines = total
+        self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        if self._lines > 2 * max(len(self._entries), 1):
+            self._compact()
+
+    def _compact(self) -> None:
+        payload = "".join(
+            json.dumps({"k": key, "v": _encode_vector(vector)}) + "\n"
+            for key, vector in self._entries.items()
+        )
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        tmp_path.replace(self.path)
+        self._lines = len(self._entries)
 
 
 class EmbeddingClient:
-    def __init__(self, api_key: str, model: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        cache_path: str | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        metrics: MetricsRegistry | None = None,
+        usage_ledger: UsageLedger | None = None,
+    ) -> None:
         self._client = OpenAI(api_key=api_key)
         self._model = model
+        self._batch_size = max(1, batch_size)
+        self._cache = EmbeddingCache(cache_path)
+        self._metrics = metrics or NULL_METRICS
+        self._usage_ledger = usage_ledger
 
     @property
     def model(self) -> str:
         return self._model
 
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
     def embed(self, text: str) -> List[float]:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: Sequence[str]) -> List[List[float]]:
+        with span("embed", model=self._model, texts=len(texts)) as current:
+            results, missing = _lookup_cached(self._cache, self._model, texts)
+            current.set(cache_misses=len(missing))
+            for batch in _batches(list(missing), self._batch_size):
+                _fill_batch(self._cache, self._model, results, missing, batch, self._request(batch))
+        return [vector or [] for vector in results]
+
+    def _request(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
         response = self._client.embeddings.create(
             model=self._model,
-            input=text,
+            input=texts,
+        )
+        _record_request(self._metrics, self._usage_ledger, self._model, response, start)
+        return _ordered_embeddings(response)
+
+
+class AsyncEmbeddingClient:
+    # 與 EmbeddingClient 共用同一份 EmbeddingCache，只把 API 呼叫改為 AsyncOpenAI。
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        cache: EmbeddingCache,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        metrics: MetricsRegistry | None = None,
+        usage_ledger: UsageLedger | None = None,
+    ) -> None:
+        self._client = AsyncOpenAI(api_key=api_key)
+        self._model = model
+        self._batch_size = max(1, batch_size)
+        self._cache = cache
+        self._metrics = metrics or NULL_METRICS
+        self._usage_ledger = usage_ledger
+
+    @property
+    def model(self) -> str:
+        return self._model
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    async def embed(self, text: str) -> List[float]:
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: Sequence[str]) -> List[List[float]]:
+        with span("embed", model=self._model, texts=len(texts)) as current:
+            results, missing = _lookup_cached(self._cache, self._model, texts)
+            current.set(cache_misses=len(missing))
+            for batch in _batches(list(missing), self._batch_size):
+                _fill_batch(self._cache, self._model, results, missing, batch, await self._request(batch))
+        return [vector or [] for vector in results]
+
+    async def _request(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        response = await self._client.embeddings.create(
+            model=self._model,
+            input=texts,
         )
-        return list(response.data[0].embedding)
+        _record_request(self._metrics, self._usage_ledger, self._model, response, start)
+        return _ordered_embeddings(response)
+
+
+def _lookup_cached(
+    cache: EmbeddingCache,
+    model: str,
+    texts: Sequence[str],
+) -> tuple[List[List[float] | None], dict[str, List[int]]]:
+    results: List[List[float] | None] = [cache.get(model, text) for text in texts]
+    missing: dict[str, List[int]] = {}
+    for idx, vector in enumerate(results):
+        if vector is None:
+            missing.setdefault(texts[idx], []).append(idx)
+    return results, missing
+
+
+def _record_request(
+    metrics: MetricsRegistry,
+    ledger: UsageLedger | None,
+    model: str,
+    response,
+    start: float,
+) -> None:
+    latency_ms = (time.perf_counter() - start) * 1000
+    metrics.observe("embed", latency_ms)
+    if ledger is not None:
+        ledger.record(model, LLMUsage.from_response(getattr(response, "usage", None)), latency_ms)
+
+
+def _batches(items: List[str], size: int) -> List[List[str]]:
+    return [items[start : start + size] for start in range(0, len(items), size)]
+
+
+def _fill_batch(
+    cache: EmbeddingCache,
+    model: str,
+    results: List[List[float] | None],
+    missing: dict[str, List[int]],
+    batch: List[str],
+    vectors: List[List[float]],
+) -> None:
+    cache.put_many(model, list(zip(batch, vectors)))
+    for text, vector in zip(batch, vectors):
+        for idx in missing[text]:
+            results[idx] = list(vector)
+
+
+def _ordered_embeddings(response) -> List[List[float]]:
+    ordered = sorted(response.data, key=lambda item: getattr(item, "index", 0))
+    return [list(item.embedding) for item in ordered]
+
+
+def _encode_vector(vector: Sequence[float]) -> str:
+    return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+
+def _decode_vector(raw: str) -> List[float]:
+    values = array("f")
+    values.frombytes(base64.b64decode(raw))
+    return values.tolist()
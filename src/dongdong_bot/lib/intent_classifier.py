@@ -6,8 +6,8 @@ import json
 import hashlib
 from typing import Iterable, Sequence, Tuple
 
-from dongdong_bot.lib.embedding_client import EmbeddingClient
-from dongdong_bot.lib.vector_math import cosine_similarity, top_k_scored
+from dongdong_bot.lib.embedding_client import AsyncEmbeddingClient, EmbeddingClient
+from dongdong_bot.lib.vector_math import VectorMatrix
 
 
 @dataclass(frozen=True)
@@ -27,30 +27,43 @@ class IntentClassifier:
         self._examples = list(examples)
         self._cache_path = Path(cache_path) if cache_path else None
         self._vectors: list[tuple[str, list[float]]] = []
+        self._matrix = VectorMatrix.from_vectors([])
         self._build_index()
 
     def _build_index(self) -> None:
         cached = self._load_cache()
         if cached:
             self._vectors = cached
-            return
-        self._vectors = []
-        for example in self._examples:
-            vector = self._client.embed(example.text)
-            self._vectors.append((example.intent, vector))
-        self._save_cache()
+        else:
+            vectors = self._client.embed_many([example.text for example in self._examples])
+            self._vectors = [
+                (example.intent, vector) for example, vector in zip(self._examples, vectors)
+            ]
+            self._save_cache()
+        self._matrix = VectorMatrix.from_vectors([vector for _intent, vector in self._vectors])
 
     def classify(self, text: str, top_k: int = 1) -> Tuple[str | None, float]:
         if not text.strip() or not self._vectors:
             return None, 0.0
-        query = self._client.embed(text)
-        scored: list[tuple[str, float]] = []
-        for intent, vector in self._vectors:
-            scored.append((intent, cosine_similarity(query, vector)))
-        top = top_k_scored(scored, top_k)
+        return self._best(self._client.embed(text), top_k)
+
+    async def aclassify(
+        self,
+        text: str,
+        client: AsyncEmbeddingClient,
+        top_k: int = 1,
+    ) -> Tuple[str | None, float]:
+        # 範例向量仍由同步 client 建好；這裡只把查詢文字的 embedding 改為非同步。
+        if not text.strip() or not self._vectors:
+            return None, 0.0
+        return self._best(await client.embed(text), top_k)
+
+    def _best(self, query: list[float], top_k: int) -> Tuple[str | None, float]:
+        top = self._matrix.top_k(query, top_k)
         if not top:
             return None, 0.0
-        return top[0][0], top[0][1]
+        row, score = top[0]
+        return self._vectors[row][0], score
 
     def _cache_key(self) -> str:
         # Cache key depends on model and examples to invalidate when they change.
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Sequence, Set
+import json
+
+
+_EMPTY: frozenset[int] = frozenset()
+
+
+def bigrams(text: str) -> Set[str]:
+    return {text[idx : idx + 2] for idx in range(len(text) - 1)}
+
+
+@dataclass
+class _FileState:
+    date: str
+    rank: int
+    size: int = 0
+    mtime: int = 0
+    ends_newline: bool = True
+    ids: List[int] = field(default_factory=list)
+
+
+class KeywordIndex:
+    # 以字元 bigram 建立倒排表，中文不需斷詞：查詢字串的每個 bigram 都必須出現在該行，
+    # 取各 posting 交集後再以子字串比對確認，結果與逐檔掃描一致。
+    # 每個 day file 的行內容與已索引的位元組游標記錄在 append-only JSONL，
+    # 重啟時只重讀大小或 mtime 有變動的檔案；查詢完全不讀 day file。
+    # 其他行程（例如 memory_admin）寫入 JSONL 時，以檔案簽章偵測並整份重播。
+    def __init__(self, path: str | Path | None) -> None:
+        self.path = Path(path) if path else None
+        self._lock = Lock()
+        self._reset()
+        self._load()
+
+    def _reset(self) -> None:
+        self._files: Dict[str, _FileState] = {}
+        self._by_date: Dict[str, Set[str]] = {}
+        self._lines: Dict[int, str] = {}
+        self._owner: Dict[int, str] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._next_id = 0
+        self._ops = 0
+        self._signature: tuple[int, int] | None = None
+
+    def reload_if_changed(self) -> bool:
+        # 索引檔與上次讀寫時的簽章不同，表示被其他行程改過，重播整份檔案。
+        with self._lock:
+            if self.path is None or _file_signature(self.path) == self._signature:
+                return False
+            self._reset()
+            self._load()
+            return True
+
+    def sync(self, files: Iterable[tuple[str, str, int, Path]], complete: bool = True) -> int:
+        # files 為 (key, 日期, 排序, 路徑)；回傳重新讀取的檔案數。complete 表示 files
+        # 涵蓋所有 day file，未列出的 key 一併移除；查詢前只比對相關日期時傳 False。
+        refreshed = 0
+        with self._lock:
+            seen: Set[str] = set()
+            for key, date, rank, path in files:
+                seen.add(key)
+                signature = _file_signature(path)
+                state = self._files.get(key)
+                if signature is None:
+                    if state is not None:
+                        self._drop(key)
+                        self._persist({"op": "drop", "f": key})
+                        refreshed += 1
+                    continue
+                size, mtime = signature
+                if state is not None and state.size == size and state.mtime == mtime:
+                    continue
+                if state is not None and size > state.size and state.ends_newline:
+                    with path.open("rb") as handle:
+                        handle.seek(state.size)
+                        chunk = handle.read().decode("utf-8")
+                    self._apply(key, date, rank, chunk, size, mtime, reset=False)
+                else:
+                    chunk = path.read_bytes().decode("utf-8")
+                    self._apply(key, date, rank, chunk, size, mtime, reset=True)
+                refreshed += 1
+            if complete:
+                for key in [key for key in self._files if key not in seen]:
+                    self._drop(key)
+                    self._persist({"op": "drop", "f": key})
+            self._maybe_compact()
+        return refreshed
+
+    def record_append(
+        self,
+        key: str,
+        date: str,
+        rank: int,
+        path: Path,
+        size_before: int,
+        text: str,
+    ) -> None:
+        # 呼叫端剛把 text 附加到檔案尾端；游標一致時直接索引這段文字，不需重讀檔案。
+        mtime = path.stat().st_mtime_ns
+        with self._lock:
+            state = self._files.get(key)
+            current = state.size if state is not None else 0
+            if current == size_before and (state is None or state.ends_newline):
+                self._apply(key, date, rank, text, size_before + len(text.encode("utf-8")), mtime, reset=False)
+                return
+            # 檔案在索引之外被改過，整檔重讀。
+            chunk = path.read_bytes().decode("utf-8")
+            self._apply(key, date, rank, chunk, len(chunk.encode("utf-8")), mtime, reset=True)
+
+    def search(self, query: str, dates: Sequence[str]) -> List[str]:
+        with self._lock:
+            if len(query) < 2:
+                return [
+                    self._lines[line_id].lstrip("- ")
+                    for date in dates
+                    for line_id in self._date_ids(date)
+                    if query in self._lines[line_id]
+                ]
+            postings = sorted((self._postings.get(gram, _EMPTY) for gram in bigrams(query)), key=len)
+            if not postings[0]:
+                return []
+            candidates = set(postings[0]).intersection(*postings[1:])
+            wanted = set(dates)
+            grouped: Dict[str, List[tuple[int, int]]] = {}
+            for line_id in candidates:
+                state = self._files[self._owner[line_id]]
+                if state.date in wanted and query in self._lines[line_id]:
+                    grouped.setdefault(state.date, []).append((state.rank, line_id))
+            results: List[str] = []
+            for date in dates:
+                for _rank, line_id in sorted(grouped.pop(date, ())):
+                    results.append(self._lines[line_id].lstrip("- "))
+            return results
+
+    def lines(self, date: str) -> List[str]:
+        with self._lock:
+            return [self._lines[line_id] for line_id in self._date_ids(date)]
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def _date_ids(self, date: str) -> List[int]:
+        keys = sorted(self._by_date.get(date, ()), key=lambda key: self._files[key].rank)
+        return [line_id for key in keys for line_id in self._files[key].ids]
+
+    def _apply(
+        self,
+        key: str,
+        date: str,
+        rank: int,
+        chunk: str,
+        size: int,
+        mtime: int,
+        reset: bool,
+    ) -> None:
+        lines = chunk.splitlines()
+        ends_newline = chunk.endswith("\n") if chunk else True
+        self._add(key, date, rank, lines, size, mtime, ends_newline, reset)
+        self._persist(
+            {
+                "op": "file",
+                "f": key,
+                "d": date,
+                "r": rank,
+                "reset": reset,
+                "l": lines,
+                "n": size,
+                "m": mtime,
+                "nl": ends_newline,
+            }
+        )
+
+    def _add(
+        self,
+        key: str,
+        date: str,
+        rank: int,
+        lines: List[str],
+        size: int,
+        mtime: int,
+        ends_newline: bool,
+        reset: bool,
+    ) -> None:
+        if reset:
+            self._drop(key)
+        state = self._files.get(key)
+        if state is None:
+            state = _FileState(date=date, rank=rank)
+            self._files[key] = state
+            self._by_date.setdefault(date, set()).add(key)
+        for line in lines:
+            line_id = self._next_id
+            self._next_id += 1
+            self._lines[line_id] = line
+            self._owner[line_id] = key
+            state.ids.append(line_id)
+            for gram in bigrams(line):
+                self._postings.setdefault(gram, set()).add(line_id)
+        state.size = size
+        state.mtime = mtime
+        state.ends_newline = ends_newline
+
+    def _drop(self, key: str) -> None:
+        state = self._files.pop(key, None)
+        if state is None:
+            return
+        keys = self._by_date.get(state.date)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_date[state.date]
+        for line_id in state.ids:
+            line = self._lines.pop(line_id)
+            self._owner.pop(line_id, None)
+            for gram in bigrams(line):
+                posting = self._postings.get(gram)
+                if posting is not None:
+                    posting.discard(line_id)
+                    if not posting:
+                        del self._postings[gram]
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        for raw in self.path.read_text(encoding="utf-8").splitlines():
+            if not raw.strip():
+                continue
+            try:
+                entry = json.loads(raw)
+                key = str(entry["f"])
+                if entry.get("op") == "drop":
+                    self._drop(key)
+                else:
+                    self._add(
+                        key,
+                        str(entry["d"]),
+                        int(entry["r"]),
+                        [str(line) for line in entry["l"]],
+                        int(entry["n"]),
+                        int(entry.get("m", 0)),
+                        bool(entry.get("nl", True)),
+                        bool(entry.get("reset")),
+                    )
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                continue
+            self._ops += 1
+        self._signature = _file_signature(self.path)
+        self._maybe_compact()
+
+    def _persist(self, entry: dict) -> None:
+        self._ops += 1
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 寫入前簽章已不一致代表有其他行程寫過，保留舊簽章讓下次查詢重播。
+        current = _file_signature(self.path) == self._signature
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        if current:
+            self._signature = _file_signature(self.path)
+
+    def _maybe_compact(self) -> None:
+        if self.path is None or self._ops <= max(200, 2 * len(self._files)):
+            return
+        if _file_signature(self.path) != self._signature:
+            # 其他行程寫過而尚未重播，重寫會蓋掉它們的紀錄。
+            return
+        payload = "".join(
+            json.dumps(
+                {
+                    "op": "file",
+                    "f": key,
+                    "d": state.date,
+                    "r": state.rank,
+                    "reset": True,
+                    "l": [self._lines[line_id] for line_id in state.ids],
+                    "n": state.size,
+                    "m": state.mtime,
+                    "nl": state.ends_newline,
+                },
+                ensure_ascii=False,
+            )
+            + "\n"
+            for key, state in self._files.items()
+        )
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        tmp_path.replace(self.path)
+        self._ops = len(self._files)
+        self._signature = _file_signature(self.path)
+
+
+def _file_signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+import json
+
+from dongdong_bot.metrics import NULL_METRICS, MetricsRegistry
+
+
+DEFAULT_RETENTION_DAYS = 30
+# 每百萬 token 的美元價格：(輸入, 快取輸入, 輸出)。未列出的模型只記 token 不計費。
+MODEL_PRICES: Dict[str, Tuple[float, float, float]] = {
+    "gpt-5-mini": (0.25, 0.025, 2.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "text-embedding-3-small": (0.02, 0.02, 0.0),
+}
+
+_CALL_SITE: ContextVar[str] = ContextVar("llm_call_site", default="other")
+_USAGE_USER: ContextVar[str] = ContextVar("llm_usage_user", default="")
+
+
+@dataclass(frozen=True)
+class LLMUsage:
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def uncached_input_tokens(self) -> int:
+        return max(self.input_tokens - self.cached_input_tokens, 0)
+
+    @classmethod
+    def from_response(cls, usage: Any) -> "LLMUsage | None":
+        # 相容 Responses API（input_tokens）與 Chat Completions（prompt_tokens）的用量欄位。
+        if usage is None:
+            return None
+        input_tokens = _as_int(getattr(usage, "input_tokens", None) or getattr(usage, "prompt_tokens", None))
+        output_tokens = _as_int(
+            getattr(usage, "output_tokens", None) or getattr(usage, "completion_tokens", None)
+        )
+        details = getattr(usage, "input_tokens_details", None) or getattr(usage, "prompt_tokens_details", None)
+        cached = _as_int(getattr(details, "cached_tokens", None)) if details is not None else 0
+        return cls(input_tokens=input_tokens, cached_input_tokens=cached, output_tokens=output_tokens)
+
+    def cost_usd(self, model: str) -> float:
+        prices = MODEL_PRICES.get(model)
+        if prices is None:
+            return 0.0
+        input_price, cached_price, output_price = prices
+        return (
+            self.uncached_input_tokens * input_price
+            + self.cached_input_tokens * cached_price
+            + self.output_tokens * output_price
+        ) / 1_000_000
+
+
+@contextmanager
+def call_site(name: str) -> Iterator[None]:
+    # 標記目前這段程式發出的 LLM / embedding 呼叫屬於哪個階段；巢狀時以內層為準。
+    token = _CALL_SITE.set(name)
+    try:
+        yield
+    finally:
+        _CALL_SITE.reset(token)
+
+
+@contextmanager
+def usage_user(user_id: str) -> Iterator[None]:
+    token = _USAGE_USER.set(user_id)
+    try:
+        yield
+    finally:
+        _USAGE_USER.reset(token)
+
+
+_FIELDS = ("calls", "input_tokens", "cached_input_tokens", "output_tokens", "latency_ms", "cost_usd")
+
+
+class UsageLedger:
+    # 依 (日期, 使用者, 呼叫點, 模型) 累計呼叫次數、token、延遲與估算費用，
+    # 定期整份寫入 JSON（tmp + replace），重啟時讀回並只保留 retention_days 天。
+    def __init__(
+        self,
+        path: str | None = None,
+        retention_days: int = DEFAULT_RETENTION_DAYS,
+        metrics: MetricsRegistry | None = None,
+        today_fn: Callable[[], date] = date.today,
+    ) -> None:
+        self.path = Path(path) if path else None
+        self.retention_days = retention_days
+        self.metrics = metrics or NULL_METRICS
+        self._today_fn = today_fn
+        self._rows: Dict[Tuple[str, str, str, str], Dict[str, float]] = {}
+        self._lock = Lock()
+        self._dirty = False
+        self._stop = Event()
+        self._thread: Thread | None = None
+        self._load()
+
+    def record(
+        self,
+        model: str,
+        usage: LLMUsage | None,
+        latency_ms: float,
+        site: str | None = None,
+        user_id: str | None = None,
+    ) -> None:
+        site = site or _CALL_SITE.get()
+        user_id = user_id if user_id is not None else _USAGE_USER.get()
+        usage = usage or LLMUsage()
+        key = (self._today_fn().isoformat(), user_id, site, model)
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                row = dict.fromkeys(_FIELDS, 0)
+                self._rows[key] = row
+            row["calls"] += 1
+            row["input_tokens"] += usage.input_tokens
+            row["cached_input_tokens"] += usage.cached_input_tokens
+            row["output_tokens"] += usage.output_tokens
+            row["latency_ms"] += latency_ms
+            row["cost_usd"] += usage.cost_usd(model)
+            self._dirty = True
+        self.metrics.observe(f"llm.site.{site}", latency_ms)
+        self.metrics.inc(f"llm.tokens.{site}", usage.input_tokens + usage.output_tokens)
+
+    def rows(self, day: str | None = None) -> List[dict]:
+        with self._lock:
+            items = sorted(self._rows.items())
+        return [
+            {"date": key[0], "user_id": key[1], "site": key[2], "model": key[3], **row}
+            for key, row in items
+            if day is None or key[0] == day
+        ]
+
+    def summary(self, day: str | None = None, by: str = "site") -> Dict[str, Dict[str, float]]:
+        # by 可為 site / user_id / model / date；回傳各組合計並附平均延遲。
+        totals: Dict[str, Dict[str, float]] = {}
+        for row in self.rows(day):
+            bucket = totals.setdefault(row[by], dict.fromkeys(_FIELDS, 0))
+            for name in _FIELDS:
+                bucket[name] += row[name]
+        for bucket in totals.values():
+            bucket["avg_latency_ms"] = bucket["latency_ms"] / bucket["calls"] if bucket["calls"] else 0.0
+        return totals
+
+    def flush(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            self._prune()
+            payload = [
+                {"date": key[0], "user_id": key[1], "site": key[2], "model": key[3], **row}
+                for key, row in sorted(self._rows.items())
+            ]
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+    def start(self, interval_seconds: float) -> None:
+        if self._thread is not None:
+            return
+
+        def _run() -> None:
+            while not self._stop.wait(interval_seconds):
+                self.flush()
+
+        self._thread = Thread(target=_run, name="dongdong-llm-usage", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _prune(self) -> None:
+        cutoff = (self._today_fn() - timedelta(days=self.retention_days)).isoformat()
+        for key in [key for key in self._rows if key[0] < cutoff]:
+            del self._rows[key]
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            return
+        for item in payload if isinstance(payload, list) else []:
+            try:
+                key = (str(item["date"]), str(item["user_id"]), str(item["site"]), str(item["model"]))
+                self._rows[key] = {name: item.get(name, 0) for name in _FIELDS}
+            except (KeyError, TypeError):
+                continue
+        self._prune()
+
+
+def _as_int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
@@ -2,18 +2,36 @@ from __future__ import annotations
 
 import json
 import re
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from typing import Callable, Optional
 
 from dongdong_bot.lib.nl_search_schema import NLSearchPlan
+from dongdong_bot.lib.route_cache import RouteCache
+
+
+SEARCH_PLAN_CACHE_NAMESPACE = "search_plan"
 
 
 @dataclass
 class NLSearchTopicExtractor:
     generate: Callable[[str, str], str]
     model: str
+    cache: RouteCache | None = None
 
     def extract(self, user_text: str) -> NLSearchPlan:
+        if self.cache is not None:
+            cached = self.cache.get(SEARCH_PLAN_CACHE_NAMESPACE, user_text)
+            if cached is not None:
+                try:
+                    return NLSearchPlan(**cached)
+                except TypeError:
+                    pass
+        plan, parsed_ok = self._extract_plan(user_text)
+        if self.cache is not None and parsed_ok:
+            self.cache.put(SEARCH_PLAN_CACHE_NAMESPACE, user_text, asdict(plan))
+        return plan
+
+    def _extract_plan(self, user_text: str) -> tuple[NLSearchPlan, bool]:
         prompt = (
             "你是搜尋意圖分析器。請判斷使用者是否在要求搜尋或彙整，"
             "並輸出單行 JSON，欄位包含: is_search, topic, wants_report。\n"
@@ -30,22 +48,42 @@ class NLSearchTopicExtractor:
             )
             raw = self.generate(self.model, retry_prompt)
             parsed = self._parse_json(raw)
+        return self._build_plan(user_text, parsed)
+
+    def plan_from_slots(self, user_text: str, slots: dict) -> NLSearchPlan | None:
+        # 合併路由已一併回傳 topic/wants_report 時直接組成計畫，不再呼叫 LLM；
+        # 網址一律從使用者原文擷取，不採用模型產生的網址。
+        if not str(slots.get("topic", "") or "").strip() and not self._extract_url(user_text):
+            return None
+        plan, _ = self._build_plan(user_text, {"is_search": True, **slots})
+        return plan
+
+    def _build_plan(self, user_text: str, parsed: Optional[dict]) -> tuple[NLSearchPlan, bool]:
         url = self._extract_url(user_text)
         if parsed is None and not url:
-            return NLSearchPlan(is_search=False, topic="", url="", wants_report=False)
-        is_search = bool(parsed.get("is_search", False)) if parsed else False
+            return NLSearchPlan(is_search=False, topic="", url="", wants_report=False), False
+        is_search = self._as_bool(parsed.get("is_search")) if parsed else False
         topic = str(parsed.get("topic", "") or "").strip() if parsed else ""
-        wants_report = bool(parsed.get("wants_report", False)) if parsed else False
+        wants_report = self._as_bool(parsed.get("wants_report")) if parsed else False
         if url:
             is_search = True
         if not wants_report and self._detect_save_intent(user_text):
             wants_report = True
-        return NLSearchPlan(
+        plan = NLSearchPlan(
             is_search=is_search,
             topic=topic,
             url=url or "",
             wants_report=wants_report,
         )
+        # 正規化會轉小寫，含網址的請求不快取以免大小寫不同的網址共用結果。
+        return plan, parsed is not None and not url
+
+    @staticmethod
+    def _as_bool(value: object) -> bool:
+        # 模型偶爾把布林值輸出成字串；只認 true 與 "true"，其餘（含 "false"）一律為 False。
+        if isinstance(value, bool):
+            return value
+        return isinstance(value, str) and value.strip().lower() == "true"
 
     @staticmethod
     def _parse_json(raw: str) -> Optional[dict]:
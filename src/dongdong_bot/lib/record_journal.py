@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, List
+import json
+
+
+DEFAULT_COMPACT_MIN = 200
+
+
+class RecordJournal:
+    # 快照檔維持原本的 JSON 陣列格式，之後的變動以 append-only JSONL 寫入旁邊的日誌，
+    # 每次操作只寫一行；日誌筆數超過現存紀錄數時才重寫快照並清空日誌。
+    def __init__(self, path: Path, key_field: str, compact_min: int = DEFAULT_COMPACT_MIN) -> None:
+        self.path = Path(path)
+        self.journal_path = self.path.with_name(f"{self.path.stem}.journal.jsonl")
+        self.key_field = key_field
+        self.compact_min = compact_min
+        self._journal_lines = 0
+        self._signature: tuple | None = None
+
+    def load(self) -> List[dict]:
+        records: dict[str, dict] = {}
+        for record in self._read_snapshot():
+            records[str(record.get(self.key_field, ""))] = record
+        self._journal_lines = 0
+        if self.journal_path.exists():
+            for line in self.journal_path.read_text(encoding="utf-8").splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(entry, dict):
+                    continue
+                self._journal_lines += 1
+                if entry.get("op") == "delete":
+                    records.pop(str(entry.get("key", "")), None)
+                elif isinstance(entry.get("record"), dict):
+                    record = entry["record"]
+                    records[str(record.get(self.key_field, ""))] = record
+        self._signature = self._current_signature()
+        return list(records.values())
+
+    def changed(self) -> bool:
+        return self._signature != self._current_signature()
+
+    def append(self, puts: Iterable[dict] = (), deletes: Iterable[str] = ()) -> None:
+        lines = [json.dumps({"op": "put", "record": record}, ensure_ascii=False) for record in puts]
+        lines.extend(json.dumps({"op": "delete", "key": key}, ensure_ascii=False) for key in deletes)
+        if not lines:
+            return
+        with self.journal_path.open("a", encoding="utf-8") as handle:
+            handle.write("\n".join(lines) + "\n")
+        self._journal_lines += len(lines)
+        self._signature = self._current_signature()
+
+    def needs_compaction(self, live_records: int) -> bool:
+        return self._journal_lines > max(self.compact_min, live_records)
+
+    def rewrite(self, records: List[dict]) -> None:
+        # 先寫快照再清日誌；若中途中斷，重播日誌到新快照上結果仍相同。
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path.replace(self.path)
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+        self._journal_lines = 0
+        self._signature = self._current_signature()
+
+    def _read_snapshot(self) -> List[dict]:
+        if not self.path.exists():
+            return []
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            return []
+        if not isinstance(data, list):
+            return []
+        return [item for item in data if isinstance(item, dict)]
+
+    def _current_signature(self) -> tuple:
+        return (_stat_signature(self.path), _stat_signature(self.journal_path))
+
+
+def _stat_signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
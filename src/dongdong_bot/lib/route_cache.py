@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Callable
+import hashlib
+import json
+import re
+import time
+import unicodedata
+
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 2000
+_TRAILING_PUNCTUATION = " 　。.!！？?，,、~～"
+
+
+def normalize_text(text: str) -> str:
+    cleaned = unicodedata.normalize("NFKC", text).lower()
+    cleaned = re.sub(r"\s+", " ", cleaned).strip()
+    return cleaned.strip(_TRAILING_PUNCTUATION)
+
+
+class RouteCache:
+    # 以正規化文字 + 能力清單指紋為 key 的 LRU+TTL 快取；能力清單變動時指紋改變，
+    # 舊紀錄自然失效。檔案為 append-only JSONL，行數超過現存筆數兩倍時（啟動或寫入後）壓縮。
+    def __init__(
+        self,
+        path: str | None,
+        fingerprint_fn: Callable[[], str] | None = None,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        now_fn: Callable[[], float] | None = None,
+    ) -> None:
+        self.path = Path(path) if path else None
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._fingerprint_fn = fingerprint_fn or (lambda: "")
+        self._now_fn = now_fn or time.time
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = Lock()
+        self._lines = 0
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def key(self, namespace: str, text: str) -> str:
+        blob = f"{self._fingerprint_fn()}\0{namespace}\0{normalize_text(text)}"
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, namespace: str, text: str) -> dict | None:
+        key = self.key(namespace, text)
+        now = self._now_fn()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or now - item[0] > self.ttl_seconds:
+                if item is not None:
+                    self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(item[1])
+
+    def put(self, namespace: str, text: str, payload: dict) -> None:
+        key = self.key(namespace, text)
+        stored_at = self._now_fn()
+        with self._lock:
+            self._entries[key] = (stored_at, dict(payload))
+            self._entries.move_to_end(key)
+            self._evict()
+            if self.path is None:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(
+                    json.dumps({"k": key, "t": stored_at, "p": payload}, ensure_ascii=False) + "\n"
+                )
+            self._lines += 1
+            self._maybe_compact()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        now = self._now_fn()
+        total = 0
+        for line in self.path.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                key = str(record["k"])
+                stored_at = float(record["t"])
+                payload = record["p"]
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                continue
+            total += 1
+            if not isinstance(payload, dict) or now - stored_at > self.ttl_seconds:
+                continue
+            self._entries[key] = (stored_at, payload)
+            self._entries.move_to_end(key)
+        self._evict()
+        self._lines = total
+        self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        if self._lines > 2 * max(len(self._entries), 1):
+            self._compact()
+
+    def _compact(self) -> None:
+        now = self._now_fn()
+        for key in [key for key, (stored_at, _item) in self._entries.items() if now - stored_at > self.ttl_seconds]:
+            self._entries.pop(key, None)
+        payload = "".join(
+            json.dumps({"k": key, "t": stored_at, "p": item}, ensure_ascii=False) + "\n"
+            for key, (stored_at, item) in self._entries.items()
+        )
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        tmp_path.replace(self.path)
+        self._lines = len(self._entries)
@@ -3,38 +3,48 @@ from __future__ import annotations
 import json
 import os
 import re
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from typing import Any
 
-from openai import NotFoundError, OpenAI, PermissionDeniedError
+from openai import AsyncOpenAI, NotFoundError, OpenAI, PermissionDeniedError
 
+from dongdong_bot.lib.llm_usage import LLMUsage, UsageLedger
 from dongdong_bot.lib.search_schema import SearchResponse
+from dongdong_bot.metrics import NULL_METRICS, MetricsRegistry
+from dongdong_bot.tracing import span
+
+
+KEYWORD_PROMPT = (
+    "請根據使用者提供的關鍵字搜尋網路資訊，"
+    "以 JSON 回覆，欄位包含 summary(摘要), bullets(重點列表), sources(來源連結列表)。"
+    "若沒有結果，summary 請回覆空字串，bullets 與 sources 為空陣列。"
+)
+LINK_PROMPT = (
+    "請閱讀使用者提供的連結內容並彙整摘要，"
+    "以 JSON 回覆，欄位包含 summary(摘要), bullets(重點列表), sources(來源連結列表)。"
+    "若無法存取，summary 請回覆空字串，bullets 與 sources 為空陣列。"
+)
 
 
 @dataclass
 class SearchClient:
     api_key: str
     model: str
+    metrics: MetricsRegistry = field(default=NULL_METRICS, repr=False)
+    usage_ledger: UsageLedger | None = field(default=None, repr=False)
 
     def __post_init__(self) -> None:
         self._client = OpenAI(api_key=self.api_key)
         self._fallback_models = self._load_fallback_models()
 
     def search_keyword(self, query: str) -> SearchResponse:
-        prompt = (
-            "請根據使用者提供的關鍵字搜尋網路資訊，"
-            "以 JSON 回覆，欄位包含 summary(摘要), bullets(重點列表), sources(來源連結列表)。"
-            "若沒有結果，summary 請回覆空字串，bullets 與 sources 為空陣列。"
-        )
-        return self._request_json(prompt, query)
+        with self.metrics.timer("search.keyword"), span("search.keyword", model=self.model):
+            return self._request_json(KEYWORD_PROMPT, query)
 
     def summarize_link(self, url: str) -> SearchResponse:
-        prompt = (
-            "請閱讀使用者提供的連結內容並彙整摘要，"
-            "以 JSON 回覆，欄位包含 summary(摘要), bullets(重點列表), sources(來源連結列表)。"
-            "若無法存取，summary 請回覆空字串，bullets 與 sources 為空陣列。"
-        )
-        return self._request_json(prompt, url)
+        with self.metrics.timer("search.link"), span("search.link", model=self.model):
+            return self._request_json(LINK_PROMPT, url)
 
     def _request_json(self, system_prompt: str, user_input: str) -> SearchResponse:
         content = ""
@@ -42,14 +52,11 @@ class SearchClient:
         last_response: Any | None = None
         for model in [self.model, *self._fallback_models]:
             try:
+                start = time.perf_counter()
                 response = self._client.responses.create(
-                    model=model,
-                    tools=[{"type": "web_search_preview"}],
-                    input=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_input},
-                    ],
+                    **_request_kwargs(model, system_prompt, user_input)
                 )
+                _record_usage(self.usage_ledger, model, response, start)
                 content = response.output_text or ""
                 last_response = response
                 last_error = None
@@ -59,7 +66,11 @@ class SearchClient:
                 continue
         if last_error is not None:
             raise last_error
-        parsed = self._parse_json(content)
+        return self._build_response(content, last_response)
+
+    @staticmethod
+    def _build_response(content: str, last_response: Any | None) -> SearchResponse:
+        parsed = SearchClient._parse_json(content)
         summary = ""
         bullets: list[str] = []
         sources: list[str] = []
@@ -68,9 +79,9 @@ class SearchClient:
             bullets = [str(item) for item in parsed.get("bullets", []) if item]
             sources = [str(item) for item in parsed.get("sources", []) if item]
         if not sources:
-            sources = self._extract_sources(content)
+            sources = SearchClient._extract_sources(content)
         if not sources and last_response is not None:
-            sources = self._extract_sources_from_response(last_response)
+            sources = SearchClient._extract_sources_from_response(last_response)
         return SearchResponse(
             summary=summary,
             bullets=bullets,
@@ -156,3 +167,59 @@ class SearchClient:
             return []
         blob = json.dumps(payload, ensure_ascii=False)
         return SearchClient._extract_sources(blob)
+
+
+@dataclass
+class AsyncSearchClient:
+    # SearchClient 的 AsyncOpenAI 版本，解析與備援模型邏輯沿用同步版。
+    api_key: str
+    model: str
+    metrics: MetricsRegistry = field(default=NULL_METRICS, repr=False)
+    usage_ledger: UsageLedger | None = field(default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        self._client = AsyncOpenAI(api_key=self.api_key)
+        self._fallback_models = SearchClient._load_fallback_models()
+
+    async def search_keyword(self, query: str) -> SearchResponse:
+        with self.metrics.timer("search.keyword"), span("search.keyword", model=self.model):
+            return await self._request_json(KEYWORD_PROMPT, query)
+
+    async def summarize_link(self, url: str) -> SearchResponse:
+        with self.metrics.timer("search.link"), span("search.link", model=self.model):
+            return await self._request_json(LINK_PROMPT, url)
+
+    async def _request_json(self, system_prompt: str, user_input: str) -> SearchResponse:
+        last_error: Exception | None = None
+        for model in [self.model, *self._fallback_models]:
+            try:
+                start = time.perf_counter()
+                response = await self._client.responses.create(
+                    **_request_kwargs(model, system_prompt, user_input)
+                )
+                _record_usage(self.usage_ledger, model, response, start)
+            except (NotFoundError, PermissionDeniedError) as exc:
+                last_error = exc
+                continue
+            return SearchClient._build_response(response.output_text or "", response)
+        if last_error is not None:
+            raise last_error
+        return SearchClient._build_response("", None)
+
+
+def _record_usage(ledger: UsageLedger | None, model: str, response: Any, start: float) -> None:
+    if ledger is None:
+        return
+    usage = LLMUsage.from_response(getattr(response, "usage", None))
+    ledger.record(model, usage, (time.perf_counter() - start) * 1000, site="search")
+
+
+def _request_kwargs(model: str, system_prompt: str, user_input: str) -> dict[str, Any]:
+    return {
+        "model": model,
+        "tools": [{"type": "web_search_preview"}],
+        "input": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_input},
+        ],
+    }
@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Iterator, List, Sequence
+import hashlib
+import json
+import mmap
+import struct
+
+from dongdong_bot.lib.vector_math import VectorMatrix, normalize
+
+
+INDEX_VERSION = 1
+VECTORS_FILENAME = "vectors.f32"
+ROWS_FILENAME = "rows.bin"
+CONTENT_FILENAME = "content.bin"
+META_FILENAME = "meta.json"
+FLAG_NOISE = 0x01
+
+# id(32) date(10) created_at(f64) content_offset(u64) content_length(u32) flags(u8)
+_ROW = struct.Struct("<32s10sdQIB")
+_PendingRow = tuple[str, str, str, Sequence[float], "datetime | None", bool]
+
+
+@dataclass(frozen=True)
+class VectorRecord:
+    record_id: str
+    date: str
+    content: str
+    created_at: str
+    vector: List[float] | None = None
+
+
+# vectors.f32 為正規化後的 float32 連續矩陣（查詢時 mmap 後直接內積），
+# rows.bin 為固定長度側表，content.bin 存 UTF-8 內容，只在命中時解碼。
+class VectorIndex:
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.path / VECTORS_FILENAME
+        self._rows_path = self.path / ROWS_FILENAME
+        self._content_path = self.path / CONTENT_FILENAME
+        self._meta_path = self.path / META_FILENAME
+        self._lock = Lock()
+        self._meta = self._load_meta()
+        self._count = 0
+        self._noise_rows: set[int] = set()
+        self._vectors_map: mmap.mmap | None = None
+        self._rows_map: mmap.mmap | None = None
+        self._content_map: mmap.mmap | None = None
+        self._signature: tuple[int, int, int] | None = None
+
+    @property
+    def dim(self) -> int:
+        return int(self._meta.get("dim") or 0)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._count
+
+    def append(
+        self,
+        record_id: str,
+        date: str,
+        content: str,
+        vector: Sequence[float],
+        created_at: datetime | None = None,
+        noise: bool = False,
+    ) -> None:
+        normalized = normalize(vector)
+        if not normalized:
+            raise ValueError("向量不可為空或全為 0")
+        with self._lock:
+            self._refresh()
+            if not self.dim:
+                self._meta["dim"] = len(normalized)
+                self._write_meta()
+            if len(normalized) != self.dim:
+                raise ValueError(f"向量維度不符: {len(normalized)} != {self.dim}")
+            self._append_rows([(record_id, date, content, normalized, created_at, noise)])
+
+    def search(
+        self,
+        query: Sequence[float],
+        top_k: int = 5,
+        min_score: float = 0.0,
+    ) -> List[tuple[VectorRecord, float]]:
+        with self._lock:
+            self._refresh()
+            if not self._count or top_k <= 0 or len(query) != self.dim:
+                return []
+            self._ensure_mapped()
+            with VectorMatrix.from_buffer(self._vectors_map, self._count, self.dim) as matrix:
+                ranked = matrix.top_k(
+                    query, top_k, min_score=min_score, exclude=self._noise_rows
+                )
+            return [(self._read_record(row), score) for row, score in ranked]
+
+    def records(self, with_vectors: bool = False) -> Iterator[VectorRecord]:
+        with self._lock:
+            self._refresh()
+            self._ensure_mapped()
+            items = [self._read_record(row, with_vectors) for row in range(self._count)]
+        return iter(items)
+
+    def rewrite(self, keep_fn: Callable[[VectorRecord], bool]) -> int:
+        with self._lock:
+            self._refresh()
+            self._ensure_mapped()
+            kept: List[tuple[VectorRecord, bool]] = []
+            removed = 0
+            for row in range(self._count):
+                record = self._read_record(row, with_vectors=True)
+                if keep_fn(record):
+                    kept.append((record, row in self._noise_rows))
+                else:
+                    removed += 1
+            if removed:
+                self._reset_files()
+                self._append_rows(
+                    [
+                        (
+                            record.record_id,
+                            record.date,
+                            record.content,
+                            record.vector or [],
+                            _parse_created_at(record.created_at),
+                            noise,
+                        )
+                        for record, noise in kept
+                    ]
+                )
+            return removed
+
+    def clear(self) -> int:
+        with self._lock:
+            self._refresh()
+            removed = self._count
+            self._reset_files()
+            self._meta = {"version": INDEX_VERSION, "dim": 0}
+            self._write_meta()
+            return removed
+
+    def needs_import(self, source: str | Path) -> bool:
+        signature = _file_signature(Path(source))
+        if signature is None:
+            return False
+        return self._meta.get("source") != list(signature)
+
+    def mark_imported(self, source: str | Path) -> None:
+        with self._lock:
+            signature = _file_signature(Path(source))
+            if signature is None:
+                self._meta.pop("source", None)
+            else:
+                self._meta["source"] = list(signature)
+            self._write_meta()
+
+    def import_jsonl(
+        self,
+        source: str | Path,
+        noise_fn: Callable[[str], bool] | None = None,
+    ) -> int:
+        source = Path(source)
+        if not source.exists():
+            return 0
+        pending: List[_PendingRow] = []
+        with self._lock:
+            self._refresh()
+            self._ensure_mapped()
+            known = {self._read_record_id(row) for row in range(self._count)}
+            with source.open("r", encoding="utf-8") as handle:
+                for line in handle:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    vector = record.get("vector")
+                    content = str(record.get("content", "") or "")
+                    if not isinstance(vector, list) or not vector or not content:
+                        continue
+                    record_id = _coerce_id(record.get("id"), content)
+                    if record_id in known:
+                        continue
+                    normalized = normalize(vector)
+                    if not normalized:
+                        continue
+                    if not self.dim:
+                        self._meta["dim"] = len(normalized)
+                    if len(normalized) != self.dim:
+                        continue
+                    pending.append(
+                        (
+                            record_id,
+                            str(record.get("date", "") or ""),
+                            content,
+                            normalized,
+                            _parse_created_at(record.get("created_at")),
+                            bool(noise_fn and noise_fn(content)),
+                        )
+                    )
+                    known.add(record_id)
+            self._append_rows(pending)
+            signature = _file_signature(source)
+            if signature is not None:
+                self._meta["source"] = list(signature)
+            self._write_meta()
+        return len(pending)
+
+    def export_jsonl(self, target: str | Path) -> int:
+        target = Path(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        exported = 0
+        tmp_path = target.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            for record in self.records(with_vectors=True):
+                payload = {
+                    "id": record.record_id,
+                    "date": record.date,
+                    "content": record.content,
+                    "vector": record.vector,
+                    "created_at": record.created_at,
+                }
+                handle.write(json.dumps(payload, ensure_ascii=False) + "\n")
+                exported += 1
+        tmp_path.replace(target)
+        return exported
+
+    def close(self) -> None:
+        with self._lock:
+            self._unmap()
+
+    def _append_rows(self, items: Sequence[_PendingRow]) -> None:
+        if not items:
+            return
+        self._unmap()
+        contents = bytearray()
+        vectors = bytearray()
+        rows = bytearray()
+        offset = self._content_path.stat().st_size if self._content_path.exists() else 0
+        for record_id, date, content, normalized, created_at, noise in items:
+            encoded = content.encode("utf-8")
+            vectors += struct.pack(f"<{len(normalized)}f", *normalized)
+            rows += _ROW.pack(
+                _coerce_id(record_id, content).encode("ascii"),
+                date.encode("ascii", errors="ignore")[:10],
+                (created_at or datetime.now()).timestamp(),
+                offset + len(contents),
+                len(encoded),
+                FLAG_NOISE if noise else 0,
+            )
+            contents += encoded
+            if noise:
+                self._noise_rows.add(self._count)
+            self._count += 1
+        # 內容與向量先寫入，側表最後寫入，作為該列的提交點。
+        with self._content_path.open("ab") as handle:
+            handle.write(contents)
+        with self._vectors_path.open("ab") as handle:
+            handle.write(vectors)
+        with self._rows_path.open("ab") as handle:
+            handle.write(rows)
+        self._signature = self._current_signature()
+
+    def _refresh(self) -> None:
+        signature = self._current_signature()
+        if signature == self._signature:
+            return
+        self._unmap()
+        self._meta = self._load_meta()
+        rows_size = signature[0]
+        count = rows_size // _ROW.size
+        if self.dim:
+            count = min(count, signature[1] // (4 * self.dim))
+        else:
+            count = 0
+        self._count = count
+        self._noise_rows = set()
+        if count:
+            with self._rows_path.open("rb") as handle:
+                data = handle.read(count * _ROW.size)
+            for row, fields in enumerate(_ROW.iter_unpack(data)):
+                if fields[5] & FLAG_NOISE:
+                    self._noise_rows.add(row)
+        self._signature = signature
+
+    def _current_signature(self) -> tuple[int, int, int]:
+        rows = _file_signature(self._rows_path) or (0, 0)
+        vectors = _file_signature(self._vectors_path) or (0, 0)
+        return rows[0], vectors[0], rows[1]
+
+    def _ensure_mapped(self) -> None:
+        if not self._count or self._vectors_map is not None:
+            return
+        self._vectors_map = _map_file(self._vectors_path)
+        self._rows_map = _map_file(self._rows_path)
+        self._content_map = _map_file(self._content_path)
+
+    def _unmap(self) -> None:
+        for attr in ("_vectors_map", "_rows_map", "_content_map"):
+            handle = getattr(self, attr)
+            if handle is not None:
+                handle.close()
+                setattr(self, attr, None)
+
+    def _read_record_id(self, row: int) -> str:
+        fields = _ROW.unpack_from(self._rows_map, row * _ROW.size)
+        return fields[0].rstrip(b"\x00").decode("ascii")
+
+    def _read_record(self, row: int, with_vectors: bool = False) -> VectorRecord:
+        raw_id, raw_date, timestamp, offset, length, _flags = _ROW.unpack_from(
+            self._rows_map, row * _ROW.size
+        )
+        content = ""
+        if length and self._content_map is not None:
+            content = self._content_map[offset : offset + length].decode("utf-8", errors="replace")
+        vector = None
+        if with_vectors:
+            start = row * self.dim * 4
+            vector = list(struct.unpack_from(f"<{self.dim}f", self._vectors_map, start))
+        return VectorRecord(
+            record_id=raw_id.rstrip(b"\x00").decode("ascii"),
+            date=raw_date.rstrip(b"\x00").decode("ascii"),
+            content=content,
+            created_at=datetime.fromtimestamp(timestamp).isoformat(),
+            vector=vector,
+        )
+
+    def _reset_files(self) -> None:
+        self._unmap()
+        for path in (self._vectors_path, self._rows_path, self._content_path):
+            path.unlink(missing_ok=True)
+        self._count = 0
+        self._noise_rows = set()
+        self._signature = self._current_signature()
+
+    def _load_meta(self) -> dict:
+        if not self._meta_path.exists():
+            return {"version": INDEX_VERSION, "dim": 0}
+        try:
+            data = json.loads(self._meta_path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            return {"version": INDEX_VERSION, "dim": 0}
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return {"version": INDEX_VERSION, "dim": 0}
+        return data
+
+    def _write_meta(self) -> None:
+        tmp_path = self._meta_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._meta, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(self._meta_path)
+
+
+def _map_file(path: Path) -> mmap.mmap | None:
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+    with path.open("rb") as handle:
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _file_signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _coerce_id(raw_id: object, content: str) -> str:
+    text = str(raw_id or "").strip()
+    if text and text.isascii() and len(text) <= 32:
+        return text
+    seed = text or content
+    return hashlib.md5(seed.encode("utf-8")).hexdigest()
+
+
+def _parse_created_at(raw: object) -> datetime | None:
+    if not raw:
+        return None
+    try:
+        return datetime.fromisoformat(str(raw))
+    except ValueError:
+        return None
@@ -1,7 +1,15 @@
 from __future__ import annotations
 
-from math import sqrt
-from typing import Iterable, Sequence
+from heapq import nlargest
+from math import inf, sqrt
+from typing import Collection, Iterable, List, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
 
 
 def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
@@ -21,4 +29,109 @@ def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
 
 
 def top_k_scored(items: Iterable[tuple[str, float]], k: int) -> list[tuple[str, float]]:
-    return sorted(items, key=lambda item: item[1], reverse=True)[:k]
+    if k <= 0:
+        return []
+    return nlargest(k, items, key=lambda item: item[1])
+
+
+def normalize(vector: Sequence[float]) -> List[float]:
+    norm = sqrt(sum(float(x) * float(x) for x in vector))
+    if norm == 0.0:
+        return []
+    return [float(x) / norm for x in vector]
+
+
+# (N, d) 的正規化矩陣，以一次內積對所有列評分；有 NumPy 時使用 float32 陣列，
+# 沒有時退回純 Python 平坦序列，選取 top-k 皆採部分選取而非完整排序。
+class VectorMatrix:
+    def __init__(self, data, rows: int, dim: int) -> None:
+        self._data = data
+        self.rows = rows
+        self.dim = dim
+        self._views: list[memoryview] = []
+
+    @classmethod
+    def from_vectors(cls, vectors: Sequence[Sequence[float]]) -> "VectorMatrix":
+        normalized = [normalize(vector) for vector in vectors]
+        dim = len(normalized[0]) if normalized else 0
+        rows = [row if len(row) == dim else [0.0] * dim for row in normalized]
+        if np is not None:
+            data = np.asarray(rows, dtype=np.float32).reshape(len(rows), dim)
+        else:
+            data = [value for row in rows for value in row]
+        return cls(data, len(rows), dim)
+
+    @classmethod
+    def from_buffer(cls, buffer, rows: int, dim: int) -> "VectorMatrix":
+        # buffer 需為已正規化的 little-endian float32 連續列，例如 mmap。
+        if np is not None:
+            data = np.frombuffer(buffer, dtype="<f4", count=rows * dim).reshape(rows, dim)
+            return cls(data, rows, dim)
+        raw = memoryview(buffer)
+        flat = raw[: rows * dim * 4].cast("f")
+        matrix = cls(flat, rows, dim)
+        matrix._views = [flat, raw]
+        return matrix
+
+    def scores(self, query: Sequence[float]) -> Sequence[float]:
+        if len(query) != self.dim or not self.rows:
+            return []
+        normalized = normalize(query)
+        if not normalized:
+            return [0.0] * self.rows
+        if np is not None:
+            return self._data @ np.asarray(normalized, dtype=np.float32)
+        dim = self.dim
+        data = self._data
+        return [
+            sum(x * y for x, y in zip(data[base : base + dim], normalized))
+            for base in range(0, self.rows * dim, dim)
+        ]
+
+    def top_k(
+        self,
+        query: Sequence[float],
+        k: int,
+        min_score: float = -inf,
+        exclude: Collection[int] = (),
+    ) -> List[tuple[int, float]]:
+        return top_k_indices(self.scores(query), k, min_score=min_score, exclude=exclude)
+
+    def release(self) -> None:
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._data = None
+
+    def __enter__(self) -> "VectorMatrix":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.release()
+
+
+def top_k_indices(
+    scores: Sequence[float],
+    k: int,
+    min_score: float = -inf,
+    exclude: Collection[int] = (),
+) -> List[tuple[int, float]]:
+    if k <= 0 or len(scores) == 0:
+        return []
+    if np is not None:
+        values = np.asarray(scores, dtype=np.float32)
+        mask = values >= min_score
+        if exclude:
+            mask[list(exclude)] = False
+        candidates = np.flatnonzero(mask)
+        if candidates.size > k:
+            picked = np.argpartition(values[candidates], -k)[-k:]
+            candidates = candidates[picked]
+        order = candidates[np.argsort(-values[candidates], kind="stable")]
+        return [(int(idx), float(values[idx])) for idx in order]
+    pairs = (
+        (idx, float(score))
+        for idx, score in enumerate(scores)
+        if score >= min_score and idx not in exclude
+    )
+    return nlargest(k, pairs, key=lambda item: item[1])
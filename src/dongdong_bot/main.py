@@ -1,36 +1,51 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
+import functools
+import threading
 import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
 import json
 from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator
 
-from openai import NotFoundError, OpenAI, PermissionDeniedError
+from openai import AsyncOpenAI, NotFoundError, OpenAI, PermissionDeniedError
 
 from dongdong_bot.agent.allowlist_store import AllowlistEntry, AllowlistStore
 from dongdong_bot.agent.capability_catalog import CapabilityCatalog
-from dongdong_bot.agent.intent_router import IntentRouter
+from dongdong_bot.agent.intent_router import IntentDecision, IntentRouter
 from dongdong_bot.agent.reminder_store import ReminderStore
 from dongdong_bot.agent.schedule_parser import ScheduleCommand, ScheduleParser
 from dongdong_bot.agent.schedule_service import ScheduleService
 from dongdong_bot.agent.schedule_store import ScheduleStore
 from dongdong_bot.agent.skills import SkillRegistry
 from dongdong_bot.agent.session import SessionStore
+from dongdong_bot.agent.session_journal import SessionJournal
 from dongdong_bot.agent.loop import GoapEngine
 from dongdong_bot.agent.memory import MemoryStore, is_short_term_query, search_session_messages
+from dongdong_bot.channels.dispatch import UserDispatcher
 from dongdong_bot.channels.telegram import IncomingMessage, TelegramClient
-from dongdong_bot.config import load_config
+from dongdong_bot.config import Config, load_config
 from dongdong_bot.cron.scheduler import ReminderScheduler
-from dongdong_bot.lib.embedding_client import EmbeddingClient
+from dongdong_bot.lib.embedding_client import AsyncEmbeddingClient, EmbeddingClient
 from dongdong_bot.lib.intent_classifier import IntentClassifier, IntentExample
-from dongdong_bot.lib.search_client import SearchClient
+from dongdong_bot.lib.search_client import AsyncSearchClient, SearchClient
 from dongdong_bot.lib.search_formatter import SearchFormatter
+from dongdong_bot.lib.vector_math import HAS_NUMPY
+from dongdong_bot.lib.search_schema import SearchResponse
+from dongdong_bot.lib.nl_search_schema import NLSearchPlan
 from dongdong_bot.lib.nl_search_topic import NLSearchTopicExtractor
 from dongdong_bot.lib.report_content import normalize_report_content
 from dongdong_bot.lib.report_writer import ReportWriter
+from dongdong_bot.lib.llm_usage import LLMUsage, UsageLedger, call_site, usage_user
 from dongdong_bot.lib.response_style import ResponseStyler
+from dongdong_bot.lib.route_cache import RouteCache
+from dongdong_bot.metrics import MetricsRegistry, SnapshotWriter, start_http_exporter
 from dongdong_bot.monitoring import Monitoring
-from dongdong_bot.lib.vector_math import cosine_similarity, top_k_scored
+from dongdong_bot.tracing import Tracer, add_span, annotate, propagate, span
 
 
 SKILL_MEMORY_SAVE = "memory-save"
@@ -47,16 +62,115 @@ DECISION_LABELS = {
 
 
 class OpenAIClient:
-    def __init__(self, api_key: str) -> None:
+    def __init__(self, api_key: str, usage_ledger: UsageLedger | None = None) -> None:
         self.client = OpenAI(api_key=api_key)
+        self._local = threading.local()
+        self.usage_ledger = usage_ledger
 
     def generate(self, model: str, prompt: str) -> str:
-        response = self.client.responses.create(
+        with span("llm.generate", model=model):
+            start = time.perf_counter()
+            response = self.client.responses.create(
+                model=model,
+                input=[{"role": "user", "content": prompt}],
+            )
+            self._local.usage = LLMUsage.from_response(getattr(response, "usage", None))
+            _annotate_usage(self._local.usage)
+            _record_usage(self.usage_ledger, model, self._local.usage, start)
+        return response.output_text
+
+    def generate_stream(self, model: str, prompt: str) -> Iterator[str]:
+        # 先清掉上一次的用量；提前停止迭代或例外時仍記錄這次呼叫。
+        self._local.usage = None
+        start = time.perf_counter()
+        stream = self.client.responses.create(
             model=model,
             input=[{"role": "user", "content": prompt}],
+            stream=True,
         )
+        try:
+            for event in stream:
+                event_type = getattr(event, "type", "")
+                if event_type == "response.output_text.delta":
+                    yield event.delta
+                elif event_type == "response.completed":
+                    usage = getattr(getattr(event, "response", None), "usage", None)
+                    self._local.usage = LLMUsage.from_response(usage)
+        finally:
+            add_span("llm.stream", start, model=model, **_usage_attrs(self._local.usage))
+            _record_usage(self.usage_ledger, model, self._local.usage, start)
+
+    def last_usage(self) -> LLMUsage | None:
+        # 以執行緒區分，fan-out 的並行呼叫不會互相覆蓋。
+        return getattr(self._local, "usage", None)
+
+
+class AsyncOpenAIClient:
+    def __init__(self, api_key: str, usage_ledger: UsageLedger | None = None) -> None:
+        self.client = AsyncOpenAI(api_key=api_key)
+        self.usage_ledger = usage_ledger
+        # 以 contextvar 記錄用量，每個 asyncio task 各自一份。
+        self._usage: contextvars.ContextVar[LLMUsage | None] = contextvars.ContextVar(
+            "llm_usage", default=None
+        )
+
+    async def generate(self, model: str, prompt: str) -> str:
+        with span("llm.generate", model=model):
+            start = time.perf_counter()
+            response = await self.client.responses.create(
+                model=model,
+                input=[{"role": "user", "content": prompt}],
+            )
+            self._usage.set(LLMUsage.from_response(getattr(response, "usage", None)))
+            _annotate_usage(self._usage.get())
+            _record_usage(self.usage_ledger, model, self._usage.get(), start)
         return response.output_text
 
+    async def generate_stream(self, model: str, prompt: str) -> AsyncIterator[str]:
+        # 先清掉上一次的用量；提前停止迭代或例外時仍記錄這次呼叫。
+        self._usage.set(None)
+        start = time.perf_counter()
+        stream = await self.client.responses.create(
+            model=model,
+            input=[{"role": "user", "content": prompt}],
+            stream=True,
+        )
+        try:
+            async for event in stream:
+                event_type = getattr(event, "type", "")
+                if event_type == "response.output_text.delta":
+                    yield event.delta
+                elif event_type == "response.completed":
+                    usage = getattr(getattr(event, "response", None), "usage", None)
+                    self._usage.set(LLMUsage.from_response(usage))
+        finally:
+            add_span("llm.stream", start, model=model, **_usage_attrs(self._usage.get()))
+            _record_usage(self.usage_ledger, model, self._usage.get(), start)
+
+    def last_usage(self) -> LLMUsage | None:
+        return self._usage.get()
+
+
+def _usage_attrs(usage: LLMUsage | None) -> dict[str, int]:
+    if usage is None:
+        return {}
+    return {
+        "input_tokens": usage.input_tokens,
+        "cached_input_tokens": usage.cached_input_tokens,
+        "output_tokens": usage.output_tokens,
+    }
+
+
+def _annotate_usage(usage: LLMUsage | None) -> None:
+    attrs = _usage_attrs(usage)
+    if attrs:
+        annotate(**attrs)
+
+
+def _record_usage(ledger: UsageLedger | None, model: str, usage: LLMUsage | None, start: float) -> None:
+    if ledger is not None:
+        ledger.record(model, usage, (time.perf_counter() - start) * 1000)
+
 
 def _handle_search_command(
     text: str,
@@ -96,6 +210,44 @@ def _handle_summary_command(
         return _format_search_error(exc, formatter, default_reason="連結摘要失敗")
 
 
+async def _ahandle_search_command(
+    text: str,
+    search_client: AsyncSearchClient,
+    formatter: SearchFormatter,
+    monitoring: Monitoring | None = None,
+) -> str:
+    query = text.replace("/search", "", 1).strip()
+    if not query:
+        return "請提供關鍵字，例如：/search 台灣能源政策"
+    try:
+        response = await search_client.search_keyword(query)
+        return formatter.format(response)
+    except Exception as exc:
+        if monitoring is not None:
+            monitoring.error(exc)
+            monitoring.error_event("search", str(exc))
+        return _format_search_error(exc, formatter)
+
+
+async def _ahandle_summary_command(
+    text: str,
+    search_client: AsyncSearchClient,
+    formatter: SearchFormatter,
+    monitoring: Monitoring | None = None,
+) -> str:
+    url = text.replace("/summary", "", 1).strip()
+    if not url:
+        return "請提供連結，例如：/summary https://example.com"
+    try:
+        response = await search_client.summarize_link(url)
+        return formatter.format(response)
+    except Exception as exc:
+        if monitoring is not None:
+            monitoring.error(exc)
+            monitoring.error_event("summary", str(exc))
+        return _format_search_error(exc, formatter, default_reason="連結摘要失敗")
+
+
 def _format_search_error(
     exc: Exception,
     formatter: SearchFormatter,
@@ -156,6 +308,28 @@ def _handle_allowlist_command(text: str, store: AllowlistStore) -> str:
     return "用法：/allowlist list | /allowlist add <user_id> [channel] | /allowlist remove <user_id> [channel]"
 
 
+def _log_route_decision(
+    monitoring: Monitoring,
+    metrics: MetricsRegistry,
+    intent_router: IntentRouter,
+    decision: IntentDecision,
+    usage: LLMUsage | None,
+) -> None:
+    metrics.inc(f"route.tier.{decision.tier}")
+    route_stats = intent_router.tier_stats()
+    monitoring.info(
+        "router_decision="
+        f"{decision.capability} missing={decision.missing_inputs} "
+        f"clarify={decision.needs_clarification} confidence={decision.confidence:.2f} "
+        f"tier={decision.tier} llm_avoided={route_stats['llm_avoided']}/{route_stats['total']}"
+    )
+    if decision.tier == "llm" and usage is not None:
+        monitoring.info(
+            "router_prompt_tokens="
+            f"cached={usage.cached_input_tokens} uncached={usage.uncached_input_tokens}"
+        )
+
+
 def _append_decision_note(reply: str, capability: str) -> str:
     label = DECISION_LABELS.get(capability, "一般回覆")
     return f"【{label}】{reply}"
@@ -207,10 +381,15 @@ def _extract_schedule_from_llm(
         f"目前時間: {now.strftime('%Y-%m-%d %H:%M')}\n"
         f"使用者輸入: {user_text}\n"
     )
-    raw = llm_client.generate(model=model, prompt=prompt)
+    with call_site("schedule_extract"):
+        raw = llm_client.generate(model=model, prompt=prompt)
     parsed = _parse_json_object(raw.strip()) if raw else None
     if not parsed:
         return None
+    return _schedule_command_from_slots(parsed)
+
+
+def _schedule_command_from_slots(parsed: dict) -> ScheduleCommand | None:
     dt_raw = str(parsed.get("datetime", "") or "").strip()
     title = str(parsed.get("title", "") or "").strip()
     if not dt_raw:
@@ -230,26 +409,12 @@ def _semantic_memory_fallback(
     memory_store: MemoryStore,
     min_score: float = 0.25,
 ) -> tuple[list[str], str]:
+    # 只查索引；只有 Markdown 的記憶由背景回填補進索引，不在請求路徑上嵌入。
     embedding = embedding_client.embed(text)
     semantic_hits = memory_store.semantic_search(embedding, min_score=min_score)
     semantic_hits = memory_store.filter_by_score(semantic_hits)
     if semantic_hits:
         return [item for item, _score in semantic_hits], "embedding_index"
-
-    candidates = memory_store.recent_entries()
-    if not candidates:
-        return [], "recent_empty"
-    scored = []
-    for item in candidates:
-        try:
-            item_vector = embedding_client.embed(item)
-        except Exception:
-            continue
-        score = cosine_similarity(embedding, item_vector)
-        if score >= min_score:
-            scored.append((item, score))
-    if scored:
-        return [item for item, _score in top_k_scored(scored, 5)], "recent_semantic"
     return [], "no_match"
 
 
@@ -263,7 +428,8 @@ def _normalize_memory_fallback(
         "只輸出一句話，不要引號。\n\n"
         f"使用者輸入: {text}\n"
     )
-    return llm_client.generate(model=model, prompt=prompt).strip()
+    with call_site("memory_normalize"):
+        return llm_client.generate(model=model, prompt=prompt).strip()
 
 
 def _focus_memory_query(
@@ -278,7 +444,8 @@ def _focus_memory_query(
         "只輸出短語，不要解釋或加標點；無法改寫就原樣輸出。\n\n"
         f"使用者問題: {text}\n"
     )
-    raw = llm_client.generate(model=model, prompt=prompt).strip()
+    with span("memory.focus"), call_site("focus"):
+        raw = llm_client.generate(model=model, prompt=prompt).strip()
     cleaned = raw.strip().strip("「」\"'`")
     return cleaned or text.strip()
 
@@ -301,7 +468,8 @@ def _summarize_memory_hits(
         + "\n".join(f"- {item}" for item in results)
         + "\n"
     )
-    raw = llm_client.generate(model=model, prompt=prompt).strip()
+    with span("memory.summarize", candidates=len(results)), call_site("summarize"):
+        raw = llm_client.generate(model=model, prompt=prompt).strip()
     parsed = _parse_json_list(raw)
     if parsed is None:
         return None
@@ -357,6 +525,97 @@ def _memory_query_hint(
     return True, source if results else "keyword", len(results)
 
 
+def _keyword_memory_query(
+    memory_store: MemoryStore,
+    query: str,
+    memory_date: str | None,
+    memory_date_range: dict[str, str] | None,
+) -> list[str]:
+    with span("memory.keyword") as current:
+        results: list[str] = []
+        if memory_date_range:
+            start = memory_date_range.get("start")
+            end = memory_date_range.get("end")
+            if start and end:
+                results = memory_store.query_range(query, start, end)
+        elif memory_date:
+            results = memory_store.query(query, date=memory_date)
+        else:
+            results = memory_store.query(query)
+        current.set(hits=len(results))
+        return results
+
+
+def _recall_memories(
+    executor: Executor,
+    llm_client: OpenAIClient,
+    model: str,
+    embedding_client: EmbeddingClient,
+    memory_store: MemoryStore,
+    query_text: str,
+    memory_date: str | None,
+    memory_date_range: dict[str, str] | None,
+    monitoring: Monitoring,
+) -> list[str]:
+    # 查詢改寫、原句嵌入與原句關鍵字查詢互不相依，先同時送出；
+    # 改寫結果出來後只需補做改寫句的嵌入與關鍵字查詢。
+    focus_future = executor.submit(propagate(_focus_memory_query), llm_client, model, query_text)
+    raw_embed_future = executor.submit(propagate(embedding_client.embed), query_text)
+    raw_keyword_future = executor.submit(
+        propagate(_keyword_memory_query), memory_store, query_text, memory_date, memory_date_range
+    )
+    focus_query = query_text
+    try:
+        focus_query = focus_future.result() or query_text
+        if focus_query != query_text:
+            monitoring.info(f"memory_focus={focus_query}")
+    except Exception:
+        monitoring.info("memory_focus_failed=1")
+    focus_embed_future = raw_embed_future
+    focus_keyword_future = raw_keyword_future
+    if focus_query != query_text:
+        focus_embed_future = executor.submit(propagate(embedding_client.embed), focus_query)
+        focus_keyword_future = executor.submit(
+            propagate(_keyword_memory_query), memory_store, focus_query, memory_date, memory_date_range
+        )
+
+    embedding = None
+    try:
+        embedding = focus_embed_future.result()
+    except Exception:
+        monitoring.info("memory_embed_failed=1")
+        if focus_embed_future is not raw_embed_future:
+            try:
+                embedding = raw_embed_future.result()
+            except Exception:
+                monitoring.info("memory_embed_failed=1 original=1")
+    if embedding is not None:
+        with span("memory.semantic_search") as current:
+            semantic_hits = memory_store.semantic_search(embedding)
+            semantic_hits = memory_store.filter_by_score(semantic_hits)
+            current.set(hits=len(semantic_hits))
+        if semantic_hits:
+            return [item for item, _score in semantic_hits]
+
+    results = focus_keyword_future.result()
+    if not results and focus_keyword_future is not raw_keyword_future:
+        results = raw_keyword_future.result()
+    if results:
+        return results
+    try:
+        semantic_hits, source = _semantic_memory_fallback(
+            focus_query,
+            embedding_client,
+            memory_store,
+        )
+        if semantic_hits:
+            monitoring.info(f"memory_fallback={source}")
+            return semantic_hits
+    except Exception:
+        monitoring.info("memory_fallback_failed=1")
+    return []
+
+
 def _is_explicit_memory_save(text: str) -> bool:
     keywords = ("記住", "記下", "備忘", "記得")
     return any(keyword in text for keyword in keywords)
@@ -420,20 +679,104 @@ def _coerce_message(payload: IncomingMessage | str) -> tuple[str, str, str, str]
     return str(payload), "local", "local", "local"
 
 
-def main() -> None:
-    config = load_config()
-    monitoring = Monitoring(
+@dataclass
+class BotClients:
+    # 對外 API 的六個用戶端；基準測試以本機替身取代。
+    llm: Any
+    async_llm: Any
+    embedding: Any
+    async_embedding: Any
+    search: Any
+    async_search: Any
+
+
+@dataclass
+class Bot:
+    config: Config
+    monitoring: Monitoring
+    metrics: MetricsRegistry
+    tracer: Tracer
+    usage_ledger: UsageLedger
+    scheduler: ReminderScheduler
+    session_store: SessionStore
+    handle_message: Callable[..., Any]
+    handle_message_async: Callable[..., Awaitable[Any]]
+    allowlist_checker: Callable[[IncomingMessage], bool]
+    fanout_executor: Executor
+    backfill_executor: Executor
+
+    def close(self) -> None:
+        self.session_store.close()
+        self.usage_ledger.close()
+        self.fanout_executor.shutdown(wait=False)
+        self.backfill_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def build_clients(config: Config, metrics: MetricsRegistry, usage_ledger: UsageLedger) -> BotClients:
+    embedding_client = EmbeddingClient(
+        config.embedding_api_key,
+        config.embedding_model,
+        cache_path=config.embedding_cache_path,
+        metrics=metrics,
+        usage_ledger=usage_ledger,
+    )
+    return BotClients(
+        llm=OpenAIClient(config.openai_api_key, usage_ledger=usage_ledger),
+        async_llm=AsyncOpenAIClient(config.openai_api_key, usage_ledger=usage_ledger),
+        embedding=embedding_client,
+        async_embedding=AsyncEmbeddingClient(
+            config.embedding_api_key,
+            config.embedding_model,
+            cache=embedding_client.cache,
+            metrics=metrics,
+            usage_ledger=usage_ledger,
+        ),
+        search=SearchClient(
+            config.search_api_key, config.search_model, metrics=metrics, usage_ledger=usage_ledger
+        ),
+        async_search=AsyncSearchClient(
+            config.search_api_key, config.search_model, metrics=metrics, usage_ledger=usage_ledger
+        ),
+    )
+
+
+def build_bot(
+    config: Config,
+    clients: BotClients | None = None,
+    monitoring: Monitoring | None = None,
+    metrics: MetricsRegistry | None = None,
+) -> Bot:
+    monitoring = monitoring or Monitoring(
         heartbeat_interval_seconds=config.heartbeat_interval_seconds,
         error_throttle_seconds=config.error_throttle_seconds,
     )
-    llm_client = OpenAIClient(config.openai_api_key)
-    embedding_client = EmbeddingClient(config.embedding_api_key, config.embedding_model)
-    search_client = SearchClient(config.search_api_key, config.search_model)
+    metrics = metrics or MetricsRegistry(enabled=config.perf_log)
+    usage_ledger = UsageLedger(config.llm_usage_path, metrics=metrics)
+    tracer = Tracer(
+        config.trace_path,
+        sample_rate=config.trace_sample_rate,
+        slow_ms=config.trace_slow_ms,
+    )
+    clients = clients or build_clients(config, metrics, usage_ledger)
+    llm_client = clients.llm
+    embedding_client = clients.embedding
+    search_client = clients.search
+    async_llm_client = clients.async_llm
+    async_embedding_client = clients.async_embedding
+    async_search_client = clients.async_search
     search_formatter = SearchFormatter()
     report_writer = ReportWriter(config.reports_path)
+    capability_catalog = CapabilityCatalog(config.capabilities_path)
+    route_cache = RouteCache(
+        config.route_decision_cache_path,
+        fingerprint_fn=lambda: capability_catalog.fingerprint,
+        ttl_seconds=config.route_cache_ttl_seconds,
+        max_entries=config.route_cache_max_entries,
+    )
     nl_topic = NLSearchTopicExtractor(
         generate=llm_client.generate,
         model=config.fast_model,
+        cache=route_cache,
     )
     response_styler = ResponseStyler()
     intent_classifier = IntentClassifier(
@@ -477,17 +820,30 @@ def main() -> None:
         max_iters_cap=config.max_iters_cap,
         no_progress_limit=config.no_progress_limit,
         json_retry_limit=config.json_retry_limit,
-        perf_log=config.perf_log,
+        async_llm_client=async_llm_client,
+        metrics=metrics,
     )
     memory_store = MemoryStore(
         config.memory_dir,
         embedding_index_path=config.embedding_index_path,
+        vector_index_path=config.vector_index_path,
+        keyword_index_path=config.keyword_index_path,
     )
     schedule_store = ScheduleStore(config.schedules_path)
     reminder_store = ReminderStore(config.reminders_path)
     schedule_parser = ScheduleParser()
     scheduler = ReminderScheduler(schedule_store, reminder_store)
-    session_store = SessionStore()
+    session_journal = (
+        SessionJournal(
+            config.session_journal_path,
+            flush_interval=config.session_flush_interval_seconds,
+        )
+        if config.session_journal_path
+        else None
+    )
+    session_store = SessionStore(max_sessions=config.session_max_entries, journal=session_journal)
+    metrics.register_gauge("session.live", lambda: len(session_store))
+    metrics.register_gauge("session.journal_pending", lambda: session_journal.pending() if session_journal else 0)
     schedule_service = ScheduleService(schedule_store, reminder_store, session_store)
     skills_dir = Path(__file__).resolve().parents[2] / "resources" / "skills"
     skill_registry = SkillRegistry(
@@ -495,18 +851,108 @@ def main() -> None:
         state_path=config.skills_state_path,
     )
     allowlist_store = AllowlistStore(config.allowlist_path)
-    capability_catalog = CapabilityCatalog(config.capabilities_path)
+    fanout_executor = ThreadPoolExecutor(
+        max_workers=config.fanout_workers,
+        thread_name_prefix="dongdong-fanout",
+    )
+    route_classifier = IntentClassifier(
+        embedding_client,
+        examples=[
+            IntentExample(capability.name, example)
+            for capability in capability_catalog.list_capabilities()
+            for example in capability.example_requests
+        ],
+        cache_path=config.route_cache_path,
+    )
     intent_router = IntentRouter(
         generate=llm_client.generate,
         model=config.fast_model,
         catalog=capability_catalog,
+        schedule_parser=schedule_parser,
+        intent_classifier=route_classifier.classify,
+        fast_path_threshold=config.route_fast_path_threshold,
+        cache=route_cache,
+        usage_fn=llm_client.last_usage,
+        combined_slots=config.route_combined_slots,
+        agenerate=async_llm_client.generate,
+        ausage_fn=async_llm_client.last_usage,
+        aintent_classifier=functools.partial(
+            route_classifier.aclassify, client=async_embedding_client
+        ),
     )
 
     monitoring.info(
         f"memory_dir={memory_store.memory_dir} reports_dir={memory_store.reports_dir}"
     )
+    # NumPy 為選用相依；未安裝時向量搜尋退回純 Python 路徑。
+    monitoring.info(f"vector_backend={'numpy' if HAS_NUMPY else 'python'}")
+    backfill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dongdong-memory-backfill")
+    backfill_queue: list[Future] = []
+    backfill_queue_lock = threading.Lock()
+
+    def _backfill_memory() -> None:
+        try:
+            backfilled = memory_store.backfill_embeddings(embedding_client.embed_many)
+            if backfilled:
+                monitoring.info(f"memory_backfill={backfilled}")
+        except Exception as exc:
+            monitoring.error(exc)
+            monitoring.error_event("memory_backfill", str(exc))
+
+    def schedule_memory_backfill() -> None:
+        # 單一背景執行緒依序回填；已有尚未開始的回填就不重複排入。
+        with backfill_queue_lock:
+            if backfill_queue and not backfill_queue[-1].running() and not backfill_queue[-1].done():
+                return
+            backfill_queue[:] = [backfill_executor.submit(_backfill_memory)]
+
+    schedule_memory_backfill()
+
+    def handle_message(
+        payload: IncomingMessage | str,
+        on_delta: Callable[[str], None] | None = None,
+        decision: IntentDecision | None = None,
+    ):
+        _text, user_id, _chat_id, channel = _coerce_message(payload)
+        with tracer.trace("handle_message", user_id=user_id, channel=channel) as root, usage_user(user_id):
+            response = _handle_message(payload, on_delta=on_delta, decision=decision)
+            root.set(decision=getattr(response, "decision", None))
+            return response
+
+    def _plan_search(text: str, decision: IntentDecision) -> tuple[NLSearchPlan, str, str]:
+        plan = nl_topic.plan_from_slots(text, decision.slots) if decision.slots else None
+        if plan is None:
+            with call_site("topic_extract"):
+                plan = nl_topic.extract(text)
+        topic = plan.topic.strip() if plan.topic else ""
+        url = plan.url.strip() if plan.url else ""
+        if not topic and not url:
+            topic = text.strip()
+        return plan, topic, url
+
+    def _write_search_report(response: SearchResponse, title: str, decision: IntentDecision) -> str:
+        normalized = normalize_report_content(
+            response,
+            reason="找不到相關結果或來源內容不足",
+            suggestion="請調整關鍵字、加入時間/地點或改用 /search 指令再試。",
+        )
+        report_path = report_writer.write(
+            title=title,
+            content=normalized,
+            query_text=title,
+            query_time=datetime.now(),
+        )
+        memory_store.log_report(title, report_path)
+        return _append_decision_note(
+            f"已完成案例整理，檔案：{report_path}",
+            decision.capability,
+        )
 
-    def handle_message(payload: IncomingMessage | str):
+    def _handle_message(
+        payload: IncomingMessage | str,
+        on_delta: Callable[[str], None] | None = None,
+        decision: IntentDecision | None = None,
+    ):
         start_time = time.perf_counter()
         text, user_id, chat_id, channel = _coerce_message(payload)
         session_store.touch(user_id, text)
@@ -537,12 +983,15 @@ def main() -> None:
                 return "搜尋整理技能已停用。"
             return _handle_summary_command(text, search_client, search_formatter, monitoring)
 
-        decision = intent_router.route(text)
-        monitoring.info(
-            "router_decision="
-            f"{decision.capability} missing={decision.missing_inputs} "
-            f"clarify={decision.needs_clarification} confidence={decision.confidence:.2f}"
-        )
+        if decision is None:
+            with metrics.timer("route"), span("route") as route_span, call_site("route"):
+                decision = intent_router.route(text)
+                route_span.set(
+                    capability=decision.capability,
+                    tier=decision.tier,
+                    confidence=round(decision.confidence, 3),
+                )
+            _log_route_decision(monitoring, metrics, intent_router, decision, llm_client.last_usage())
         should_clarify = decision.needs_clarification
         if decision.capability in {"memory_query", "schedule_list"} and text.strip():
             should_clarify = False
@@ -552,6 +1001,10 @@ def main() -> None:
             if command and command.action == "add" and command.start_time:
                 result = schedule_service.handle(command, user_id, chat_id)
                 return _append_decision_note(result.reply, decision.capability)
+            slot_command = _schedule_command_from_slots(decision.slots) if decision.slots else None
+            if slot_command:
+                result = schedule_service.handle(slot_command, user_id, chat_id)
+                return _append_decision_note(result.reply, decision.capability)
             try:
                 llm_command = _extract_schedule_from_llm(
                     llm_client=llm_client,
@@ -581,11 +1034,7 @@ def main() -> None:
         if decision.capability == "search_report":
             if not skill_registry.is_enabled(SKILL_SEARCH_REPORT):
                 return _append_decision_note("搜尋整理技能已停用。", decision.capability)
-            plan = nl_topic.extract(text)
-            topic = plan.topic.strip() if plan.topic else ""
-            url = plan.url.strip() if plan.url else ""
-            if not topic and not url:
-                topic = text.strip()
+            plan, topic, url = _plan_search(text, decision)
             if not topic and not url:
                 return _append_decision_note(
                     intent_router.build_clarification_question(decision),
@@ -597,23 +1046,7 @@ def main() -> None:
                 else:
                     response = search_client.search_keyword(topic)
                 if plan.wants_report:
-                    title = topic or url
-                    normalized = normalize_report_content(
-                        response,
-                        reason="找不到相關結果或來源內容不足",
-                        suggestion="請調整關鍵字、加入時間/地點或改用 /search 指令再試。",
-                    )
-                    report_path = report_writer.write(
-                        title=title,
-                        content=normalized,
-                        query_text=title,
-                        query_time=datetime.now(),
-                    )
-                    memory_store.log_report(title, report_path)
-                    return _append_decision_note(
-                        f"已完成案例整理，檔案：{report_path}",
-                        decision.capability,
-                    )
+                    return _write_search_report(response, topic or url, decision)
                 return _append_decision_note(
                     search_formatter.format(response),
                     decision.capability,
@@ -635,11 +1068,14 @@ def main() -> None:
         if decision.capability in {"memory_save", "memory_query", "direct_reply"}:
             forced_decision = decision.capability
         try:
-            response = goap.respond(
-                text,
-                forced_decision=forced_decision,
-                forced_reason=decision.reason,
-            )
+            with span("goap", forced_decision=forced_decision) as goap_span:
+                response = goap.respond(
+                    text,
+                    forced_decision=forced_decision,
+                    forced_reason=decision.reason,
+                    on_delta=on_delta,
+                )
+                goap_span.set(decision=response.decision)
         except Exception as exc:
             monitoring.error(exc)
             monitoring.error_event("llm_goap", str(exc))
@@ -661,9 +1097,7 @@ def main() -> None:
         if response.decision in {"direct_reply", "goap"} and not response.memory_query:
             styled = response_styler.style(response.reply, text)
             response.reply = styled.reply
-        if config.perf_log:
-            goap_ms = (time.perf_counter() - start_time) * 1000
-            monitoring.perf("handle_text.goap", goap_ms, f"decision={response.decision}")
+        metrics.observe("handle_text.goap", (time.perf_counter() - start_time) * 1000)
         resolved_memory, normalized = (None, False)
         if skill_registry.is_enabled(SKILL_MEMORY_SAVE):
             explicit_save = _is_explicit_memory_save(text) or decision.capability == "memory_save"
@@ -677,19 +1111,19 @@ def main() -> None:
             if response.decision == "memory_save":
                 response.reply = "已記住。"
             mem_start = time.perf_counter()
-            try:
-                embedding = embedding_client.embed(resolved_memory)
-                saved_path = memory_store.save_with_embedding(resolved_memory, embedding)
-            except Exception:
-                saved_path = memory_store.save(resolved_memory)
+            with span("memory.save", normalized=normalized), call_site("memory_save"):
+                try:
+                    embedding = embedding_client.embed(resolved_memory)
+                    saved_path = memory_store.save_with_embedding(resolved_memory, embedding)
+                except Exception:
+                    saved_path = memory_store.save(resolved_memory)
+                    schedule_memory_backfill()
             monitoring.info(f"memory_saved path={saved_path}")
             if not response.memory_content:
                 monitoring.info("memory_save_fallback=1 source=user_text")
             if normalized:
                 monitoring.info("memory_save_normalized=1")
-            if config.perf_log:
-                mem_ms = (time.perf_counter() - mem_start) * 1000
-                monitoring.perf("memory.save", mem_ms)
+            metrics.observe("memory.save", (time.perf_counter() - mem_start) * 1000)
             response.reply = f"{response.reply}\n\n已為你記住：{resolved_memory}"
             schedule_command = schedule_parser.parse(text)
             if schedule_command and schedule_command.action == "add" and schedule_command.start_time:
@@ -712,7 +1146,7 @@ def main() -> None:
                 query_text = response.memory_query.strip()
                 session = session_store.get(user_id)
                 if session and is_short_term_query(response.memory_query):
-                    session_messages = session.messages[:-1] if len(session.messages) > 1 else []
+                    session_messages = list(session.messages)[:-1]
                     session_hits = search_session_messages(
                         session_messages, response.memory_query
                     )
@@ -721,68 +1155,22 @@ def main() -> None:
                         response.reply = f"最近對話（未保存）：\n{joined}"
                         return response
                     monitoring.info("session_memory hit=0")
-                focus_query = query_text
-                try:
-                    focus_query = _focus_memory_query(
-                        llm_client, config.fast_model, query_text
-                    )
-                    if focus_query and focus_query != query_text:
-                        monitoring.info(f"memory_focus={focus_query}")
-                except Exception:
-                    monitoring.info("memory_focus_failed=1")
-                results = []
                 try:
                     query_start = time.perf_counter()
-                    embedding = None
-                    try:
-                        embedding = embedding_client.embed(focus_query)
-                    except Exception:
-                        monitoring.info("memory_embed_failed=1")
-                        if focus_query != query_text:
-                            try:
-                                embedding = embedding_client.embed(query_text)
-                            except Exception:
-                                monitoring.info("memory_embed_failed=1 original=1")
-                    if embedding is not None:
-                        semantic_hits = memory_store.semantic_search(embedding)
-                        semantic_hits = memory_store.filter_by_score(semantic_hits)
-                        if semantic_hits:
-                            results = [item for item, _score in semantic_hits]
-                    if not results:
-                        if response.memory_date_range:
-                            start = response.memory_date_range.get("start")
-                            end = response.memory_date_range.get("end")
-                            if start and end:
-                                results = memory_store.query_range(focus_query, start, end)
-                        elif response.memory_date:
-                            results = memory_store.query(focus_query, date=response.memory_date)
-                        else:
-                            results = memory_store.query(focus_query)
-                        if not results and focus_query != query_text:
-                            if response.memory_date_range:
-                                start = response.memory_date_range.get("start")
-                                end = response.memory_date_range.get("end")
-                                if start and end:
-                                    results = memory_store.query_range(query_text, start, end)
-                            elif response.memory_date:
-                                results = memory_store.query(query_text, date=response.memory_date)
-                            else:
-                                results = memory_store.query(query_text)
-                        if not results:
-                            try:
-                                semantic_hits, source = _semantic_memory_fallback(
-                                    focus_query,
-                                    embedding_client,
-                                    memory_store,
-                                )
-                                if semantic_hits:
-                                    results = semantic_hits
-                                    monitoring.info(f"memory_fallback={source}")
-                            except Exception:
-                                monitoring.info("memory_fallback_failed=1")
-                    if config.perf_log:
-                        query_ms = (time.perf_counter() - query_start) * 1000
-                        monitoring.perf("memory.query", query_ms)
+                    with span("memory.query") as query_span, call_site("memory_query"):
+                        results = _recall_memories(
+                            fanout_executor,
+                            llm_client,
+                            config.fast_model,
+                            embedding_client,
+                            memory_store,
+                            query_text,
+                            response.memory_date,
+                            response.memory_date_range,
+                            monitoring,
+                        )
+                        query_span.set(hits=len(results))
+                    metrics.observe("memory.query", (time.perf_counter() - query_start) * 1000)
                 except ValueError:
                     response.reply = f"{response.reply}\n\n日期格式不正確，請使用 YYYY-MM-DD。"
                     return response
@@ -815,23 +1203,185 @@ def main() -> None:
                         response.reply = "找不到相關記憶。你可以告訴我想記住的內容，我幫你記下。"
                 else:
                     response.reply = "找不到相關記憶。你可以告訴我想記住的內容，我幫你記下。"
-        if config.perf_log:
-            total_ms = (time.perf_counter() - start_time) * 1000
-            monitoring.perf("handle_text.total", total_ms)
+        metrics.observe("handle_text.total", (time.perf_counter() - start_time) * 1000)
+        response.reply = _append_decision_note(response.reply, decision.capability)
+        return response
+
+    async def handle_message_async(
+        payload: IncomingMessage | str,
+        on_delta: Callable[[str], None] | None = None,
+    ):
+        _text, user_id, _chat_id, channel = _coerce_message(payload)
+        with tracer.trace("handle_message", user_id=user_id, channel=channel) as root, usage_user(user_id):
+            response = await _handle_message_async(payload, on_delta=on_delta)
+            root.set(decision=getattr(response, "decision", None))
+            return response
+
+    async def _ahandle_search_report(text: str, user_id: str, decision: IntentDecision) -> str:
+        # 搜尋 API 在事件迴圈上 await；主題擷取（可能呼叫同步 LLM）與寫報告檔仍交給執行緒。
+        session_store.touch(user_id, text)
+        if not skill_registry.is_enabled(SKILL_SEARCH_REPORT):
+            return _append_decision_note("搜尋整理技能已停用。", decision.capability)
+        loop = asyncio.get_running_loop()
+        plan, topic, url = await loop.run_in_executor(
+            None, propagate(functools.partial(_plan_search, text, decision))
+        )
+        if not topic and not url:
+            return _append_decision_note(
+                intent_router.build_clarification_question(decision),
+                decision.capability,
+            )
+        try:
+            if url:
+                response = await async_search_client.summarize_link(url)
+            else:
+                response = await async_search_client.search_keyword(topic)
+            if plan.wants_report:
+                return await loop.run_in_executor(
+                    None, propagate(functools.partial(_write_search_report, response, topic or url, decision))
+                )
+            return _append_decision_note(search_formatter.format(response), decision.capability)
+        except Exception as exc:
+            monitoring.error(exc)
+            return _append_decision_note(
+                _format_search_error(exc, search_formatter),
+                decision.capability,
+            )
+
+    async def _handle_message_async(
+        payload: IncomingMessage | str,
+        on_delta: Callable[[str], None] | None = None,
+    ):
+        # 路由、一般對話、自然語言搜尋與 /search、/summary 在事件迴圈上 await；
+        # 行程、記憶等多步流程仍交給執行緒跑同步的 handle_message。
+        start_time = time.perf_counter()
+        text, user_id, _chat_id, _channel = _coerce_message(payload)
+        loop = asyncio.get_running_loop()
+
+        def delegate(decision: IntentDecision | None = None):
+            # propagate 讓執行緒中的同步流程沿用同一個 trace。
+            return loop.run_in_executor(
+                None,
+                propagate(functools.partial(handle_message, payload, on_delta=on_delta, decision=decision)),
+            )
+
+        if schedule_service.has_pending_bulk_delete(user_id) or text.startswith(
+            ("/skill", "/allowlist")
+        ):
+            return await delegate()
+        if text.startswith(("/search", "/summary")):
+            session_store.touch(user_id, text)
+            if not skill_registry.is_enabled(SKILL_SEARCH_REPORT):
+                return "搜尋整理技能已停用。"
+            if text.startswith("/search"):
+                return await _ahandle_search_command(
+                    text, async_search_client, search_formatter, monitoring
+                )
+            return await _ahandle_summary_command(
+                text, async_search_client, search_formatter, monitoring
+            )
+
+        route_start = time.perf_counter()
+        with span("route") as route_span, call_site("route"):
+            decision = await intent_router.aroute(text)
+            route_span.set(
+                capability=decision.capability,
+                tier=decision.tier,
+                confidence=round(decision.confidence, 3),
+            )
+        metrics.observe("route", (time.perf_counter() - route_start) * 1000)
+        _log_route_decision(monitoring, metrics, intent_router, decision, async_llm_client.last_usage())
+        if decision.capability == "search_report":
+            return await _ahandle_search_report(text, user_id, decision)
+        if (
+            decision.capability != "direct_reply"
+            or decision.needs_clarification
+            or _is_explicit_memory_save(text)
+        ):
+            return await delegate(decision)
+
+        session_store.touch(user_id, text)
+        try:
+            with span("goap", forced_decision="direct_reply"):
+                response = await goap.arespond(
+                    text,
+                    forced_decision="direct_reply",
+                    forced_reason=decision.reason,
+                    on_delta=on_delta,
+                )
+        except Exception as exc:
+            monitoring.error(exc)
+            monitoring.error_event("llm_goap", str(exc))
+            return _append_decision_note(_fallback_reply("llm"), decision.capability)
+        monitoring.info("goap_decision=direct_reply memory_query=False memory_content=False")
+        response.reply = response_styler.style(response.reply, text).reply
+        total_ms = (time.perf_counter() - start_time) * 1000
+        metrics.observe("handle_text.goap", total_ms)
+        metrics.observe("handle_text.total", total_ms)
         response.reply = _append_decision_note(response.reply, decision.capability)
         return response
 
     def allowlist_checker(message: IncomingMessage) -> bool:
         return allowlist_store.is_allowed(message.user_id, message.channel)
 
+    return Bot(
+        config=config,
+        monitoring=monitoring,
+        metrics=metrics,
+        tracer=tracer,
+        usage_ledger=usage_ledger,
+        scheduler=scheduler,
+        session_store=session_store,
+        handle_message=handle_message,
+        handle_message_async=handle_message_async,
+        allowlist_checker=allowlist_checker,
+        fanout_executor=fanout_executor,
+        backfill_executor=backfill_executor,
+    )
+
+
+def main() -> None:
+    config = load_config()
+    bot = build_bot(config)
+    metrics = bot.metrics
+    monitoring = bot.monitoring
     telegram = TelegramClient(
         config.telegram_bot_token,
         monitoring,
-        perf_log=config.perf_log,
-        allowlist_checker=allowlist_checker,
-        scheduler=scheduler,
+        allowlist_checker=bot.allowlist_checker,
+        scheduler=bot.scheduler,
+        reminder_concurrency=config.reminder_concurrency,
+        stream_replies=config.stream_replies,
+        stream_edit_interval_seconds=config.stream_edit_interval_seconds,
+        dispatcher=UserDispatcher(
+            max_concurrency=config.handler_concurrency,
+            max_pending_per_user=config.handler_queue_per_user,
+            max_pending=config.handler_queue_max,
+        ),
+        metrics=metrics,
     )
-    telegram.start(handle_message)
+    metrics_server = None
+    snapshot_writer = None
+    if metrics.enabled:
+        if config.metrics_http_port:
+            metrics_server = start_http_exporter(metrics, config.metrics_http_port)
+            monitoring.info(f"metrics_http=127.0.0.1:{config.metrics_http_port}/metrics")
+        if config.metrics_snapshot_path:
+            snapshot_writer = SnapshotWriter(
+                metrics,
+                config.metrics_snapshot_path,
+                interval_seconds=config.metrics_snapshot_interval_seconds,
+            )
+            snapshot_writer.start()
+    bot.usage_ledger.start(config.llm_usage_flush_interval_seconds)
+    try:
+        telegram.start(bot.handle_message_async if config.async_handler else bot.handle_message)
+    finally:
+        bot.close()
+        if snapshot_writer is not None:
+            snapshot_writer.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
 
 
 if __name__ == "__main__":
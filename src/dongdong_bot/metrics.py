@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, Iterator
+import json
+import time
+
+
+DEFAULT_SAMPLE_SIZE = 1024
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    # 保留最近 sample_size 筆樣本計算百分位數，count/total/max 則涵蓋全部樣本。
+    def __init__(self, sample_size: int = DEFAULT_SAMPLE_SIZE) -> None:
+        self._samples: deque[float] = deque(maxlen=sample_size)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self._samples.append(value)
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def summary(self) -> dict[str, float]:
+        ordered = sorted(self._samples)
+        summary = {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+        for percentile in PERCENTILES:
+            summary[f"p{percentile}"] = _percentile(ordered, percentile)
+        return summary
+
+
+class MetricsRegistry:
+    # 停用時每個記錄方法只做一次布林判斷就返回。
+    def __init__(self, enabled: bool = True, sample_size: int = DEFAULT_SAMPLE_SIZE) -> None:
+        self.enabled = enabled
+        self.sample_size = sample_size
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._gauge_fns: Dict[str, Callable[[], float]] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = Lock()
+
+    def inc(self, name: str, value: float = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = value
+
+    def register_gauge(self, name: str, fn: Callable[[], float]) -> None:
+        # 於輸出快照時才呼叫，適合佇列深度、session 數等現成狀態。
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauge_fns[name] = fn
+
+    def observe(self, name: str, value_ms: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = Histogram(self.sample_size)
+                self._histograms[name] = histogram
+            histogram.observe(value_ms)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            gauge_fns = dict(self._gauge_fns)
+            histograms = {name: histogram.summary() for name, histogram in self._histograms.items()}
+        for name, fn in gauge_fns.items():
+            try:
+                gauges[name] = float(fn())
+            except Exception:
+                continue
+        return {
+            "timestamp": time.time(),
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": histograms,
+        }
+
+
+NULL_METRICS = MetricsRegistry(enabled=False)
+
+
+def start_http_exporter(registry: MetricsRegistry, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    # GET /metrics 回傳 JSON 快照；僅綁定本機介面。
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = json.dumps(registry.snapshot(), ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            return
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, name="dongdong-metrics-http", daemon=True).start()
+    return server
+
+
+class SnapshotWriter:
+    # 每隔 interval 秒把快照寫入 JSON 檔（tmp + replace，讀取端不會看到半份檔案）。
+    def __init__(self, registry: MetricsRegistry, path: str, interval_seconds: float = 60.0) -> None:
+        self.registry = registry
+        self.path = Path(path)
+        self.interval_seconds = interval_seconds
+        self._stop = Event()
+        self._thread: Thread | None = None
+
+    def write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(self.registry.snapshot(), ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        tmp_path.replace(self.path)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        def _run() -> None:
+            while not self._stop.wait(self.interval_seconds):
+                self.write()
+
+        self._thread = Thread(target=_run, name="dongdong-metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
+
+
+def _percentile(ordered: list[float], percentile: int) -> float:
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, -(-percentile * len(ordered) // 100) - 1))
+    return ordered[rank]
@@ -61,12 +61,6 @@ class Monitoring:
         cleaned = f"{event_type} {message}".strip()
         self._emit("error_event", cleaned)
 
-    def perf(self, name: str, elapsed_ms: float, detail: str | None = None) -> None:
-        cleaned = f"{name} {elapsed_ms:.1f}ms"
-        if detail:
-            cleaned = f"{cleaned} {detail}"
-        self._emit("perf", cleaned)
-
     def _emit(self, event_type: str, summary: str, suppressed_count: int = 0) -> None:
         timestamp = self._now_fn()
         cleaned = self._sanitize(summary)
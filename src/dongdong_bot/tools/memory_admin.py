@@ -5,7 +5,11 @@ from pathlib import Path
 
 from dongdong_bot.agent.allowlist_store import AllowlistStore
 from dongdong_bot.agent.memory import MemoryStore
-from dongdong_bot.config import ALLOWLIST_FILENAME, EMBEDDING_INDEX_FILENAME
+from dongdong_bot.config import (
+    ALLOWLIST_FILENAME,
+    EMBEDDING_INDEX_FILENAME,
+    VECTOR_INDEX_DIRNAME,
+)
 
 
 def _project_root() -> Path:
@@ -14,11 +18,16 @@ def _project_root() -> Path:
 
 def _parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="記憶管理工具")
-    parser.add_argument("action", choices=["delete", "reset"], help="delete 或 reset")
+    parser.add_argument(
+        "action",
+        choices=["delete", "reset", "export", "import"],
+        help="delete / reset / export / import",
+    )
     parser.add_argument("--scope", choices=["all", "range", "keyword"], default="all")
     parser.add_argument("--start", help="開始日期 YYYY-MM-DD")
     parser.add_argument("--end", help="結束日期 YYYY-MM-DD")
     parser.add_argument("--keyword", help="關鍵字")
+    parser.add_argument("--path", help="匯出/匯入的 JSONL 路徑（預設為 embeddings.jsonl）")
     parser.add_argument("--user-id", required=True, help="操作人 user_id")
     parser.add_argument("--channel", default="telegram", help="channel 類型")
     return parser.parse_args()
@@ -39,7 +48,21 @@ def main() -> int:
 
     memory_dir = root / "data"
     embedding_path = memory_dir / EMBEDDING_INDEX_FILENAME
-    store = MemoryStore(str(memory_dir), embedding_index_path=str(embedding_path))
+    store = MemoryStore(
+        str(memory_dir),
+        embedding_index_path=str(embedding_path),
+        vector_index_path=str(memory_dir / VECTOR_INDEX_DIRNAME),
+    )
+
+    if args.action == "export":
+        exported = store.export_embeddings(args.path)
+        print(f"已匯出向量索引，共 {exported} 筆。")
+        return 0
+
+    if args.action == "import":
+        imported = store.import_embeddings(args.path)
+        print(f"已匯入向量索引，共 {imported} 筆。")
+        return 0
 
     if args.action == "reset":
         removed = store.delete_all()
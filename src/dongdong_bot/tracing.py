@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Iterator, List
+import json
+import random
+import time
+import uuid
+
+
+class Span:
+    def __init__(self, name: str, attrs: Dict[str, Any] | None = None, start: float | None = None) -> None:
+        self.name = name
+        self.attrs: Dict[str, Any] = dict(attrs or {})
+        self.start = time.perf_counter() if start is None else start
+        self.end: float | None = None
+        self.children: List[Span] = []
+
+    @property
+    def duration_ms(self) -> float:
+        end = time.perf_counter() if self.end is None else self.end
+        return (end - self.start) * 1000
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def finish(self) -> None:
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    def to_dict(self, origin: float) -> dict:
+        payload = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+        }
+        if self.attrs:
+            payload["attrs"] = self.attrs
+        if self.children:
+            # fan-out 的子 span 可能由不同執行緒加入，輸出時依開始時間排序。
+            children = sorted(self.children, key=lambda child: child.start)
+            payload["spans"] = [child.to_dict(origin) for child in children]
+        return payload
+
+
+class _NullSpan(Span):
+    # 沒有進行中的 trace 時交給呼叫端的替身，set 不做任何事。
+    def set(self, **attrs: Any) -> None:
+        return
+
+
+_NULL_SPAN = _NullSpan("null")
+_CURRENT: ContextVar[Span | None] = ContextVar("dongdong_trace_span", default=None)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span]:
+    # 掛在目前 span 底下；不在 trace 之中時幾乎沒有成本。
+    parent = _CURRENT.get()
+    if parent is None:
+        yield _NULL_SPAN
+        return
+    child = Span(name, attrs)
+    parent.children.append(child)
+    token = _CURRENT.set(child)
+    try:
+        yield child
+    finally:
+        child.finish()
+        _CURRENT.reset(token)
+
+
+def annotate(**attrs: Any) -> None:
+    current = _CURRENT.get()
+    if current is not None:
+        current.set(**attrs)
+
+
+def add_span(name: str, start: float, **attrs: Any) -> None:
+    # 給串流產生器使用：跨越多次 yield 不適合切換 contextvar，結束時補記一筆完成的 span。
+    parent = _CURRENT.get()
+    if parent is None:
+        return
+    child = Span(name, attrs, start=start)
+    child.finish()
+    parent.children.append(child)
+
+
+def propagate(fn: Callable[..., Any]) -> Callable[..., Any]:
+    # 丟進執行緒池的工作不會自動帶上 contextvar，包一層讓子 span 接回目前的 trace。
+    context = copy_context()
+
+    def _run(*args: Any, **kwargs: Any) -> Any:
+        return context.run(fn, *args, **kwargs)
+
+    return _run
+
+
+class Tracer:
+    # 每則訊息建立一個 trace；依 sample_rate 抽樣，或耗時超過 slow_ms 時一律寫入 JSONL。
+    def __init__(
+        self,
+        path: str | None,
+        sample_rate: float = 0.0,
+        slow_ms: float | None = None,
+        random_fn: Callable[[], float] = random.random,
+    ) -> None:
+        self.path = Path(path) if path else None
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.enabled = self.path is not None and (sample_rate > 0 or slow_ms is not None)
+        self._random_fn = random_fn
+        self._lock = Lock()
+        self.written = 0
+
+    @contextmanager
+    def trace(self, name: str, **attrs: Any) -> Iterator[Span]:
+        # 已在 trace 之中（例如非同步路徑把工作轉交給同步 handler）時只建立子 span。
+        if not self.enabled or _CURRENT.get() is not None:
+            with span(name, **attrs) as child:
+                yield child
+            return
+        root = Span(name, attrs)
+        token = _CURRENT.set(root)
+        try:
+            yield root
+        finally:
+            root.finish()
+            _CURRENT.reset(token)
+            self._maybe_write(root)
+
+    def _maybe_write(self, root: Span) -> None:
+        duration_ms = root.duration_ms
+        slow = self.slow_ms is not None and duration_ms >= self.slow_ms
+        if not slow and (self.sample_rate <= 0 or self._random_fn() >= self.sample_rate):
+            return
+        record = {
+            "trace_id": uuid.uuid4().hex,
+            "timestamp": time.time(),
+            "slow": slow,
+            **root.to_dict(root.start),
+        }
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+            self.written += 1
+
+
+NULL_TRACER = Tracer(None)
@@ -10,7 +10,7 @@ if str(ROOT) not in sys.path:
 
 from dongdong_bot.agent.schedule_parser import ScheduleParser
 from dongdong_bot.main import _has_memory_keywords, _is_explicit_memory_save
-from tests.helpers.regression_loader import load_chinese_phrases
+from dongdong_bot.tools.regression_cases import load_chinese_phrases
 
 
 def test_chinese_phrase_cases():
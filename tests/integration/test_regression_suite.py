@@ -15,7 +15,7 @@ from dongdong_bot.agent.schedule_store import ScheduleStore
 from dongdong_bot.lib.search_formatter import SearchFormatter
 from dongdong_bot.lib.search_schema import SearchResponse
 from dongdong_bot.main import _handle_search_command, _has_memory_keywords, _is_explicit_memory_save
-from tests.helpers.regression_loader import load_regression_cases
+from dongdong_bot.tools.regression_cases import load_regression_cases
 
 
 class _StubSearchClient:
@@ -73,9 +73,9 @@ def test_search_report_cases():
         assert "摘要" in reply
 
 
-def test_schedule_flow_regression():
-    schedule_store = ScheduleStore(str(ROOT / "tests" / "data" / "tmp_schedules.json"))
-    reminder_store = ReminderStore(str(ROOT / "tests" / "data" / "tmp_reminders.json"))
+def test_schedule_flow_regression(tmp_path):
+    schedule_store = ScheduleStore(str(tmp_path / "schedules.json"))
+    reminder_store = ReminderStore(str(tmp_path / "reminders.json"))
     service = ScheduleService(schedule_store, reminder_store)
 
     parser = ScheduleParser()
@@ -89,7 +89,3 @@ def test_schedule_flow_regression():
     assert list_command is not None
     list_result = service.handle(list_command, "user-1", "chat-1")
     assert "你的行程" in list_result.reply
-
-    # cleanup
-    (ROOT / "tests" / "data" / "tmp_schedules.json").unlink(missing_ok=True)
-    (ROOT / "tests" / "data" / "tmp_reminders.json").unlink(missing_ok=True)
@@ -16,6 +16,33 @@ def test_allowlist_store(tmp_path):
     assert store.is_allowed("user-1", "telegram") is True
 
 
+def test_allowlist_store_caches_until_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "allowlist.json"
+    now = [0.0]
+    store = AllowlistStore(str(path), recheck_seconds=5, clock=lambda: now[0])
+    store.add(AllowlistEntry(user_id="user-1", channel_type="telegram"))
+    reads = []
+    original_load = store._load
+    monkeypatch.setattr(store, "_load", lambda: reads.append(1) or original_load())
+
+    for _ in range(100):
+        assert store.is_allowed("user-1", "telegram") is True
+    assert reads == []
+
+    other = AllowlistStore(str(path))
+    other.seed(
+        [
+            AllowlistEntry(user_id="user-2", channel_type="telegram"),
+            AllowlistEntry(user_id="user-3", channel_type="line"),
+        ]
+    )
+    assert store.is_allowed("user-2", "telegram") is False
+    now[0] += 5
+    assert store.is_allowed("user-2", "telegram") is True
+    assert store.is_allowed("user-1", "telegram") is False
+    assert len(reads) == 1
+
+
 def test_skill_registry_toggle(tmp_path):
     skills_dir = tmp_path / "skills"
     skills_dir.mkdir()
@@ -29,3 +56,29 @@ def test_skill_registry_toggle(tmp_path):
 
     registry.set_enabled("memory-save", False)
     assert registry.is_enabled("memory-save") is False
+
+
+def test_skill_registry_snapshot_reloads_on_change(tmp_path, monkeypatch):
+    skills_dir = tmp_path / "skills"
+    (skills_dir / "memory-save").mkdir(parents=True)
+    (skills_dir / "memory-save" / "SKILL.md").write_text("# 記憶保存\n", encoding="utf-8")
+    now = [0.0]
+    registry = SkillRegistry(str(skills_dir), str(tmp_path / "skills_state.json"), clock=lambda: now[0])
+    assert registry.list_skills()[0].description == "記憶保存"
+    registry.set_enabled("memory-save", False)
+    reads = []
+    original_load = registry._load_state
+    monkeypatch.setattr(registry, "_load_state", lambda: reads.append(1) or original_load())
+
+    for _ in range(50):
+        assert registry.is_enabled("memory-save") is False
+    assert reads == []
+
+    other = SkillRegistry(str(skills_dir), str(tmp_path / "skills_state.json"))
+    other.set_enabled("memory-save", True)
+    (skills_dir / "memory-save" / "SKILL.md").write_text("# 記憶保存（新版）\n", encoding="utf-8")
+    now[0] += 5
+
+    assert registry.is_enabled("memory-save") is True
+    assert registry.list_skills()[0].description == "記憶保存（新版）"
+    assert len(reads) == 1
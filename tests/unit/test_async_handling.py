@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import replace
+from pathlib import Path
+from types import SimpleNamespace
+
+from benchmarks.datasets import offline_config
+from benchmarks.fakes import fake_clients
+from dongdong_bot.agent.capability_catalog import CapabilityCatalog
+from dongdong_bot.agent.intent_router import IntentRouter
+from dongdong_bot.agent.loop import GoapEngine
+from dongdong_bot.channels.telegram import IncomingMessage
+from dongdong_bot.lib.embedding_client import AsyncEmbeddingClient, EmbeddingCache
+from dongdong_bot.lib.llm_usage import LLMUsage
+from dongdong_bot.lib.search_schema import SearchResponse
+from dongdong_bot.main import build_bot
+from dongdong_bot.monitoring import Monitoring
+
+
+class AsyncClient:
+    def __init__(self, response: str = "", chunks: list[str] | None = None) -> None:
+        self._response = response
+        self._chunks = chunks or []
+        self.calls = 0
+
+    async def generate(self, model: str, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(0)
+        return self._response
+
+    async def generate_stream(self, model: str, prompt: str):
+        for chunk in self._chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+
+class SyncClient:
+    def generate(self, model: str, prompt: str) -> str:
+        raise AssertionError("非同步路徑不應呼叫同步 client")
+
+
+class FakeAsyncEmbeddingsAPI:
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    async def create(self, model: str, input: list[str]):
+        self.calls.append(list(input))
+        data = [SimpleNamespace(index=idx, embedding=[float(len(text))]) for idx, text in enumerate(input)]
+        return SimpleNamespace(data=data)
+
+
+def _make_catalog(tmp_path: Path) -> CapabilityCatalog:
+    path = tmp_path / "caps.yaml"
+    capabilities = [
+        {"name": name, "description": name, "required_inputs": [], "example_requests": [], "clarifications": {}}
+        for name in ("memory_save", "direct_reply")
+    ]
+    path.write_text(json.dumps({"capabilities": capabilities}, ensure_ascii=False), encoding="utf-8")
+    return CapabilityCatalog(path)
+
+
+def test_aroute_awaits_llm_and_records_tier(tmp_path: Path) -> None:
+    client = AsyncClient(
+        '{"capability":"memory_save","missing_inputs":[],"needs_clarification":false,"confidence":0.9}'
+    )
+    router = IntentRouter(SyncClient().generate, "gpt-4o-mini", _make_catalog(tmp_path), agenerate=client.generate)
+
+    decision = asyncio.run(router.aroute("我喜歡咖啡"))
+
+    assert decision.capability == "memory_save"
+    assert decision.tier == "llm"
+    assert client.calls == 1
+    assert router.tier_stats()["llm"] == 1
+
+
+def test_aroute_uses_async_classifier_fast_path(tmp_path: Path) -> None:
+    async def classify(text: str):
+        return "direct_reply", 0.95
+
+    router = IntentRouter(
+        SyncClient().generate,
+        "gpt-4o-mini",
+        _make_catalog(tmp_path),
+        aintent_classifier=classify,
+    )
+
+    decision = asyncio.run(router.aroute("你好"))
+
+    assert decision.tier == "embedding"
+    assert decision.capability == "direct_reply"
+
+
+def test_arespond_streams_direct_reply_on_event_loop() -> None:
+    engine = GoapEngine(
+        SyncClient(),
+        model="gpt-5-mini",
+        fast_model="gpt-4o-mini",
+        async_llm_client=AsyncClient(chunks=["哈", "囉"]),
+    )
+    deltas: list[str] = []
+
+    response = asyncio.run(engine.arespond("嗨", forced_decision="direct_reply", on_delta=deltas.append))
+
+    assert deltas == ["哈", "囉"]
+    assert response.reply == "哈囉"
+    assert response.decision == "direct_reply"
+
+
+def test_arespond_handles_many_conversations_concurrently() -> None:
+    engine = GoapEngine(
+        SyncClient(),
+        model="gpt-5-mini",
+        fast_model="gpt-4o-mini",
+        async_llm_client=AsyncClient("好的"),
+    )
+
+    async def run_all():
+        return await asyncio.gather(
+            *(engine.arespond(f"問題 {idx}", forced_decision="direct_reply") for idx in range(200))
+        )
+
+    responses = asyncio.run(run_all())
+
+    assert len(responses) == 200
+    assert all(item.reply == "好的" for item in responses)
+
+
+def test_async_embedding_client_shares_cache(tmp_path: Path) -> None:
+    cache = EmbeddingCache(str(tmp_path / "cache.jsonl"))
+    cache.put_many("m", [("a", [9.0])])
+    client = AsyncEmbeddingClient("test-key", "m", cache=cache, batch_size=2)
+    api = FakeAsyncEmbeddingsAPI()
+    client._client = SimpleNamespace(embeddings=api)
+
+    vectors = asyncio.run(client.embed_many(["a", "bb", "ccc", "bb"]))
+
+    assert api.calls == [["bb", "ccc"]]
+    assert vectors == [[9.0], [2.0], [3.0], [2.0]]
+    assert cache.get("m", "ccc") == [3.0]
+
+
+def test_aroute_records_usage_from_async_client(tmp_path: Path) -> None:
+    client = AsyncClient(
+        '{"capability":"memory_save","missing_inputs":[],"needs_clarification":false,"confidence":0.9}'
+    )
+    router = IntentRouter(
+        SyncClient().generate,
+        "gpt-4o-mini",
+        _make_catalog(tmp_path),
+        agenerate=client.generate,
+        usage_fn=lambda: None,
+        ausage_fn=lambda: LLMUsage(input_tokens=1200, cached_input_tokens=1024, output_tokens=20),
+    )
+
+    asyncio.run(router.aroute("我喜歡咖啡"))
+
+    stats = router.prompt_cache_stats()
+    assert stats["calls"] == 1
+    assert stats["cached_tokens"] == 1024
+
+
+class RecordingAsyncSearch:
+    def __init__(self) -> None:
+        self.queries: list[str] = []
+
+    async def search_keyword(self, query: str) -> SearchResponse:
+        self.queries.append(query)
+        return SearchResponse(summary=f"摘要：{query}", bullets=["重點"], sources=["https://example.com"])
+
+    async def summarize_link(self, url: str) -> SearchResponse:
+        raise AssertionError("沒有網址時不應摘要連結")
+
+
+class FailingSyncSearch:
+    def search_keyword(self, query: str) -> SearchResponse:
+        raise AssertionError("非同步路徑不應呼叫同步搜尋")
+
+    def summarize_link(self, url: str) -> SearchResponse:
+        raise AssertionError("非同步路徑不應呼叫同步搜尋")
+
+
+def test_async_handler_runs_nl_search_on_async_client(tmp_path: Path) -> None:
+    search = RecordingAsyncSearch()
+    clients = replace(fake_clients(), search=FailingSyncSearch(), async_search=search)
+    config = offline_config(tmp_path, session_journal_path=None, llm_usage_path=None, trace_path=None)
+    bot = build_bot(config, clients=clients, monitoring=Monitoring(60, 60, output=lambda _line: None))
+    try:
+        message = IncomingMessage(text="幫我搜尋京都楓葉季", user_id="u1", chat_id="u1", user_name="u1")
+        reply = asyncio.run(bot.handle_message_async(message))
+    finally:
+        bot.close()
+
+    assert search.queries == ["幫我搜尋京都楓葉季"]
+    assert "摘要：幫我搜尋京都楓葉季" in getattr(reply, "reply", str(reply))
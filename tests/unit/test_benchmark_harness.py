@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from benchmarks import stores
+from benchmarks.fakes import fake_embedding, fake_reply
+from benchmarks.handle_message import BenchSettings, compare, run, run_repeated
+
+
+def test_offline_run_reports_stage_percentiles(tmp_path) -> None:
+    settings = BenchSettings(memory_entries=50, schedule_entries=20, users=3, messages=20, concurrency=2)
+
+    report = run(settings, tmp_path)
+
+    assert report["messages_per_second"] > 0
+    assert report["stages"]["message"]["count"] == 20
+    assert report["stages"]["route"]["count"] > 0
+    assert report["stages"]["memory.query"]["count"] > 0
+    assert {"p50", "p95", "p99"} <= set(report["stages"]["message"])
+
+
+def test_async_run_uses_async_handler(tmp_path) -> None:
+    settings = BenchSettings(memory_entries=20, schedule_entries=5, users=2, messages=10, async_handler=True)
+
+    report = run(settings, tmp_path)
+
+    assert report["stages"]["message"]["count"] == 10
+
+
+def test_fakes_are_deterministic() -> None:
+    prompt = "你是意圖路由器，請根據使用者輸入選擇最適合的功能。\n使用者輸入: 請記住我喜歡手沖咖啡\n"
+
+    assert fake_reply(prompt) == fake_reply(prompt)
+    assert '"capability": "memory_save"' in fake_reply(prompt)
+    assert fake_embedding("手沖咖啡") == fake_embedding("手沖咖啡")
+
+
+def test_repeated_run_reports_medians_and_noise(tmp_path) -> None:
+    settings = BenchSettings(memory_entries=20, schedule_entries=5, users=2, messages=10)
+
+    report = run_repeated(settings, tmp_path, repeat=3)
+
+    assert report["runs"] == 3
+    assert report["messages_per_second_noise"] >= 0
+    assert report["stages"]["message"]["count"] == 10
+    assert report["stages"]["message"]["p95_noise"] >= 0
+
+
+def test_compare_flags_throughput_and_stage_regressions() -> None:
+    settings = {"messages": 200}
+    baseline = {
+        "settings": settings,
+        "messages_per_second": 100.0,
+        "stages": {
+            "route": {"count": 50, "p95": 10.0},
+            "embed": {"count": 50, "p95": 0.2, "p95_noise": 0.5},
+            "memory.save": {"count": 5, "p95": 1.0},
+        },
+    }
+    report = {
+        "settings": settings,
+        "messages_per_second": 60.0,
+        "stages": {
+            "route": {"count": 50, "p95": 20.0},
+            "embed": {"count": 50, "p95": 0.5},
+            "memory.save": {"count": 5, "p95": 9.0},
+        },
+    }
+
+    regressions = compare(report, baseline, tolerance=0.25)
+
+    # embed 的雜訊讓門檻放寬到 150%；memory.save 樣本太少不比較。
+    assert regressions == [
+        "messages_per_second 100.0 -> 60.0 (limit -25%)",
+        "route.p95 10.0ms -> 20.0ms (limit +25%)",
+    ]
+    assert compare(baseline, baseline) == []
+
+
+def test_compare_refuses_baseline_with_different_settings() -> None:
+    baseline = {"settings": {"messages": 200}, "messages_per_second": 100.0, "stages": {}}
+    report = {"settings": {"messages": 500}, "messages_per_second": 100.0, "stages": {}}
+
+    with pytest.raises(ValueError):
+        compare(report, baseline)
+
+
+def test_store_benchmarks_report_rate_rss_and_io_per_case(tmp_path) -> None:
+    cases = ["memory.save_with_embedding", "memory.delete_by_keyword", "reminder.collect_due", "parser.parse"]
+
+    results = stores.run([(40, 10)], tmp_path, cases=cases, ops=5, isolate=False)
+
+    assert [row["case"] for row in results] == cases
+    assert [row["size"] for row in results] == [40, 40, 10, 0]
+    for row in results:
+        assert row["ops"] == 5
+        assert row["ops_per_second"] > 0
+        assert row["peak_rss_mb"] > 0
+    delete = results[1]
+    if Path("/proc/self/io").exists():
+        assert delete["written_bytes_per_op"] > 0
+        assert delete["read_bytes_per_op"] >= 0
+    else:
+        # 沒有 /proc/self/io 的平台無法量測讀寫位元組，應回報 None 而非 0。
+        assert delete["written_bytes_per_op"] is None
+        assert delete["read_bytes_per_op"] is None
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from pathlib import Path
+from types import SimpleNamespace
+
+from dongdong_bot.lib.embedding_client import EmbeddingCache, EmbeddingClient
+
+
+class FakeEmbeddingsAPI:
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def create(self, model: str, input: list[str]):
+        self.calls.append(list(input))
+        data = [
+            SimpleNamespace(index=idx, embedding=[float(len(text)), float(idx)])
+            for idx, text in enumerate(input)
+        ]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+def _make_client(tmp_path: Path, batch_size: int = 2) -> tuple[EmbeddingClient, FakeEmbeddingsAPI]:
+    client = EmbeddingClient(
+        "test-key",
+        "text-embedding-3-small",
+        cache_path=str(tmp_path / "cache.jsonl"),
+        batch_size=batch_size,
+    )
+    api = FakeEmbeddingsAPI()
+    client._client = SimpleNamespace(embeddings=api)
+    return client, api
+
+
+def test_embed_many_batches_and_dedupes(tmp_path: Path) -> None:
+    client, api = _make_client(tmp_path)
+
+    vectors = client.embed_many(["a", "bb", "a", "ccc"])
+
+    assert api.calls == [["a", "bb"], ["ccc"]]
+    assert vectors[0] == vectors[2] == [1.0, 0.0]
+    assert vectors[1] == [2.0, 1.0]
+    assert vectors[3] == [3.0, 0.0]
+
+
+def test_embed_uses_persistent_cache(tmp_path: Path) -> None:
+    client, api = _make_client(tmp_path)
+    client.embed("咖啡")
+
+    reloaded, reloaded_api = _make_client(tmp_path)
+    vector = reloaded.embed("咖啡")
+
+    assert len(api.calls) == 1
+    assert reloaded_api.calls == []
+    assert vector == [2.0, 0.0]
+
+
+def test_cache_is_keyed_by_model(tmp_path: Path) -> None:
+    cache = EmbeddingCache(str(tmp_path / "cache.jsonl"))
+    cache.put_many("model-a", [("咖啡", [1.0, 0.0])])
+
+    assert cache.get("model-a", "咖啡") == [1.0, 0.0]
+    assert cache.get("model-b", "咖啡") is None
+
+
+def test_cache_file_compacts_while_running(tmp_path: Path) -> None:
+    path = tmp_path / "cache.jsonl"
+    cache = EmbeddingCache(str(path), max_entries=4)
+
+    for idx in range(40):
+        cache.put_many("m", [(f"text-{idx % 6}", [float(idx), 1.0])])
+
+    assert len(cache) == 4
+    assert len(path.read_text(encoding="utf-8").splitlines()) <= 2 * len(cache) + 1
+    assert EmbeddingCache(str(path), max_entries=4).get("m", "text-3") == [39.0, 1.0]
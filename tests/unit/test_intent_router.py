@@ -1,10 +1,16 @@
 from __future__ import annotations
 
 import json
+from datetime import datetime
 from pathlib import Path
 
 from dongdong_bot.agent.capability_catalog import CapabilityCatalog
 from dongdong_bot.agent.intent_router import IntentRouter
+from dongdong_bot.agent.schedule_parser import ScheduleParser
+from dongdong_bot.lib.llm_usage import LLMUsage
+from dongdong_bot.lib.nl_search_topic import NLSearchTopicExtractor
+from dongdong_bot.lib.route_cache import RouteCache
+from dongdong_bot.main import _schedule_command_from_slots
 
 
 class FakeClient:
@@ -15,7 +21,16 @@ class FakeClient:
         return self._response
 
 
-def _make_catalog(tmp_path: Path) -> CapabilityCatalog:
+class CountingClient:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def generate(self, model: str, prompt: str) -> str:
+        self.calls += 1
+        return '{"capability":"direct_reply","missing_inputs":[],"needs_clarification":false,"confidence":0.7}'
+
+
+def _make_catalog(tmp_path: Path, extra: list[str] | None = None) -> CapabilityCatalog:
     path = tmp_path / "caps.yaml"
     payload = {
         "capabilities": [
@@ -35,6 +50,16 @@ def _make_catalog(tmp_path: Path) -> CapabilityCatalog:
             },
         ]
     }
+    for name in extra or []:
+        payload["capabilities"].append(
+            {
+                "name": name,
+                "description": name,
+                "required_inputs": [],
+                "example_requests": [],
+                "clarifications": {},
+            }
+        )
     path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
     return CapabilityCatalog(path)
 
@@ -77,3 +102,155 @@ def test_route_handles_invalid_capability(tmp_path: Path) -> None:
 
     assert decision.capability == "direct_reply"
     assert decision.needs_clarification is True
+
+
+def test_route_fast_path_uses_schedule_parser(tmp_path: Path) -> None:
+    catalog = _make_catalog(tmp_path, extra=["schedule_list", "schedule_add"])
+    client = CountingClient()
+    router = IntentRouter(client.generate, "gpt-4o-mini", catalog, schedule_parser=ScheduleParser())
+
+    listed = router.route("行程列表")
+    added = router.route("幫我記錄明天 10:00 開會")
+    casual = router.route("幫我把這句改成英文")
+
+    assert listed.capability == "schedule_list"
+    assert listed.tier == "parser"
+    assert added.capability == "schedule_add"
+    assert casual.tier == "llm"
+    assert client.calls == 1
+
+
+def test_route_fast_path_uses_embedding_threshold(tmp_path: Path) -> None:
+    catalog = _make_catalog(tmp_path)
+    client = CountingClient()
+    scores = {"我喜歡咖啡": ("memory_save", 0.93), "今天好熱": ("memory_save", 0.41)}
+    router = IntentRouter(
+        client.generate,
+        "gpt-4o-mini",
+        catalog,
+        intent_classifier=lambda text: scores[text],
+        fast_path_threshold=0.85,
+    )
+
+    fast = router.route("我喜歡咖啡")
+    slow = router.route("今天好熱")
+    stats = router.tier_stats()
+
+    assert fast.tier == "embedding"
+    assert fast.capability == "memory_save"
+    assert slow.tier == "llm"
+    assert stats["embedding"] == 1
+    assert stats["llm"] == 1
+    assert stats["llm_avoided"] == 1
+    assert stats["embedding_rate"] == 0.5
+
+
+class PromptRecordingClient:
+    def __init__(self) -> None:
+        self.prompts: list[str] = []
+
+    def generate(self, model: str, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return '{"capability":"direct_reply","missing_inputs":[],"needs_clarification":false,"confidence":0.7}'
+
+    def last_usage(self) -> LLMUsage:
+        return LLMUsage(input_tokens=1200, cached_input_tokens=1024, output_tokens=20)
+
+
+def test_route_prompt_keeps_stable_prefix_and_reports_cached_tokens(tmp_path: Path) -> None:
+    catalog = _make_catalog(tmp_path)
+    client = PromptRecordingClient()
+    router = IntentRouter(client.generate, "gpt-4o-mini", catalog, usage_fn=client.last_usage)
+
+    router.route("今天天氣如何")
+    router.route("講個笑話")
+
+    first, second = client.prompts
+    prefix = router.prompt_prefix()
+    assert first.startswith(prefix) and second.startswith(prefix)
+    assert first.endswith("使用者輸入: 今天天氣如何\n")
+    stats = router.prompt_cache_stats()
+    assert stats["calls"] == 2
+    assert stats["cached_tokens"] == 2048
+    assert stats["uncached_tokens"] == 352
+
+
+def test_prompt_prefix_rebuilt_when_catalog_changes(tmp_path: Path) -> None:
+    catalog = _make_catalog(tmp_path)
+    router = IntentRouter(FakeClient("{}").generate, "gpt-4o-mini", catalog)
+    before = router.prompt_prefix()
+
+    _make_catalog(tmp_path, extra=["search_report"])
+
+    assert router.prompt_prefix() is not before
+    assert "search_report" in router.prompt_prefix()
+
+
+def test_combined_route_returns_slots_in_one_call(tmp_path: Path) -> None:
+    catalog = _make_catalog(tmp_path, extra=["schedule_add", "search_report"])
+    client = FakeClient(
+        '{"capability":"schedule_add","missing_inputs":[],"needs_clarification":false,'
+        '"confidence":0.9,"slots":{"datetime":"2026-02-06 15:00","title":"看牙醫","topic":"x"}}'
+    )
+    router = IntentRouter(
+        client.generate,
+        "gpt-4o-mini",
+        catalog,
+        combined_slots=True,
+        now_fn=lambda: datetime(2026, 2, 5, 9, 0),
+    )
+
+    decision = router.route("明天下午三點看牙醫")
+    command = _schedule_command_from_slots(decision.slots)
+
+    assert decision.slots == {"datetime": "2026-02-06 15:00", "title": "看牙醫"}
+    assert command.start_time == datetime(2026, 2, 6, 15, 0)
+    assert command.title == "看牙醫"
+    prompt = router._build_prompt("明天下午三點看牙醫")
+    assert "slots" in router.prompt_prefix()
+    assert prompt.endswith("目前時間: 2026-02-05 09:00\n使用者輸入: 明天下午三點看牙醫\n")
+
+
+def test_combined_route_does_not_cache_schedule_slots(tmp_path: Path) -> None:
+    catalog = _make_catalog(tmp_path, extra=["schedule_add"])
+    client = FakeClient(
+        '{"capability":"schedule_add","missing_inputs":[],"needs_clarification":false,'
+        '"confidence":0.9,"slots":{"datetime":"2026-02-06 15:00","title":"看牙醫"}}'
+    )
+    router = IntentRouter(
+        client.generate, "gpt-4o-mini", catalog, cache=RouteCache(None), combined_slots=True
+    )
+
+    router.route("明天下午三點看牙醫")
+    cached = router.route("明天下午三點看牙醫")
+
+    assert cached.tier == "cache"
+    assert cached.capability == "schedule_add"
+    assert cached.slots == {}
+
+
+def test_search_plan_from_slots_skips_llm() -> None:
+    def _fail(model: str, prompt: str) -> str:
+        raise AssertionError("不應呼叫 LLM")
+
+    extractor = NLSearchTopicExtractor(_fail, "gpt-4o-mini")
+
+    plan = extractor.plan_from_slots("幫我整理 AI 新聞並存檔", {"topic": "AI 新聞", "wants_report": False})
+
+    assert plan.is_search is True
+    assert plan.topic == "AI 新聞"
+    assert plan.wants_report is True
+    assert extractor.plan_from_slots("隨便聊聊", {"topic": ""}) is None
+
+
+def test_search_plan_treats_string_false_as_false() -> None:
+    extractor = NLSearchTopicExtractor(lambda model, prompt: "", "gpt-4o-mini")
+
+    plan = extractor.plan_from_slots("幫我查 AI 新聞", {"topic": "AI 新聞", "wants_report": "false"})
+    assert plan.wants_report is False
+
+    plan = extractor.plan_from_slots("幫我查 AI 新聞", {"topic": "AI 新聞", "wants_report": "TRUE"})
+    assert plan.wants_report is True
+
+    plan = extractor.plan_from_slots("幫我查 AI 新聞", {"topic": "AI 新聞", "wants_report": 1})
+    assert plan.wants_report is False
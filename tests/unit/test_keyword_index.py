@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from dongdong_bot.agent.memory import MemoryStore
+
+
+def _scan(store: MemoryStore, query: str, date: str) -> list[str]:
+    results = []
+    for path in (store.memory_dir / f"{date}.md", store.root_dir / f"{date}.md"):
+        if path.exists():
+            results.extend(
+                line.lstrip("- ") for line in path.read_text(encoding="utf-8").splitlines() if query in line
+            )
+    return results
+
+
+def test_index_matches_file_scan(tmp_path: Path) -> None:
+    (tmp_path / "2026-02-01.md").write_text("- 舊的咖啡筆記\n", encoding="utf-8")
+    store = MemoryStore(str(tmp_path))
+    store.save("我喜歡手沖咖啡", date="2026-02-01")
+    store.save("買牛奶", date="2026-02-01")
+    store.save("咖啡豆快用完了", date="2026-02-03")
+
+    for query in ("咖啡", "手沖咖啡", "奶", "", "不存在"):
+        expected = [item for date in ("2026-02-01", "2026-02-02", "2026-02-03") for item in _scan(store, query, date)]
+        assert store.query_range(query, "2026-02-01", "2026-02-03") == expected
+    assert store.query("咖啡", date="2026-02-01") == ["我喜歡手沖咖啡", "舊的咖啡筆記"]
+    assert store.query_range("咖啡", "2026-02-03", "2026-02-01") == ["咖啡豆快用完了", "我喜歡手沖咖啡", "舊的咖啡筆記"]
+
+
+def test_queries_do_not_read_day_files(tmp_path: Path, monkeypatch) -> None:
+    store = MemoryStore(str(tmp_path))
+    store.save("記住牛奶", date="2026-02-01")
+
+    def _fail(*_args, **_kwargs):
+        raise AssertionError("查詢不應讀取 day file")
+
+    monkeypatch.setattr(Path, "read_text", _fail)
+    monkeypatch.setattr(Path, "read_bytes", _fail)
+
+    assert store.query_range("牛奶", "2025-02-02", "2026-02-01") == ["記住牛奶"]
+
+
+def test_restart_picks_up_external_appends(tmp_path: Path) -> None:
+    store = MemoryStore(str(tmp_path))
+    store.save("第一筆紀錄", date="2026-02-01")
+    path = store.memory_dir / "2026-02-01.md"
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write("- 外部加入的紀錄\n")
+
+    reopened = MemoryStore(str(tmp_path))
+
+    assert reopened.query("紀錄", date="2026-02-01") == ["第一筆紀錄", "外部加入的紀錄"]
+    assert len(reopened.keyword_index) == 2
+
+
+def test_deletes_update_index(tmp_path: Path) -> None:
+    store = MemoryStore(str(tmp_path))
+    store.save("喜歡咖啡", date="2026-02-01")
+    store.save("喜歡紅茶", date="2026-02-01")
+    store.save("喜歡綠茶", date="2026-02-02")
+
+    store.delete_by_keyword("紅茶")
+    assert store.query_range("喜歡", "2026-02-01", "2026-02-02") == ["喜歡咖啡", "喜歡綠茶"]
+
+    store.delete_by_date_range("2026-02-02", "2026-02-02")
+    assert store.query_range("喜歡", "2026-02-01", "2026-02-02") == ["喜歡咖啡"]
+
+    store.delete_all()
+    assert store.query_range("喜歡", "2026-02-01", "2026-02-02") == []
+    assert MemoryStore(str(tmp_path)).query("喜歡", date="2026-02-01") == []
+
+
+def test_running_store_sees_changes_made_by_another_store(tmp_path: Path) -> None:
+    bot = MemoryStore(str(tmp_path))
+    bot.save("我喜歡咖啡", date="2026-02-01")
+    bot.save("咖啡豆快用完了", date="2026-02-02")
+    assert bot.query("咖啡", date="2026-02-01") == ["我喜歡咖啡"]
+
+    admin = MemoryStore(str(tmp_path))
+    assert admin.delete_by_keyword("我喜歡咖啡") == 1
+    admin.save("改喝綠茶", date="2026-02-01")
+
+    assert bot.query("咖啡", date="2026-02-01") == []
+    assert bot.query_range("咖啡", "2026-02-01", "2026-02-02") == ["咖啡豆快用完了"]
+    assert bot.query("綠茶", date="2026-02-01") == ["改喝綠茶"]
+
+
+def test_query_picks_up_hand_edited_day_file(tmp_path: Path) -> None:
+    store = MemoryStore(str(tmp_path))
+    store.save("記住甲", date="2026-02-01")
+    path = store.memory_dir / "2026-02-01.md"
+    path.write_text("- 記住乙\n", encoding="utf-8")
+
+    assert store.query("記住", date="2026-02-01") == ["記住乙"]
+
+    path.unlink()
+
+    assert store.query("記住", date="2026-02-01") == []
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import asyncio
+from types import SimpleNamespace
+import json
+
+import pytest
+
+from dongdong_bot.lib.llm_usage import LLMUsage, UsageLedger, call_site, usage_user
+from dongdong_bot.main import AsyncOpenAIClient, OpenAIClient
+from dongdong_bot.tracing import propagate
+
+
+class FakeToday:
+    def __init__(self) -> None:
+        self.today = date(2026, 3, 1)
+
+    def __call__(self) -> date:
+        return self.today
+
+
+def test_from_response_reads_responses_and_embedding_usage() -> None:
+    responses_usage = SimpleNamespace(
+        input_tokens=1200,
+        output_tokens=30,
+        input_tokens_details=SimpleNamespace(cached_tokens=1024),
+    )
+    embedding_usage = SimpleNamespace(prompt_tokens=8, total_tokens=8)
+
+    assert LLMUsage.from_response(responses_usage) == LLMUsage(1200, 1024, 30)
+    assert LLMUsage.from_response(embedding_usage) == LLMUsage(8, 0, 0)
+
+
+def test_cost_prices_cached_and_uncached_tokens_separately() -> None:
+    usage = LLMUsage(input_tokens=1_000_000, cached_input_tokens=500_000, output_tokens=100_000)
+
+    assert usage.cost_usd("gpt-4o-mini") == pytest.approx(0.5 * 0.15 + 0.5 * 0.075 + 0.1 * 0.60)
+    assert usage.cost_usd("unknown-model") == 0.0
+
+
+def test_ledger_tags_calls_with_site_and_user_from_context() -> None:
+    ledger = UsageLedger()
+
+    with usage_user("u1"):
+        with call_site("route"):
+            ledger.record("gpt-4o-mini", LLMUsage(100, 0, 10), 50.0)
+            with call_site("schedule_extract"):
+                ledger.record("gpt-4o-mini", LLMUsage(80, 0, 20), 70.0)
+        with call_site("route"):
+            ledger.record("gpt-4o-mini", LLMUsage(120, 100, 10), 30.0)
+    ledger.record("text-embedding-3-small", None, 5.0)
+
+    by_site = ledger.summary(by="site")
+    assert by_site["route"]["calls"] == 2
+    assert by_site["route"]["input_tokens"] == 220
+    assert by_site["route"]["cached_input_tokens"] == 100
+    assert by_site["route"]["avg_latency_ms"] == 40.0
+    assert by_site["schedule_extract"]["output_tokens"] == 20
+    assert by_site["other"]["calls"] == 1
+    assert ledger.summary(by="user_id")["u1"]["calls"] == 3
+
+
+def test_call_site_follows_work_into_executor() -> None:
+    ledger = UsageLedger()
+
+    def work() -> None:
+        ledger.record("gpt-4o-mini", LLMUsage(10, 0, 1), 1.0)
+
+    with usage_user("u2"), call_site("focus"):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            executor.submit(propagate(work)).result()
+
+    [row] = ledger.rows()
+    assert (row["user_id"], row["site"]) == ("u2", "focus")
+
+
+def test_ledger_persists_per_day_and_prunes_old_days(tmp_path) -> None:
+    path = tmp_path / "llm_usage.json"
+    today = FakeToday()
+    ledger = UsageLedger(str(path), retention_days=7, today_fn=today)
+    ledger.record("gpt-4o-mini", LLMUsage(100, 0, 10), 20.0, site="route", user_id="u1")
+    today.today = date(2026, 3, 2)
+    ledger.record("gpt-4o-mini", LLMUsage(100, 0, 10), 20.0, site="route", user_id="u1")
+    ledger.close()
+
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    assert [row["date"] for row in payload] == ["2026-03-01", "2026-03-02"]
+
+    today.today = date(2026, 3, 9)
+    restored = UsageLedger(str(path), retention_days=7, today_fn=today)
+    assert [row["date"] for row in restored.rows()] == ["2026-03-02"]
+    assert restored.summary(day="2026-03-02")["route"]["input_tokens"] == 100
+
+
+def _stream_events(usage: LLMUsage | None) -> list:
+    events = [SimpleNamespace(type="response.output_text.delta", delta=text) for text in ("你", "好")]
+    if usage is not None:
+        raw = SimpleNamespace(
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            input_tokens_details=SimpleNamespace(cached_tokens=usage.cached_input_tokens),
+        )
+        events.append(SimpleNamespace(type="response.completed", response=SimpleNamespace(usage=raw)))
+    return events
+
+
+class FakeStreamingResponses:
+    def __init__(self) -> None:
+        self.streams: list[list] = []
+
+    def create(self, **_kwargs):
+        return iter(self.streams.pop(0))
+
+
+class FakeAsyncStreamingResponses(FakeStreamingResponses):
+    async def create(self, **_kwargs):
+        events = self.streams.pop(0)
+
+        async def _iterate():
+            for event in events:
+                yield event
+
+        return _iterate()
+
+
+def test_stream_usage_is_per_call_and_recorded_when_consumer_stops_early() -> None:
+    ledger = UsageLedger()
+    client = OpenAIClient("test-key", usage_ledger=ledger)
+    responses = FakeStreamingResponses()
+    responses.streams = [_stream_events(LLMUsage(100, 0, 10)), _stream_events(None), _stream_events(None)]
+    client.client = SimpleNamespace(responses=responses)
+
+    with call_site("first"):
+        assert "".join(client.generate_stream("gpt-4o-mini", "hi")) == "你好"
+    with call_site("no_completed"):
+        list(client.generate_stream("gpt-4o-mini", "hi"))
+    assert client.last_usage() is None
+    with call_site("cancelled"):
+        stream = client.generate_stream("gpt-4o-mini", "hi")
+        next(stream)
+        stream.close()
+
+    by_site = ledger.summary(by="site")
+    assert by_site["first"]["input_tokens"] == 100
+    assert by_site["no_completed"]["calls"] == 1
+    assert by_site["no_completed"]["input_tokens"] == 0
+    assert by_site["cancelled"]["calls"] == 1
+
+
+def test_async_stream_usage_is_per_call_and_recorded_when_consumer_stops_early() -> None:
+    ledger = UsageLedger()
+    client = AsyncOpenAIClient("test-key", usage_ledger=ledger)
+    responses = FakeAsyncStreamingResponses()
+    responses.streams = [_stream_events(LLMUsage(100, 0, 10)), _stream_events(None), _stream_events(None)]
+    client.client = SimpleNamespace(responses=responses)
+
+    async def scenario() -> LLMUsage | None:
+        with call_site("first"):
+            assert "".join([delta async for delta in client.generate_stream("gpt-4o-mini", "hi")]) == "你好"
+        with call_site("no_completed"):
+            [delta async for delta in client.generate_stream("gpt-4o-mini", "hi")]
+            usage = client.last_usage()
+        with call_site("cancelled"):
+            stream = client.generate_stream("gpt-4o-mini", "hi")
+            await stream.__anext__()
+            await stream.aclose()
+        return usage
+
+    assert asyncio.run(scenario()) is None
+    by_site = ledger.summary(by="site")
+    assert by_site["first"]["input_tokens"] == 100
+    assert by_site["no_completed"]["input_tokens"] == 0
+    assert by_site["cancelled"]["calls"] == 1
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
+import threading
 
 from dongdong_bot.main import _semantic_memory_fallback
 from dongdong_bot.agent.memory import MemoryStore
@@ -14,6 +15,9 @@ class FakeEmbeddingClient:
     def embed(self, text: str) -> list[float]:
         return list(self._vector)
 
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed(text) for text in texts]
+
 
 def test_semantic_memory_fallback_hits(tmp_path: Path) -> None:
     store = MemoryStore(str(tmp_path))
@@ -38,16 +42,125 @@ def test_semantic_memory_fallback_hits(tmp_path: Path) -> None:
     assert source == "embedding_index"
 
 
-def test_fallback_uses_recent_entries_when_index_missing(tmp_path: Path) -> None:
+def test_fallback_only_queries_index(tmp_path: Path) -> None:
     store = MemoryStore(str(tmp_path))
-    today = "2026-02-04"
-    memory_path = store.memory_dir / f"{today}.md"
-    memory_path.write_text("- 後天下午要剪頭髮\n", encoding="utf-8")
-
+    store.save("後天下午要剪頭髮", date="2026-02-04")
     embedding_client = FakeEmbeddingClient([0.2, 0.2, 0.2])
+    embedding_client.embed_many = None  # 請求路徑不應回填
+
+    results, source = _semantic_memory_fallback(
+        "我最近有什麼行程？", embedding_client, store, min_score=0.1
+    )
+
+    assert results == []
+    assert source == "no_match"
+    assert len(store.vector_index) == 0
+
+    assert store.backfill_embeddings(FakeEmbeddingClient([0.2, 0.2, 0.2]).embed_many) == 1
     results, source = _semantic_memory_fallback(
         "我最近有什麼行程？", embedding_client, store, min_score=0.1
     )
+    assert results == ["後天下午要剪頭髮"]
+    assert source == "embedding_index"
+
+
+def test_backfill_embeds_each_entry_once(tmp_path: Path) -> None:
+    store = MemoryStore(str(tmp_path))
+    store.save("買牛奶", date="2026-02-04")
+    store.save_with_embedding("買咖啡", [0.1, 0.2, 0.3], date="2026-02-04")
+    embedded: list[str] = []
+
+    def embed_many(texts: list[str]) -> list[list[float]]:
+        embedded.extend(texts)
+        return [[0.3, 0.2, 0.1] for _ in texts]
+
+    first = store.backfill_embeddings(embed_many)
+    store.save_with_embedding("買茶葉", [0.1, 0.1, 0.1], date="2026-02-04")
+    second = store.backfill_embeddings(embed_many)
+
+    assert first == 1
+    assert second == 0
+    assert embedded == ["買牛奶"]
+    assert len(store.vector_index) == 3
+
+
+def test_backfill_skips_failed_embeddings_and_retries(tmp_path: Path) -> None:
+    store = MemoryStore(str(tmp_path))
+    store.save("買牛奶", date="2026-02-04")
+    store.save("買咖啡", date="2026-02-04")
+
+    def flaky(texts: list[str]) -> list[list[float]]:
+        return [[] if text == "買牛奶" else [0.1, 0.2, 0.3] for text in texts]
+
+    assert store.backfill_embeddings(flaky) == 1
+    assert [record.content for record in store.vector_index.records()] == ["買咖啡"]
+
+    assert store.backfill_embeddings(lambda texts: [[0.3, 0.2, 0.1] for _ in texts]) == 1
+    assert sorted(record.content for record in store.vector_index.records()) == ["買咖啡", "買牛奶"]
+    assert store.backfill_embeddings(lambda texts: [[0.3, 0.2, 0.1] for _ in texts]) == 0
+
+
+def test_backfill_reads_only_lines_after_cursor(tmp_path: Path, monkeypatch) -> None:
+    store = MemoryStore(str(tmp_path))
+    store.save("買牛奶", date="2026-02-04")
+    embed_many = lambda texts: [[0.3, 0.2, 0.1] for _ in texts]
+    assert store.backfill_embeddings(embed_many) == 1
+
+    def no_full_scan(*_args, **_kwargs):
+        raise AssertionError("已有游標的檔案不應讀取整個索引")
+
+    monkeypatch.setattr(store.vector_index, "records", no_full_scan)
+    store.save_with_embedding("買咖啡", [0.1, 0.2, 0.3], date="2026-02-04")
+    store.save("買茶葉", date="2026-02-04")
+    store.save_with_embedding("買可可", [0.1, 0.2, 0.3], date="2026-02-04")
+    embedded: list[str] = []
+
+    def recording(texts: list[str]) -> list[list[float]]:
+        embedded.extend(texts)
+        return embed_many(texts)
+
+    assert store.backfill_embeddings(recording) == 1
+    assert embedded == ["買茶葉"]
+    assert len(store.vector_index) == 4
+
+
+def test_concurrent_saves_and_backfill_index_each_entry_once(tmp_path: Path) -> None:
+    store = MemoryStore(str(tmp_path))
+    embed_many = lambda texts: [[0.3, 0.2, 0.1] for _ in texts]
+
+    def writer(prefix: str) -> None:
+        for idx in range(30):
+            if idx % 3:
+                store.save_with_embedding(f"{prefix}-{idx}", [0.1, 0.2, 0.3], date="2026-02-04")
+            else:
+                store.save(f"{prefix}-{idx}", date="2026-02-04")
+
+    def backfiller() -> None:
+        for _ in range(20):
+            store.backfill_embeddings(embed_many)
+
+    threads = [threading.Thread(target=writer, args=(name,)) for name in ("a", "b")]
+    threads.append(threading.Thread(target=backfiller))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.backfill_embeddings(embed_many)
+
+    contents = [record.content for record in store.vector_index.records()]
+    assert sorted(contents) == sorted(f"{prefix}-{idx}" for prefix in ("a", "b") for idx in range(30))
+    assert store.backfill_embeddings(embed_many) == 0
+
+
+def test_backfill_after_keyword_delete_does_not_duplicate(tmp_path: Path) -> None:
+    store = MemoryStore(str(tmp_path))
+    store.save("買牛奶", date="2026-02-04")
+    store.save("買咖啡", date="2026-02-04")
+    embed_many = lambda texts: [[0.3, 0.2, 0.1] for _ in texts]
+    store.backfill_embeddings(embed_many)
+
+    store.delete_by_keyword("牛奶")
+    store.save("買茶葉", date="2026-02-04")
 
-    assert "後天下午要剪頭髮" in results
-    assert source == "recent_semantic"
+    assert store.backfill_embeddings(embed_many) == 1
+    assert sorted(record.content for record in store.vector_index.records()) == ["買咖啡", "買茶葉"]
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import threading
+
+from dongdong_bot.agent.memory import MemoryStore
+from dongdong_bot.main import _recall_memories
+
+
+class FakeMonitoring:
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+
+    def info(self, message: str) -> None:
+        self.lines.append(message)
+
+
+class WaitingLLM:
+    def __init__(self, embedded: threading.Event, reply: str) -> None:
+        self._embedded = embedded
+        self._reply = reply
+        self.overlapped = False
+
+    def generate(self, model: str, prompt: str) -> str:
+        self.overlapped = self._embedded.wait(timeout=2)
+        return self._reply
+
+
+class RecordingEmbeddingClient:
+    def __init__(self, embedded: threading.Event) -> None:
+        self._embedded = embedded
+        self.calls: list[str] = []
+
+    def embed(self, text: str) -> list[float]:
+        self.calls.append(text)
+        self._embedded.set()
+        return [1.0, 0.0] if "咖啡" in text else [0.0, 1.0]
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed(text) for text in texts]
+
+
+def test_recall_embeds_raw_query_while_focus_runs(tmp_path: Path) -> None:
+    store = MemoryStore(str(tmp_path))
+    store.save_with_embedding("我喜歡手沖咖啡", [1.0, 0.0], date="2026-02-02")
+    embedded = threading.Event()
+    llm = WaitingLLM(embedded, "咖啡偏好")
+    embedding_client = RecordingEmbeddingClient(embedded)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = _recall_memories(
+            executor,
+            llm,
+            "gpt-4o-mini",
+            embedding_client,
+            store,
+            "我喜歡什麼咖啡",
+            None,
+            None,
+            FakeMonitoring(),
+        )
+
+    assert llm.overlapped is True
+    assert embedding_client.calls == ["我喜歡什麼咖啡", "咖啡偏好"]
+    assert results == ["我喜歡手沖咖啡"]
+
+
+def test_recall_falls_back_to_raw_keyword_query(tmp_path: Path) -> None:
+    store = MemoryStore(str(tmp_path))
+    store.save("外套是淺藍色", date="2026-02-02")
+    embedded = threading.Event()
+    monitoring = FakeMonitoring()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = _recall_memories(
+            executor,
+            WaitingLLM(embedded, "外套顏色"),
+            "gpt-4o-mini",
+            RecordingEmbeddingClient(embedded),
+            store,
+            "外套",
+            "2026-02-02",
+            None,
+            monitoring,
+        )
+
+    assert results == ["外套是淺藍色"]
+    assert "memory_focus=外套顏色" in monitoring.lines
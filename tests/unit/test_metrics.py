@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import json
+import urllib.request
+
+from dongdong_bot.metrics import MetricsRegistry, SnapshotWriter, start_http_exporter
+
+
+def test_histogram_reports_percentiles() -> None:
+    metrics = MetricsRegistry()
+    for value in range(1, 101):
+        metrics.observe("route", float(value))
+
+    summary = metrics.snapshot()["histograms"]["route"]
+
+    assert summary["count"] == 100
+    assert summary["p50"] == 50.0
+    assert summary["p95"] == 95.0
+    assert summary["p99"] == 99.0
+    assert summary["max"] == 100.0
+    assert summary["avg"] == 50.5
+
+
+def test_counters_and_gauges_are_exported() -> None:
+    metrics = MetricsRegistry()
+    depth = {"value": 3}
+    metrics.inc("route.tier.rule")
+    metrics.inc("route.tier.rule")
+    metrics.set_gauge("session.live", 7)
+    metrics.register_gauge("dispatch.queued", lambda: depth["value"])
+    depth["value"] = 5
+
+    snapshot = metrics.snapshot()
+
+    assert snapshot["counters"] == {"route.tier.rule": 2}
+    assert snapshot["gauges"] == {"session.live": 7, "dispatch.queued": 5.0}
+
+
+def test_disabled_registry_records_nothing() -> None:
+    metrics = MetricsRegistry(enabled=False)
+    metrics.inc("reminder.sent")
+    metrics.observe("embed", 12.0)
+    metrics.register_gauge("session.live", lambda: 1)
+    with metrics.timer("search.keyword"):
+        pass
+
+    snapshot = metrics.snapshot()
+
+    assert snapshot["counters"] == {}
+    assert snapshot["gauges"] == {}
+    assert snapshot["histograms"] == {}
+
+
+def test_snapshot_writer_writes_json_file(tmp_path) -> None:
+    metrics = MetricsRegistry()
+    with metrics.timer("memory.query"):
+        pass
+    path = tmp_path / "metrics.json"
+    writer = SnapshotWriter(metrics, str(path), interval_seconds=60)
+    writer.start()
+
+    writer.close()
+
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    assert payload["histograms"]["memory.query"]["count"] == 1
+
+
+def test_http_exporter_serves_snapshot() -> None:
+    metrics = MetricsRegistry()
+    metrics.inc("reminder.failed", 2)
+    server = start_http_exporter(metrics, 0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            payload = json.loads(response.read().decode("utf-8"))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert payload["counters"] == {"reminder.failed": 2}
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+import threading
+
+import pytest
+
+from dongdong_bot.channels.rate_limit import AsyncRateLimiter, KeyedRateLimiter
+from dongdong_bot.channels.telegram import REMINDER_RETRY_SECONDS, TelegramClient, deliver_reminders
+from dongdong_bot.cron.scheduler import ReminderPayload, ReminderScheduler
+from dongdong_bot.monitoring import Monitoring
+from tests.helpers.schedule_fixtures import create_schedule, make_stores
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+def _payload(idx: int, chat_id: str) -> ReminderPayload:
+    return ReminderPayload(
+        reminder_id=f"r{idx}",
+        schedule_id=f"s{idx}",
+        chat_id=chat_id,
+        message=f"提醒 {idx}",
+    )
+
+
+def test_delivery_respects_concurrency_and_per_chat_rate() -> None:
+    clock = FakeClock()
+    sent_at: dict[str, list[float]] = {}
+    in_flight = 0
+    peak = 0
+
+    async def _send(reminder: ReminderPayload) -> None:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        if reminder.reminder_id == "r5":
+            raise RuntimeError("chat not found")
+        sent_at.setdefault(reminder.chat_id, []).append(clock.now)
+
+    reminders = [_payload(idx, "chat-a") for idx in range(3)]
+    reminders += [_payload(idx, f"chat-{idx}") for idx in range(3, 6)]
+
+    sent, failed = asyncio.run(
+        deliver_reminders(
+            reminders,
+            _send,
+            concurrency=2,
+            global_limiter=AsyncRateLimiter(0, clock, clock.sleep),
+            chat_limiter=KeyedRateLimiter(1, clock, clock.sleep),
+        )
+    )
+
+    assert len(sent) == 5
+    assert [(reminder.reminder_id, error) for reminder, error in failed] == [("r5", "chat not found")]
+    assert peak <= 2
+    times = sent_at["chat-a"]
+    assert times == [0.0, 1.0, 2.0]
+
+
+def test_commit_results_batches_store_writes(tmp_path: Path) -> None:
+    schedule_store, reminder_store = make_stores(tmp_path)
+    ok = create_schedule(schedule_store, title="開會")
+    bad = create_schedule(schedule_store, title="看診")
+    for schedule in (ok, bad):
+        reminder_store.create(schedule.schedule_id, schedule.start_time)
+    scheduler = ReminderScheduler(schedule_store, reminder_store)
+    due = scheduler.collect_due(now=ok.start_time)
+    journal = tmp_path / "reminders.journal.jsonl"
+    before = len(journal.read_text(encoding="utf-8").splitlines())
+
+    by_schedule = {payload.schedule_id: payload for payload in due}
+    scheduler.commit_results([by_schedule[ok.schedule_id]], [(by_schedule[bad.schedule_id], "blocked")])
+
+    assert len(journal.read_text(encoding="utf-8").splitlines()) == before + 2
+    assert schedule_store.get(ok.schedule_id).status == "completed"
+    assert schedule_store.get(bad.schedule_id).status == "scheduled"
+    statuses = {reminder.schedule_id: reminder for reminder in reminder_store._load()}
+    assert statuses[ok.schedule_id].status == "sent"
+    assert statuses[bad.schedule_id].last_error == "blocked"
+
+
+class GatedChatLimiter:
+    # chat-a 要等 chat-b 送出後才放行；若在持有名額時等待就會卡死。
+    def __init__(self) -> None:
+        self.gate = asyncio.Event()
+
+    async def acquire(self, chat_id: str) -> None:
+        if chat_id == "chat-a":
+            await self.gate.wait()
+
+
+def test_chat_rate_wait_does_not_hold_a_delivery_slot() -> None:
+    limiter = GatedChatLimiter()
+    order: list[str] = []
+
+    async def _send(reminder: ReminderPayload) -> None:
+        order.append(reminder.chat_id)
+        limiter.gate.set()
+
+    async def _run():
+        return await asyncio.wait_for(
+            deliver_reminders(
+                [_payload(0, "chat-a"), _payload(1, "chat-b")],
+                _send,
+                concurrency=1,
+                global_limiter=AsyncRateLimiter(0),
+                chat_limiter=limiter,
+            ),
+            timeout=1.0,
+        )
+
+    sent, failed = asyncio.run(_run())
+
+    assert order == ["chat-b", "chat-a"]
+    assert len(sent) == 2 and failed == []
+
+
+class FakeJobQueue:
+    def __init__(self) -> None:
+        self.scheduled: list[float] = []
+
+    def run_once(self, callback, when: float):
+        self.scheduled.append(when)
+        return SimpleNamespace(schedule_removal=lambda: None)
+
+
+class ThreadRecordingScheduler:
+    def __init__(self) -> None:
+        self.threads: list[threading.Thread] = []
+
+    def next_wakeup(self):
+        self.threads.append(threading.current_thread())
+        return datetime.now() + timedelta(seconds=60)
+
+
+class BrokenScheduler:
+    def collect_due(self):
+        raise OSError("disk unavailable")
+
+    def next_wakeup(self):
+        return datetime.now() - timedelta(minutes=1)
+
+
+def test_reminder_job_rearms_after_collect_due_fails() -> None:
+    client = TelegramClient(
+        "123:offline",
+        Monitoring(60, 60, output=lambda _line: None),
+        scheduler=BrokenScheduler(),
+        reminder_interval_seconds=300,
+    )
+    job_queue = FakeJobQueue()
+    client.app = SimpleNamespace(job_queue=job_queue)
+
+    with pytest.raises(OSError):
+        asyncio.run(client._run_reminder_job(SimpleNamespace(bot=None)))
+
+    [when] = job_queue.scheduled
+    assert REMINDER_RETRY_SECONDS - 1 <= when <= REMINDER_RETRY_SECONDS
+    assert client._reminder_wakeup is not None
+
+
+def test_arming_reads_next_wakeup_off_the_event_loop_thread() -> None:
+    scheduler = ThreadRecordingScheduler()
+    client = TelegramClient("123:offline", Monitoring(60, 60, output=lambda _line: None), scheduler=scheduler)
+    job_queue = FakeJobQueue()
+    client.app = SimpleNamespace(job_queue=job_queue)
+
+    asyncio.run(client._arm_reminder_job())
+
+    assert scheduler.threads and scheduler.threads[0] is not threading.main_thread()
+    [when] = job_queue.scheduled
+    assert 59 <= when <= 60
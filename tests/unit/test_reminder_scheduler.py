@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from dongdong_bot.channels.telegram import next_reminder_wakeup
+from dongdong_bot.cron.scheduler import ReminderScheduler
+from tests.helpers.schedule_fixtures import create_schedule, make_stores
+
+
+class CountingScheduleStore:
+    def __init__(self, store) -> None:
+        self._store = store
+        self.batch_calls = 0
+
+    def get_many(self, schedule_ids):
+        self.batch_calls += 1
+        return self._store.get_many(schedule_ids)
+
+    def get(self, schedule_id):
+        raise AssertionError("collect_due 應批次取回行程")
+
+
+def test_collect_due_pops_only_due_reminders_in_order(tmp_path: Path) -> None:
+    schedule_store, reminder_store = make_stores(tmp_path)
+    base = datetime(2026, 2, 5, 9, 0)
+    late = create_schedule(schedule_store, title="晚上", start_time=base + timedelta(hours=8))
+    early = create_schedule(schedule_store, title="早上", start_time=base)
+    noon = create_schedule(schedule_store, title="中午", start_time=base + timedelta(hours=3))
+    for schedule in (late, early, noon):
+        reminder_store.create(schedule.schedule_id, schedule.start_time)
+    counting = CountingScheduleStore(schedule_store)
+    scheduler = ReminderScheduler(counting, reminder_store)
+
+    due = scheduler.collect_due(now=base + timedelta(hours=4))
+
+    assert [payload.schedule_id for payload in due] == [early.schedule_id, noon.schedule_id]
+    assert counting.batch_calls == 1
+    assert scheduler.next_wakeup() == late.start_time
+    assert scheduler.collect_due(now=base + timedelta(hours=4)) == []
+
+
+def test_invalidated_reminder_is_skipped_and_rescheduled(tmp_path: Path) -> None:
+    schedule_store, reminder_store = make_stores(tmp_path)
+    schedule = create_schedule(schedule_store)
+    reminder_store.create(schedule.schedule_id, schedule.start_time)
+    moved = schedule.start_time + timedelta(hours=1)
+
+    reminder_store.invalidate_pending_by_schedule(schedule.schedule_id)
+    reminder_store.create(schedule.schedule_id, moved)
+    scheduler = ReminderScheduler(schedule_store, reminder_store)
+
+    assert scheduler.next_wakeup() == moved
+    assert scheduler.collect_due(now=schedule.start_time) == []
+    assert len(scheduler.collect_due(now=moved)) == 1
+
+
+def test_next_reminder_wakeup_caps_sleep() -> None:
+    now = datetime(2026, 2, 5, 9, 0)
+
+    assert next_reminder_wakeup(None, now, 300) == now + timedelta(seconds=300)
+    assert next_reminder_wakeup(now + timedelta(seconds=30), now, 300) == now + timedelta(seconds=30)
+    assert next_reminder_wakeup(now - timedelta(minutes=5), now, 300) == now
+
+
+class FailingScheduleStore:
+    def get_many(self, schedule_ids):
+        raise OSError("disk unavailable")
+
+
+def test_collect_due_requeues_reminders_when_lookup_fails(tmp_path: Path) -> None:
+    schedule_store, reminder_store = make_stores(tmp_path)
+    schedule = create_schedule(schedule_store)
+    reminder_store.create(schedule.schedule_id, schedule.start_time)
+
+    with pytest.raises(OSError):
+        ReminderScheduler(FailingScheduleStore(), reminder_store).collect_due(now=schedule.start_time)
+
+    scheduler = ReminderScheduler(schedule_store, reminder_store)
+    assert scheduler.next_wakeup() == schedule.start_time
+    [payload] = scheduler.collect_due(now=schedule.start_time)
+    assert payload.schedule_id == schedule.schedule_id
+
+
+def test_failed_status_commit_keeps_reminder_pending_for_release(tmp_path: Path, monkeypatch) -> None:
+    schedule_store, reminder_store = make_stores(tmp_path)
+    schedule = create_schedule(schedule_store)
+    reminder_store.create(schedule.schedule_id, schedule.start_time)
+    scheduler = ReminderScheduler(schedule_store, reminder_store)
+    due = scheduler.collect_due(now=schedule.start_time)
+
+    def broken_append(**_kwargs) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(reminder_store._journal, "append", broken_append)
+    with pytest.raises(OSError):
+        scheduler.commit_results(due, [])
+    monkeypatch.undo()
+
+    assert [reminder.status for reminder in reminder_store.list_pending()] == ["pending"]
+    assert scheduler.release(due) == 1
+    assert scheduler.next_wakeup() == schedule.start_time
+    [payload] = scheduler.collect_due(now=schedule.start_time)
+    assert payload.reminder_id == due[0].reminder_id
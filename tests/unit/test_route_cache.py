@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from dongdong_bot.agent.capability_catalog import CapabilityCatalog
+from dongdong_bot.agent.intent_router import IntentRouter
+from dongdong_bot.lib.nl_search_topic import NLSearchTopicExtractor
+from dongdong_bot.lib.route_cache import RouteCache, normalize_text
+
+
+class CountingClient:
+    def __init__(self, response: str) -> None:
+        self.calls = 0
+        self._response = response
+
+    def generate(self, model: str, prompt: str) -> str:
+        self.calls += 1
+        return self._response
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+DECISION = '{"capability":"memory_save","missing_inputs":[],"needs_clarification":false,"confidence":0.9}'
+
+
+def _write_catalog(path: Path, description: str) -> None:
+    payload = {
+        "capabilities": [
+            {
+                "name": "memory_save",
+                "description": description,
+                "required_inputs": [],
+                "example_requests": [],
+                "clarifications": {},
+            },
+        ]
+    }
+    path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+
+
+def test_normalize_text_folds_width_case_and_punctuation() -> None:
+    assert normalize_text("  ＨＥＬＬＯ   世界！ ") == "hello 世界"
+
+
+def test_router_reuses_cached_decision_until_ttl(tmp_path: Path) -> None:
+    caps = tmp_path / "caps.yaml"
+    _write_catalog(caps, "保存記憶")
+    catalog = CapabilityCatalog(caps)
+    clock = Clock()
+    cache = RouteCache(str(tmp_path / "route_cache.jsonl"), lambda: catalog.fingerprint, ttl_seconds=60, now_fn=clock)
+    client = CountingClient(DECISION)
+    router = IntentRouter(client.generate, "gpt-4o-mini", catalog, cache=cache)
+
+    first = router.route("我喜歡咖啡")
+    second = router.route("我喜歡咖啡！")
+    clock.now += 61
+    router.route("我喜歡咖啡")
+
+    assert first.tier == "llm"
+    assert second.tier == "cache"
+    assert second.capability == "memory_save"
+    assert client.calls == 2
+    assert router.tier_stats()["cache"] == 1
+
+
+def test_route_cache_invalidated_by_catalog_change_and_persisted(tmp_path: Path) -> None:
+    caps = tmp_path / "caps.yaml"
+    _write_catalog(caps, "保存記憶")
+    catalog = CapabilityCatalog(caps)
+    cache_path = str(tmp_path / "route_cache.jsonl")
+    cache = RouteCache(cache_path, lambda: catalog.fingerprint)
+    cache.put("route", "你好", {"capability": "memory_save"})
+
+    reopened = RouteCache(cache_path, lambda: catalog.fingerprint)
+    assert reopened.get("route", "你好") == {"capability": "memory_save"}
+
+    _write_catalog(caps, "保存記憶（新版）")
+    stat = caps.stat()
+    os.utime(caps, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert reopened.get("route", "你好") is None
+
+
+def test_search_plan_cached_only_when_parsed(tmp_path: Path) -> None:
+    cache = RouteCache(None)
+    client = CountingClient('{"is_search":true,"topic":"AI 新聞","url":"","wants_report":false}')
+    extractor = NLSearchTopicExtractor(client.generate, "gpt-4o-mini", cache=cache)
+
+    first = extractor.extract("幫我查 AI 新聞")
+    second = extractor.extract("幫我查 AI 新聞")
+    broken = NLSearchTopicExtractor(CountingClient("not json").generate, "gpt-4o-mini", cache=cache)
+    broken.extract("隨便聊聊")
+
+    assert first == second
+    assert first.topic == "AI 新聞"
+    assert client.calls == 1
+    assert len(cache) == 1
+
+
+def test_route_cache_file_compacts_while_running(tmp_path: Path) -> None:
+    cache_path = tmp_path / "route_cache.jsonl"
+    clock = Clock()
+    cache = RouteCache(str(cache_path), max_entries=5, ttl_seconds=60, now_fn=clock)
+
+    for idx in range(50):
+        cache.put("route", f"訊息 {idx % 8}", {"capability": "direct_reply"})
+        clock.now += 1
+
+    lines = cache_path.read_text(encoding="utf-8").splitlines()
+    assert len(cache) == 5
+    assert len(lines) <= 2 * len(cache) + 1
+    reopened = RouteCache(str(cache_path), max_entries=5, ttl_seconds=60, now_fn=clock)
+    assert reopened.get("route", "訊息 1") == {"capability": "direct_reply"}
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from dongdong_bot.agent.schedule_store import ScheduleStore
+from tests.helpers.schedule_fixtures import create_schedule
+
+
+def test_mutations_append_to_journal_and_reload(tmp_path: Path) -> None:
+    path = tmp_path / "schedules.json"
+    store = ScheduleStore(str(path))
+
+    first = create_schedule(store, title="看牙醫")
+    second = create_schedule(store, user_id="user-2", title="開會")
+    store.complete(first.schedule_id, completed_at=datetime(2026, 2, 5, 10, 0))
+
+    journal = tmp_path / "schedules.journal.jsonl"
+    assert not path.exists()
+    assert len(journal.read_text(encoding="utf-8").splitlines()) == 3
+
+    reloaded = ScheduleStore(str(path))
+    assert [item.title for item in reloaded.list("user-1")] == ["看牙醫"]
+    assert reloaded.get(first.schedule_id).status == "completed"
+    assert [item.schedule_id for item in reloaded.list_by_status("scheduled")] == [second.schedule_id]
+    assert set(reloaded.get_many([first.schedule_id, "missing"])) == {first.schedule_id}
+
+
+def test_delete_completed_and_compaction(tmp_path: Path) -> None:
+    path = tmp_path / "schedules.json"
+    store = ScheduleStore(str(path))
+    store._journal.compact_min = 2
+
+    keep = create_schedule(store, title="保留")
+    done = create_schedule(store, title="完成")
+    store.complete(done.schedule_id)
+    deleted = store.delete_completed("user-1")
+
+    assert deleted == 1
+    snapshot = json.loads(path.read_text(encoding="utf-8"))
+    assert [item["schedule_id"] for item in snapshot] == [keep.schedule_id]
+    assert not (tmp_path / "schedules.journal.jsonl").exists()
+    reloaded = ScheduleStore(str(path))
+    assert [item.title for item in reloaded.list("user-1")] == ["保留"]
+    assert reloaded.list_by_status("completed") == []
+
+
+def test_returned_items_do_not_leak_into_index(tmp_path: Path) -> None:
+    store = ScheduleStore(str(tmp_path / "schedules.json"))
+    schedule = create_schedule(store)
+
+    fetched = store.get(schedule.schedule_id)
+    fetched.status = "completed"
+
+    assert store.list_by_status("completed") == []
+    assert store.get(schedule.schedule_id).status == "scheduled"
+
+
+def test_external_snapshot_change_triggers_reload(tmp_path: Path) -> None:
+    path = tmp_path / "schedules.json"
+    store = ScheduleStore(str(path))
+    create_schedule(store)
+    other = ScheduleStore(str(path))
+
+    other._write([])
+
+    assert store.list("user-1") == []
+
+
+def test_failed_journal_write_leaves_index_unchanged(tmp_path: Path, monkeypatch) -> None:
+    store = ScheduleStore(str(tmp_path / "schedules.json"))
+    schedule = create_schedule(store)
+
+    def broken_append(**_kwargs) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store._journal, "append", broken_append)
+    with pytest.raises(OSError):
+        store.complete(schedule.schedule_id)
+    with pytest.raises(OSError):
+        store.complete_many([schedule.schedule_id])
+
+    assert store.get(schedule.schedule_id).status == "scheduled"
+    assert store.list_by_status("completed") == []
+    assert [item.schedule_id for item in store.list_by_status("scheduled")] == [schedule.schedule_id]
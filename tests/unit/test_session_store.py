@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from dongdong_bot.agent.session import SessionStore
+from dongdong_bot.agent.session_journal import SessionJournal
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = datetime(2026, 3, 1, 9, 0)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, minutes: int) -> None:
+        self.now += timedelta(minutes=minutes)
+
+
+def test_messages_are_bounded_by_max_messages() -> None:
+    store = SessionStore(max_messages=3)
+
+    for idx in range(5):
+        session = store.touch("user-1", f"訊息 {idx}")
+
+    assert list(session.messages) == ["訊息 2", "訊息 3", "訊息 4"]
+
+
+def test_touch_sweeps_expired_sessions_of_other_users() -> None:
+    clock = FakeClock()
+    store = SessionStore(ttl_minutes=30, now_fn=clock)
+    store.touch("user-1", "早安")
+    clock.advance(20)
+    store.touch("user-2", "午安")
+    clock.advance(15)
+
+    store.touch("user-3", "晚安")
+
+    assert store.get("user-1") is None
+    assert store.get("user-2") is not None
+    assert store.stats() == {"live": 2, "expired_evictions": 1, "lru_evictions": 0}
+
+
+def test_sweep_removes_idle_sessions() -> None:
+    clock = FakeClock()
+    store = SessionStore(ttl_minutes=30, now_fn=clock)
+    store.touch("user-1", "a")
+    store.touch("user-2", "b")
+    clock.advance(31)
+
+    assert store.sweep() == 2
+    assert len(store) == 0
+
+
+def test_lru_cap_evicts_least_recently_active() -> None:
+    store = SessionStore(max_sessions=2)
+    store.touch("user-1", "a")
+    store.touch("user-2", "b")
+    store.touch("user-1", "c")
+
+    store.touch("user-3", "d")
+
+    assert store.get("user-2") is None
+    assert list(store.get("user-1").messages) == ["a", "c"]
+    assert store.stats()["lru_evictions"] == 1
+    assert store.stats()["live"] == 2
+
+
+def test_journal_restores_sessions_and_pending_actions(tmp_path) -> None:
+    path = tmp_path / "sessions.jsonl"
+    store = SessionStore(journal=SessionJournal(str(path), flush_interval=60))
+    store.touch("user-1", "刪除全部已完成行程")
+    store.set_pending_action("user-1", "bulk_delete_completed", {"count": 2})
+    store.touch("user-2", "早安")
+    store.clear("user-2")
+
+    assert not path.read_text(encoding="utf-8")
+    store.close()
+
+    restored = SessionStore(journal=SessionJournal(str(path), flush_interval=60))
+    try:
+        assert restored.get_pending_action("user-1") == ("bulk_delete_completed", {"count": 2})
+        assert list(restored.get("user-1").messages) == ["刪除全部已完成行程"]
+        assert restored.get("user-2") is None
+    finally:
+        restored.close()
+
+
+def test_journal_ignores_torn_tail_and_expired_sessions(tmp_path) -> None:
+    clock = FakeClock()
+    path = tmp_path / "sessions.jsonl"
+    store = SessionStore(ttl_minutes=30, now_fn=clock, journal=SessionJournal(str(path), flush_interval=60))
+    store.touch("user-1", "a")
+    clock.advance(40)
+    store.touch("user-2", "b")
+    store.close()
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write('{"op": "touch", "u": "user-2", "t"')
+
+    restored = SessionStore(ttl_minutes=30, now_fn=clock, journal=SessionJournal(str(path), flush_interval=60))
+    try:
+        assert restored.get("user-1") is None
+        assert list(restored.get("user-2").messages) == ["b"]
+        assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+    finally:
+        restored.close()
+
+
+def test_flush_compacts_long_journal(tmp_path) -> None:
+    path = tmp_path / "sessions.jsonl"
+    journal = SessionJournal(str(path), flush_interval=60, compact_min=5)
+    store = SessionStore(journal=journal)
+    for idx in range(10):
+        store.touch("user-1", f"訊息 {idx}")
+    store.flush()
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 11
+
+    store.flush()
+
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+    store.close()
+
+
+class LockProbeJournal(SessionJournal):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.store: SessionStore | None = None
+        self.locked_during_write: list[bool] = []
+
+    def _write_snapshot(self, entries) -> None:
+        if self.store is not None:
+            self.locked_during_write.append(self.store._lock.locked())
+        super()._write_snapshot(entries)
+
+
+def test_compaction_writes_outside_the_store_lock(tmp_path) -> None:
+    path = tmp_path / "sessions.jsonl"
+    journal = LockProbeJournal(str(path), flush_interval=60, compact_min=5)
+    store = SessionStore(journal=journal)
+    journal.store = store
+    for idx in range(10):
+        store.touch("user-1", f"訊息 {idx}")
+    store.flush()
+
+    store.flush()
+    store.touch("user-2", "之後的訊息")
+    store.close()
+
+    assert journal.locked_during_write == [False]
+    restored = SessionStore(journal=SessionJournal(str(path), flush_interval=60))
+    try:
+        assert list(restored.get("user-1").messages)[-1] == "訊息 9"
+        assert list(restored.get("user-2").messages) == ["之後的訊息"]
+    finally:
+        restored.close()
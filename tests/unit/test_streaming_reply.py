@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+
+from dongdong_bot.agent.loop import GoapEngine
+from dongdong_bot.channels.streaming import StreamingReply
+
+
+class StreamingClient:
+    def __init__(self, chunks: list[str]) -> None:
+        self._chunks = chunks
+
+    def generate(self, model: str, prompt: str) -> str:
+        raise AssertionError("有 on_delta 時應使用串流")
+
+    def generate_stream(self, model: str, prompt: str):
+        yield from self._chunks
+
+
+class FakeChat:
+    def __init__(self) -> None:
+        self.sent: list[str] = []
+        self.edits: list[str] = []
+
+    async def send(self, text: str) -> str:
+        self.sent.append(text)
+        return "message-1"
+
+    async def edit(self, message: str, text: str) -> None:
+        self.edits.append(text)
+
+
+def test_streaming_reply_sends_first_chunk_then_throttles_edits() -> None:
+    now = [0.0]
+    chat = FakeChat()
+    stream = StreamingReply(chat.send, chat.edit, min_edit_interval=1.0, clock=lambda: now[0])
+
+    async def _run() -> None:
+        await stream.push("你好")
+        now[0] = 0.5
+        await stream.push("，今天")
+        now[0] = 1.2
+        await stream.push("天氣不錯")
+        await stream.finish("你好，今天天氣不錯。\n\n（一般回覆）")
+
+    asyncio.run(_run())
+
+    assert chat.sent == ["你好"]
+    assert chat.edits == ["你好，今天天氣不錯", "你好，今天天氣不錯。\n\n（一般回覆）"]
+    assert stream.first_visible_at == 0.0
+
+
+def test_streaming_reply_without_chunks_sends_final_once() -> None:
+    chat = FakeChat()
+    stream = StreamingReply(chat.send, chat.edit)
+
+    asyncio.run(stream.finish("已記住。"))
+
+    assert chat.sent == ["已記住。"]
+    assert chat.edits == []
+
+
+def test_direct_reply_streams_deltas() -> None:
+    engine = GoapEngine(StreamingClient(["哈", "囉", "！"]), model="gpt-5-mini", fast_model="gpt-4o-mini")
+    deltas: list[str] = []
+
+    response = engine.respond("嗨", forced_decision="direct_reply", on_delta=deltas.append)
+
+    assert deltas == ["哈", "囉", "！"]
+    assert response.reply == "哈囉！"
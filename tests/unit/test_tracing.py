@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+
+from dongdong_bot.tracing import Tracer, annotate, propagate, span
+
+
+def _read(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_trace_records_nested_spans_with_attributes(tmp_path) -> None:
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(str(path), sample_rate=1.0)
+
+    with tracer.trace("handle_message", user_id="u1") as root:
+        with span("route") as route:
+            route.set(capability="memory_query", tier="embedding")
+        with span("memory.query"):
+            with span("llm.generate", model="gpt-4o-mini"):
+                annotate(input_tokens=120, cached_input_tokens=64)
+        root.set(decision="memory_query")
+
+    [record] = _read(path)
+    assert record["name"] == "handle_message"
+    assert record["attrs"] == {"user_id": "u1", "decision": "memory_query"}
+    route, query = record["spans"]
+    assert route["attrs"] == {"capability": "memory_query", "tier": "embedding"}
+    assert query["spans"][0]["attrs"] == {
+        "model": "gpt-4o-mini",
+        "input_tokens": 120,
+        "cached_input_tokens": 64,
+    }
+    assert route["start_ms"] <= query["start_ms"]
+
+
+def test_propagate_attaches_executor_work_to_trace(tmp_path) -> None:
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(str(path), sample_rate=1.0)
+
+    def work(name: str) -> None:
+        with span(name):
+            pass
+
+    with tracer.trace("handle_message"):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(propagate(work), name) for name in ("focus", "embed")]
+            for future in futures:
+                future.result()
+
+    [record] = _read(path)
+    assert sorted(child["name"] for child in record["spans"]) == ["embed", "focus"]
+
+
+def test_unsampled_fast_traces_are_dropped(tmp_path) -> None:
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(str(path), sample_rate=0.1, slow_ms=10_000, random_fn=lambda: 0.5)
+
+    with tracer.trace("handle_message"):
+        with span("route"):
+            pass
+
+    assert not path.exists()
+    assert tracer.written == 0
+
+
+def test_slow_traces_are_always_written(tmp_path) -> None:
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(str(path), slow_ms=0.0)
+
+    with tracer.trace("handle_message"):
+        pass
+
+    [record] = _read(path)
+    assert record["slow"] is True
+
+
+def test_nested_trace_becomes_child_span(tmp_path) -> None:
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(str(path), sample_rate=1.0)
+
+    async def run() -> None:
+        with tracer.trace("handle_message"):
+            loop = asyncio.get_running_loop()
+
+            def delegated() -> None:
+                with tracer.trace("handle_message.sync"):
+                    with span("goap"):
+                        pass
+
+            await loop.run_in_executor(None, propagate(delegated))
+
+    asyncio.run(run())
+
+    [record] = _read(path)
+    assert record["spans"][0]["name"] == "handle_message.sync"
+    assert record["spans"][0]["spans"][0]["name"] == "goap"
+
+
+def test_span_outside_trace_is_noop() -> None:
+    with span("route") as current:
+        current.set(capability="direct_reply")
+        annotate(tier="rule")
+
+    assert current.attrs == {}
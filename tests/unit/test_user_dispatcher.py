@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from dongdong_bot.channels.dispatch import DispatchRejected, UserDispatcher
+
+
+def test_same_user_runs_in_order_while_users_run_concurrently() -> None:
+    dispatcher = UserDispatcher(max_concurrency=4)
+    events: list[str] = []
+    active = {"now": 0, "peak": 0}
+
+    def make_work(label: str, delay: float):
+        async def work() -> str:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            events.append(f"start:{label}")
+            await asyncio.sleep(delay)
+            events.append(f"end:{label}")
+            active["now"] -= 1
+            return label
+
+        return work
+
+    async def run_all():
+        return await asyncio.gather(
+            dispatcher.submit("a", make_work("a1", 0.02)),
+            dispatcher.submit("a", make_work("a2", 0.0)),
+            dispatcher.submit("b", make_work("b1", 0.01)),
+        )
+
+    results = asyncio.run(run_all())
+
+    assert results == ["a1", "a2", "b1"]
+    assert events.index("end:a1") < events.index("start:a2")
+    assert events.index("start:b1") < events.index("end:a1")
+    assert active["peak"] == 2
+    assert dispatcher.depth() == 0
+    assert dispatcher.stats()["completed"] == 3
+
+
+def test_global_concurrency_limit() -> None:
+    dispatcher = UserDispatcher(max_concurrency=2)
+    active = {"now": 0, "peak": 0}
+
+    async def work() -> None:
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+
+    async def run_all():
+        await asyncio.gather(*(dispatcher.submit(f"user-{idx}", work) for idx in range(6)))
+
+    asyncio.run(run_all())
+
+    assert active["peak"] == 2
+    assert dispatcher.stats()["wait_max_ms"] > 0
+
+
+def test_rejects_when_user_queue_is_full() -> None:
+    dispatcher = UserDispatcher(max_concurrency=4, max_pending_per_user=2)
+
+    async def run_all():
+        release = asyncio.Event()
+
+        async def work() -> None:
+            await release.wait()
+
+        first = asyncio.create_task(dispatcher.submit("a", work))
+        second = asyncio.create_task(dispatcher.submit("a", work))
+        await asyncio.sleep(0)
+        assert dispatcher.depth("a") == 2
+        with pytest.raises(DispatchRejected) as excinfo:
+            await dispatcher.submit("a", work)
+        other = asyncio.create_task(dispatcher.submit("b", work))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, second, other)
+        return excinfo.value.reason
+
+    assert asyncio.run(run_all()) == "user"
+    assert dispatcher.stats()["rejected"] == 1
+    assert dispatcher.depth("a") == 0
+
+
+def test_rejects_when_global_queue_is_full() -> None:
+    dispatcher = UserDispatcher(max_concurrency=1, max_pending=2)
+
+    async def run_all():
+        release = asyncio.Event()
+
+        async def work() -> None:
+            await release.wait()
+
+        tasks = [asyncio.create_task(dispatcher.submit(user, work)) for user in ("a", "b")]
+        await asyncio.sleep(0)
+        assert dispatcher.stats()["queued"] == 1
+        with pytest.raises(DispatchRejected) as excinfo:
+            await dispatcher.submit("c", work)
+        release.set()
+        await asyncio.gather(*tasks)
+        return excinfo.value.reason
+
+    assert asyncio.run(run_all()) == "global"
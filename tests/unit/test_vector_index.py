@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from dongdong_bot.agent.memory import MemoryStore
+from dongdong_bot.lib import vector_math
+from dongdong_bot.lib.vector_index import VectorIndex
+
+
+def test_vector_index_search_and_reopen(tmp_path: Path) -> None:
+    index = VectorIndex(tmp_path / "index")
+    index.append("a" * 32, "2026-02-02", "買牛奶", [1.0, 0.0])
+    index.append("b" * 32, "2026-02-03", "買咖啡", [0.0, 2.0])
+    index.close()
+
+    reopened = VectorIndex(tmp_path / "index")
+    hits = reopened.search([0.9, 0.1], top_k=1, min_score=0.1)
+
+    assert len(reopened) == 2
+    assert hits[0][0].content == "買牛奶"
+    assert hits[0][0].date == "2026-02-02"
+    assert 0.99 < hits[0][1] <= 1.0
+
+
+def test_vector_index_dimension_mismatch_returns_empty(tmp_path: Path) -> None:
+    index = VectorIndex(tmp_path / "index")
+    index.append("a" * 32, "2026-02-02", "買牛奶", [1.0, 0.0])
+
+    assert index.search([1.0, 0.0, 0.0]) == []
+
+
+def test_memory_store_imports_jsonl_and_exports(tmp_path: Path) -> None:
+    store = MemoryStore(str(tmp_path))
+    record = {
+        "id": "legacy-1",
+        "date": "2026-02-01",
+        "content": "外套顏色：淺藍",
+        "vector": [0.0, 1.0],
+        "created_at": "2026-02-01T08:00:00",
+    }
+    store.embedding_index_path.write_text(
+        json.dumps(record, ensure_ascii=False) + "\n", encoding="utf-8"
+    )
+
+    results = store.semantic_search([0.0, 1.0], min_score=0.5)
+    store.save_with_embedding("買咖啡", [1.0, 0.0], date="2026-02-02")
+    exported = store.export_embeddings(str(tmp_path / "export.jsonl"))
+
+    assert results[0][0] == "外套顏色：淺藍"
+    assert len(store.vector_index) == 2
+    assert exported == 2
+    lines = (tmp_path / "export.jsonl").read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0])["id"] == "legacy-1"
+
+
+def test_memory_store_delete_by_keyword_updates_index(tmp_path: Path) -> None:
+    store = MemoryStore(str(tmp_path))
+    store.save_with_embedding("買牛奶", [1.0, 0.0], date="2026-02-02")
+    store.save_with_embedding("買咖啡", [0.0, 1.0], date="2026-02-02")
+
+    removed = store.delete_by_keyword("牛奶")
+
+    assert removed == 2
+    assert store.semantic_search([1.0, 0.0], min_score=0.5) == []
+    assert len(store.vector_index) == 1
+
+
+def test_vector_index_search_without_numpy(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(vector_math, "np", None)
+    index = VectorIndex(tmp_path / "index")
+    index.append("a" * 32, "2026-02-02", "買牛奶", [1.0, 0.0])
+    index.append("b" * 32, "2026-02-02", "了什麼", [1.0, 0.1], noise=True)
+
+    hits = index.search([1.0, 0.0], top_k=5, min_score=0.1)
+    index.append("c" * 32, "2026-02-03", "買咖啡", [0.0, 1.0])
+
+    assert [record.content for record, _score in hits] == ["買牛奶"]
+    assert len(index) == 3
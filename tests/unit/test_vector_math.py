@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import pytest
+
+from dongdong_bot.lib import vector_math
+from dongdong_bot.lib.intent_classifier import IntentClassifier, IntentExample
+from dongdong_bot.lib.vector_math import VectorMatrix, cosine_similarity, top_k_indices, top_k_scored
+
+
+VECTORS = [[1.0, 0.0, 0.0], [0.6, 0.8, 0.0], [0.0, 0.0, 2.0], [0.5, 0.5, 0.5]]
+
+
+class FakeEmbeddingClient:
+    model = "fake"
+
+    def __init__(self, mapping: dict[str, list[float]]) -> None:
+        self._mapping = mapping
+
+    def embed(self, text: str) -> list[float]:
+        return list(self._mapping[text])
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed(text) for text in texts]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy" and not vector_math.HAS_NUMPY:
+        pytest.skip("numpy 未安裝")
+    if request.param == "python":
+        monkeypatch.setattr(vector_math, "np", None)
+    return request.param
+
+
+def test_batch_scores_match_cosine_similarity(backend) -> None:
+    matrix = VectorMatrix.from_vectors(VECTORS)
+    query = [0.9, 0.3, 0.1]
+
+    scores = matrix.scores(query)
+
+    for row, vector in enumerate(VECTORS):
+        assert scores[row] == pytest.approx(cosine_similarity(query, vector), abs=1e-5)
+
+
+def test_top_k_uses_min_score_and_exclude(backend) -> None:
+    matrix = VectorMatrix.from_vectors(VECTORS)
+
+    top = matrix.top_k([1.0, 0.0, 0.0], 2, min_score=0.1, exclude={0})
+
+    assert [row for row, _score in top] == [1, 3]
+
+
+def test_top_k_indices_handles_small_inputs(backend) -> None:
+    assert top_k_indices([], 3) == []
+    assert top_k_indices([0.2, 0.9], 5) == [(1, pytest.approx(0.9)), (0, pytest.approx(0.2))]
+
+
+def test_top_k_scored_partial_selection() -> None:
+    items = [("a", 0.1), ("b", 0.7), ("c", 0.4)]
+
+    assert top_k_scored(items, 2) == [("b", 0.7), ("c", 0.4)]
+
+
+def test_intent_classifier_uses_matrix(backend) -> None:
+    client = FakeEmbeddingClient(
+        {
+            "記住咖啡": [1.0, 0.0],
+            "我喜歡什麼": [0.0, 1.0],
+            "我喜歡什麼咖啡": [0.2, 0.9],
+        }
+    )
+    classifier = IntentClassifier(
+        client,
+        examples=[
+            IntentExample("memory_save", "記住咖啡"),
+            IntentExample("memory_query", "我喜歡什麼"),
+        ],
+    )
+
+    intent, score = classifier.classify("我喜歡什麼咖啡")
+
+    assert intent == "memory_query"
+    assert score > 0.9